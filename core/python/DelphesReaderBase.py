@@ -51,7 +51,7 @@ class DelphesReaderBase( LooperBase ):
         self.selectionString = selectionString
 
         logger.debug("Initializing TreeReader for sample %s", self.sample.name)
-        self._eList = self.sample.getEventList(selectionString = self.selectionString)
+        self._eList = self.sample.getEntryList(selectionString = self.selectionString)
         #  default event range of the reader
         self.nEvents = self._eList.GetN() if  self._eList else self.sample.chain.GetEntries()
         logger.debug("Found %i events in  %s", self.nEvents, self.sample.name)
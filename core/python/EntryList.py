@@ -0,0 +1,75 @@
+''' Selected entries of a TChain, stored per tree.
+Wraps a TEntryList made with Draw('>>name', selectionString, 'entrylist'). Entries are stored as 64 bit local entries
+in one sub-list per tree and trees without selected entries have no sub-list, i.e. they are never loaded when reading.
+'''
+
+# Standard imports
+import ROOT
+import bisect
+
+# Logging
+import logging
+logger = logging.getLogger(__name__)
+
+class EntryList( object ):
+
+    def __init__( self, chain, entry_list ):
+        ''' 'entry_list' is a TEntryList of 'chain', e.g. from Sample.getEntryList
+        '''
+        self.chain      = chain
+        self.entry_list = entry_list
+
+        # Sub-lists of trees with selected entries in the order of the chain: (tree number, sub-list)
+        sublists = list( entry_list.GetLists() ) if entry_list.GetLists() else [ entry_list ]
+        # Let the chain assign tree numbers to the sub-lists, then detach the list again (it would restrict chain.Draw)
+        chain.SetEntryList( entry_list )
+        blocks = [ ( l.GetTreeNumber(), l ) for l in sublists if l.GetN() > 0 ]
+        chain.SetEntryList( getattr( ROOT, "nullptr", 0 ) )
+        if any( tree_number < 0 for tree_number, l in blocks ):
+            if chain.GetNtrees() == 1:
+                blocks = [ ( 0, l ) for tree_number, l in blocks ]
+            else:
+                raise RuntimeError( "Could not match the entry list %s to the trees of the chain." % entry_list.GetName() )
+        blocks.sort( key = lambda b: b[0] )
+
+        # Offsets of the trees in the chain (known after the Draw that made the list)
+        offsets = chain.GetTreeOffset()
+        if hasattr( offsets, "SetSize" ):
+            offsets.SetSize( chain.GetNtrees() + 1 )
+        elif hasattr( offsets, "reshape" ):
+            offsets.reshape( ( chain.GetNtrees() + 1, ) )
+
+        self.lists   = [ l for tree_number, l in blocks ]
+        self.offsets = [ long( offsets[tree_number] ) for tree_number, l in blocks ]
+        # Number of selected entries before each sub-list
+        self.first   = []
+        n = 0
+        for l in self.lists:
+            self.first.append( n )
+            n += l.GetN()
+        self.n = n
+
+        logger.debug( "Entry list %s has %i entries in %i of %i trees.", entry_list.GetName(), self.n, len( self.lists ), chain.GetNtrees() )
+
+    def GetN( self ):
+        ''' Number of selected entries.
+        '''
+        return self.n
+
+    def GetEntry( self, position ):
+        ''' Entry number in the chain of the selected entry at 'position'. Sequential access is fast.
+        '''
+        if position < 0 or position >= self.n: return -1
+        i_list = bisect.bisect_right( self.first, position ) - 1
+        return self.offsets[i_list] + self.lists[i_list].GetEntry( position - self.first[i_list] )
+
+    def entries( self, start = 0, stop = None ):
+        ''' Iterate over the chain entry numbers of the selected entries in the range [start, stop).
+            Sub-lists outside the range are skipped.
+        '''
+        stop = self.n if stop is None else min( stop, self.n )
+        for offset, first, l in zip( self.offsets, self.first, self.lists ):
+            if first + l.GetN() <= start: continue
+            if first >= stop: break
+            for i in xrange( max( start - first, 0 ), min( stop - first, l.GetN() ) ):
+                yield offset + l.GetEntry( i )
@@ -7,6 +7,13 @@ import abc
 import ROOT
 import uuid
 import os
+import ctypes
+
+# Optional
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 # Logging
 import logging
@@ -18,6 +25,53 @@ from RootTools.core.LooperBase import LooperBase
 from RootTools.core.LooperHelpers import createClassString
 from RootTools.core.TreeVariable import TreeVariable, ScalarTreeVariable, VectorTreeVariable
 
+# ctypes of the ROOT short types
+ctypesTypeDict = {
+    'b': ctypes.c_uint8,
+    'B': ctypes.c_int8,
+    'S': ctypes.c_int16,
+    's': ctypes.c_uint16,
+    'I': ctypes.c_int32,
+    'i': ctypes.c_uint32,
+    'F': ctypes.c_float,
+    'D': ctypes.c_double,
+    'L': ctypes.c_int64,
+    'l': ctypes.c_uint64,
+    'O': ctypes.c_bool,
+}
+
+def _address( obj, member ):
+    ''' Address of a data member of a ROOT class instance.
+    '''
+    if hasattr( ROOT, "addressof" ):
+        return ROOT.addressof( obj, member )
+    # ROOT.AddressOf( obj, member )[0] would be the content of the member: address of the instance plus offset of the member
+    return ROOT.AddressOf( obj )[0] + ROOT.TClass.GetClass( type( obj ).__name__ ).GetDataMemberOffset( member )
+
+class ArrayViews( object ):
+    ''' numpy views (no copies) on the C arrays of the vector components of a struct, e.g. views.Jet_pt.
+        The views are sliced to the current value of the counter ('nJet' for 'Jet') if the counter is in the struct.
+    '''
+    def __init__( self, struct, vectors ):
+        self._struct   = struct
+        self._views    = {}
+        self._counters = {}
+        for vector in vectors:
+            counter = vector.counterVariable().name
+            for c in vector.components:
+                c_array = ( ctypesTypeDict[c.type]*vector.nMax ).from_address( _address( struct, c.name ) )
+                self._views[c.name]    = np.ctypeslib.as_array( c_array )
+                self._counters[c.name] = counter if hasattr( struct, counter ) else None
+
+    def __getattr__( self, name ):
+        try:
+            view    = self.__dict__['_views'][name]
+            counter = self.__dict__['_counters'][name]
+        except KeyError:
+            raise AttributeError( "No vector component %s." % name )
+        if counter is None: return view
+        return view[:max( 0, min( int( getattr( self._struct, counter ) ), len( view ) ) )]
+
 class FlatTreeLooperBase( LooperBase ):
     __metaclass__ = abc.ABCMeta
 
@@ -79,6 +133,15 @@ class FlatTreeLooperBase( LooperBase ):
 
         return self
 
+    def makeArrayViews(self, attr):
+        ''' Attach ArrayViews of the vector components to the struct 'attr', e.g. self.event.arrays.Jet_pt (needs numpy).
+        '''
+        struct = getattr(self, attr)
+        if np is None:
+            logger.debug("No numpy. Not making array views for %s.", attr)
+            return
+        struct.arrays = ArrayViews( struct, [ v for v in self.variables if isinstance(v, VectorTreeVariable) ] )
+
     def cleanUpTempFiles(self):
         ''' Delete all temporary files.
         '''
@@ -48,6 +48,10 @@ def createClassString(variables, useSTDVectors = False, addVectorCounters = Fals
         
     vectorDeclaration = ""
     vectorInitString  = ""
+    # Number of vector entries to be reset, computed before the counters are reset
+    resetCountString  = ""
+    # Counters must not exceed the size of the C arrays
+    counterCheckString = ""
     if useSTDVectors:
         for vector in vectors:
             for c in vector.components:
@@ -71,8 +75,17 @@ def createClassString(variables, useSTDVectors = False, addVectorCounters = Fals
                 vectorDeclaration    +=  "  %s %s[%3i];\n" % ( getCTypeString(c.type), c.name, vector.nMax)
                 vectorCompInitString +=  "    %s[i] = %15s;\n"%(c.name, getCDefaultString(c.type)) 
             if vectorCompInitString != "":
-                vectorInitString += """\n  for(UInt_t i=0;i<{nMax};i++){{\n{vectorCompInitString}     }}; //End for loop"""\
-                    .format(nMax = vector.nMax, vectorCompInitString = vectorCompInitString)
+                counterName = vector.counterVariable().name
+                if counterName in [ scalar.name for scalar in scalars ]:
+                    # Only the entries used by the previous event are reset (all of them in the first call)
+                    resetCountString += "  Int_t nReset_{name} = initialized_ ? TMath::Min( TMath::Max( Int_t({counter}), 0 ), {nMax} ) : {nMax};\n"\
+                        .format(name = vector.name, counter = counterName, nMax = vector.nMax)
+                    counterCheckString += " && {counter}<={nMax}".format(counter = counterName, nMax = vector.nMax)
+                    nReset = "nReset_%s" % vector.name
+                else:
+                    nReset = vector.nMax
+                vectorInitString += """\n  for(Int_t i=0;i<{nReset};i++){{\n{vectorCompInitString}     }}; //End for loop"""\
+                    .format(nReset = nReset, vectorCompInitString = vectorCompInitString)
 
     return \
 """#ifndef __className__
@@ -86,12 +99,20 @@ class className{{
   public:
 {scalarDeclaration}
 {vectorDeclaration}
+  bool initialized_ = false;
+
   void init(){{
 
+{resetCountString}
 {scalarInitString}
 {vectorInitString}
+  initialized_ = true;
   }}; // End init
+
+  bool countersInRange(){{
+    return true{counterCheckString};
+  }};
 }}; // End class declaration
 #endif""".format(scalarDeclaration = scalarDeclaration,\
                  scalarInitString = scalarInitString, vectorDeclaration=vectorDeclaration, 
-                 vectorInitString=vectorInitString)
+                 vectorInitString=vectorInitString, resetCountString = resetCountString, counterCheckString = counterCheckString)
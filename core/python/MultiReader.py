@@ -13,12 +13,19 @@ default_key = lambda event: ( event.run, event.lumi, event.evt )
 
 class MultiReader( LooperBase ):
 
-    def __init__(self, *args):
+    def __init__(self, *args, **kwargs):
         ''' Initialize with 'MultiReader( (reader1, key1), (reader2, key2), ... )'
             key1, ... should each return '(run, lumi, event)' and in this order for higher speed (Note: don't start with event).
             Will run over all common events defined by the return value of keys.
+            FWLiteReaders with the default key are indexed from the EventAuxiliary branch.
+            Optional keyword arguments: 'indexCacheDir' (cache for these indices) and 'nThreads' (to build them).
         '''
 
+        self.indexCacheDir = kwargs.pop( 'indexCacheDir', None )
+        self.nThreads      = kwargs.pop( 'nThreads', 1 )
+        if len(kwargs)>0:
+            raise ValueError( "Unknown keyword arguments for MultiReader: %r" % kwargs.keys() )
+
         if len(args)==0:
             logger.error( "Can't initialze MultiReader. Need 'MultiReader( (reader1, key1), (reader2, key2), ... )', got %s", repr( args ) )
             raise ValueError( "Can't create MultiReader instance." )
@@ -44,12 +51,18 @@ class MultiReader( LooperBase ):
         for i_reader, reader in enumerate(self.readers):
             reader_positions[i_reader] = {}
 
-            # Let's at least not read all FWLite arguments if we're running for the first time.
-            kwargs = {'readProducts': False} if isinstance( reader, FWLiteReader ) else {}
-
             reader.start()
-            while reader.run( **kwargs ):
-                reader_positions[i_reader][ self.keys[i_reader](reader.event) ] = reader.position-1
+            if isinstance( reader, FWLiteReader ) and self.keys[i_reader] is default_key:
+                # Read (run, lumi, evt) from the EventAuxiliary branch only instead of looping over FWLite.Events
+                index = reader.eventIndex( cacheDir = self.indexCacheDir, nThreads = self.nThreads )
+                for position, key in enumerate( index[:reader.eventRange[1]] ):
+                    reader_positions[i_reader][ key ] = position
+            else:
+                # Let's at least not read all FWLite arguments if we're running for the first time.
+                kwargs = {'readProducts': False} if isinstance( reader, FWLiteReader ) else {}
+
+                while reader.run( **kwargs ):
+                    reader_positions[i_reader][ self.keys[i_reader](reader.event) ] = reader.position-1
 
             if i_reader == 0:
                 intersec = set(reader_positions[i_reader].keys())
@@ -7,9 +7,13 @@ import ROOT
 import uuid
 import os
 import random
+import bisect
 from array import array
 from math import sqrt
 import subprocess
+import hashlib
+import re
+import cPickle as pickle
 
 # Logging
 import logging
@@ -17,6 +21,11 @@ logger = logging.getLogger(__name__)
 
 # RootTools imports
 import RootTools.core.helpers as helpers
+import RootTools.core.catalog as catalog
+import RootTools.core.zonemap as zonemap
+import RootTools.core.schema as schema
+import RootTools.core.yields as yields
+from   RootTools.core.SelectionIndex import SelectionIndex
 import RootTools.plot.Plot as Plot
 from   RootTools.core.SampleBase import SampleBase
 
@@ -33,6 +42,48 @@ def check_equal_(vals):
     else:
         return vals[0]
 
+def _fileNormalization( args ):
+    ''' (normalization, nEvents) of a single file. Module level for multiprocessing.
+        Without selection, the sum of generator weights is read from the small 'Runs' tree of nanoAOD files
+        that are not skimmed (genEventCount equals the number of entries), otherwise the 'Events' tree is drawn.
+    '''
+    filename, treeName, selectionString, weightString = args
+
+    if selectionString in [None, "(1)"] and weightString in ["genWeight", "1", "(1)"]:
+        rf = ROOT.TFile.Open( filename )
+        if rf and not rf.IsZombie():
+            tree     = rf.Get( treeName )
+            runs     = rf.Get( "Runs" )
+            result   = None
+            if tree:
+                nEvents = int( tree.GetEntries() )
+                if weightString != "genWeight":
+                    result = ( float( nEvents ), nEvents )
+                elif runs:
+                    sumw_branches  = [ b for b in [ "genEventSumw", "genEventSumw_" ] if runs.GetBranch( b ) ]
+                    count_branches = [ b for b in [ "genEventCount", "genEventCount_" ] if runs.GetBranch( b ) ]
+                    if sumw_branches and count_branches:
+                        sumw, count = 0., 0
+                        for i_run in xrange( runs.GetEntries() ):
+                            runs.GetEntry( i_run )
+                            sumw  += getattr( runs, sumw_branches[0] )
+                            count += int( getattr( runs, count_branches[0] ) )
+                        # skimmed files (e.g. private nanoAOD) are normalized to the events they contain
+                        if count == nEvents:
+                            result = ( sumw, nEvents )
+            rf.Close()
+            if result is not None:
+                logger.debug( "Normalization of %s from 'Runs' tree: %r", filename, result )
+                return result
+
+    # Fall back to the 'Events' tree
+    sample = Sample( name = "normalization_" + str(uuid.uuid4()), treeName = treeName, files = [filename], selectionString = selectionString, normalization = 1 )
+    normalization = sample.getYieldFromDraw( weightString = weightString )['val']
+    nEvents = int( sample.getEventList().GetN() )
+    sample.clear()
+    logger.debug( "Normalization of %s from Draw: %r", filename, ( normalization, nEvents ) )
+    return ( normalization, nEvents )
+
 class Sample ( SampleBase ): # 'object' argument will disappear in Python 3
 
     def __init__(self, 
@@ -72,10 +123,31 @@ class Sample ( SampleBase ): # 'object' argument will disappear in Python 3
 
         # Other samples. Add friend elements (friend, treeName)
         self.friends = []
+        # Options of friends (by position in self.friends): {'index':(major, minor), 'indexDirectory':..., 'lazy':...}
+        self.friend_options = {}
+        # Positions of friends that are attached to the chain
+        self._attached_friends = set()
+
+        # Local staging of the files (RootTools.core.Stager.Stager instance)
+        self.stager = None
+
+        # Zone maps (see buildZoneMaps)
+        self.useZoneMaps      = False
+        self.zoneMapDirectory = None
+
+        # Cache directory of the schemas of the files (see getSchema and counterMaximum)
+        self.schemaDirectory = None
              
         logger.debug("Created new sample %s with %i files, treeName %s,  selectionStrings %r and weightStrings %r.", 
             name, len(self.files), treeName, self.__selectionStrings, self.__weightStrings)
 
+    def _spec_args( self ):
+        ''' Constructor arguments for the spec.
+        '''
+        args = super(Sample, self)._spec_args()
+        args.update( {'treeName':self.treeName, 'selectionString':list(self.__selectionStrings), 'weightString':list(self.__weightStrings)} )
+        return args
+
     def setSelectionString(self, selectionString):
         if type(selectionString)==type(""):
             self.__selectionStrings = [ selectionString ]
@@ -211,13 +283,10 @@ class Sample ( SampleBase ): # 'object' argument will disappear in Python 3
         files = []
         for d in directories:
             cmd = [ "xrdfs", redirector, "ls", d ]
-            fileList = []
-            for i in range(10):
-                try:
-                    fileList = [ file for file in subprocess.check_output( cmd ).split("\n")[:-1] ]
-                    break
-                except:
-                    if i<9: pass
+            try:
+                fileList = catalog.query( cmd, retries = 2 ).splitlines()
+            except ( subprocess.CalledProcessError, OSError ):
+                fileList = []
             counter = 0
             for filename in fileList:
                 if filename.endswith(".root"):
@@ -313,18 +382,18 @@ class Sample ( SampleBase ): # 'object' argument will disappear in Python 3
 
         else:
             # only entered if overwrite is not set or sample not in the cache yet
-            def _dasPopen(dbs):
+            def _dasQuery(dbs):
                 if 'LSB_JOBID' in os.environ:
                     raise RuntimeError, "Trying to do a DAS query while in a LXBatch job (env variable LSB_JOBID defined)\nquery was: %s" % dbs
                 logger.info('DAS query\t: %s',  dbs)
-                return os.popen(dbs)
+                return catalog.query(dbs, check = False, useCache = not overwrite)
 
             sampleName = DASname.rstrip('/')
             query, qwhat = sampleName, "dataset"
             if "#" in sampleName: qwhat = "block"
 
             dbs='dasgoclient -query="file %s=%s instance=prod/%s" --limit %i'%(qwhat,query, instance, limit)
-            dbsOut = _dasPopen(dbs).readlines()
+            dbsOut = _dasQuery(dbs).splitlines()
             
             files = []
             for line in dbsOut:
@@ -349,7 +418,7 @@ class Sample ( SampleBase ): # 'object' argument will disappear in Python 3
                 if instance == 'global':
                     # check if dataset is available in local site, otherwise don't read a normalization
                     dbs='dasgoclient -query="site %s=%s instance=prod/%s" --format=json'%(qwhat,query, instance)
-                    jdata = json.load(_dasPopen(dbs))
+                    jdata = json.loads(_dasQuery(dbs))
                     
                     filesOnLocalT2 = False
                     for d in jdata['data']:
@@ -369,19 +438,21 @@ class Sample ( SampleBase ): # 'object' argument will disappear in Python 3
 
                 if DASname.endswith('SIM') or not 'Run20' in DASname:
                     # need to read the proper normalization for MC
-                    logger.info("Reading normalization. This is slow, so grab a coffee.")
+                    logger.info("Reading normalization.")
                     tmp_sample = cls(name=name, files=[ redirector + f for f in files], treeName = treeName, selectionString = selectionString, weightString = weightString,
                         isData = isData, color=color, texName = texName, xSection = xSection, normalization=1)
-                    normalization = tmp_sample.getYieldFromDraw('(1)', genWeight)['val']
+                    normalization, _ = cls.normalizationFromFiles( files, redirector = redirector, treeName = treeName,
+                        selectionString = tmp_sample.selectionString, weightString = tmp_sample.combineWithSampleWeight( genWeight ),
+                        dbFile = dbFile, nThreads = 8 if multithreading else 1, overwrite = bool( overwrite ) and overwrite != 'update' )
                     logger.info("Got normalization %s", normalization)
                     # still getting number of events
                     dbs='dasgoclient -query="summary %s=%s instance=prod/%s" --format=json'%(qwhat,query, instance)
-                    jdata = json.load(_dasPopen(dbs))['data'][0]['summary'][0]
+                    jdata = json.loads(_dasQuery(dbs))['data'][0]['summary'][0]
                     nEvents = int(jdata['nevents'])
                 else:
                     # for data, we can just use the number of events, although no normalization is needed anyway.
                     dbs='dasgoclient -query="summary %s=%s instance=prod/%s" --format=json'%(qwhat,query, instance)
-                    jdata = json.load(_dasPopen(dbs))['data'][0]['summary'][0]
+                    jdata = json.loads(_dasQuery(dbs))['data'][0]['summary'][0]
                     normalization = int(jdata['nevents'])
                     nEvents = normalization
 
@@ -447,13 +518,20 @@ class Sample ( SampleBase ): # 'object' argument will disappear in Python 3
             query, qwhat = sampleName, "dataset"
 
             files = []
-            cmd = [ "xrdfs", redirector, "ls", directory ]
-            fileList = [ file for file in subprocess.check_output( cmd ).split("\n")[:-1] ]
-
-            for filename in fileList:
+            # long listing: '<flags> <date> <time> <size> <path>', size and modification time are the signature of the normalization
+            cmd = [ "xrdfs", redirector, "ls", "-l", directory ]
+            fileList = catalog.query( cmd, useCache = not overwrite ).splitlines()
+
+            signatures = {}
+            for line in fileList:
+                fields = line.split()
+                if len(fields) == 0: continue
+                filename = fields[-1]
                 if filename.endswith(".root"):
 #                    files.append( redirector + os.path.join( directory, filename ) )
                     files.append( os.path.join( directory, filename ) )
+                    if len(fields) >= 5:
+                        signatures[files[-1]] = "%s:%s_%s" % ( fields[-2], fields[-4], fields[-3] )
                 if maxN is not None and maxN>0 and len(files)>=maxN:
                     break
             
@@ -471,12 +549,14 @@ class Sample ( SampleBase ): # 'object' argument will disappear in Python 3
                     logger.info("Removed old DB entry.")
 
                 # need to read the proper normalization for MC
-                logger.info("Reading normalization. This is slow, so grab a coffee.")
+                logger.info("Reading normalization.")
                 tmp_sample = cls(name=name, files=[ redirector + f for f in files], treeName = treeName, selectionString = selectionString, weightString = weightString,
                     isData = isData, color=color, texName = texName, xSection = xSection, normalization=1)
-                normalization = tmp_sample.getYieldFromDraw('(1)', genWeight if directory.endswith('SIM') or not 'Run20' in directory else "1")['val']
+                normalization, nEvents = cls.normalizationFromFiles( files, redirector = redirector, treeName = treeName,
+                    selectionString = tmp_sample.selectionString,
+                    weightString = tmp_sample.combineWithSampleWeight( genWeight if directory.endswith('SIM') or not 'Run20' in directory else "1" ),
+                    dbFile = dbFile, nThreads = 8 if multithreading else 1, signatures = signatures, overwrite = bool( overwrite ) and overwrite != 'update' )
                 logger.info("Got normalization %s", normalization)
-                nEvents = int(tmp_sample.getEventList().GetN())
                 logger.info("Got number of events %s", nEvents)
 
                 for f in files:
@@ -493,15 +573,58 @@ class Sample ( SampleBase ): # 'object' argument will disappear in Python 3
         sample.json     = json
         sample.nEvents  = int(nEvents)
         return sample
-        
+
+    @staticmethod
+    def normalizationFromFiles( files, redirector = "", treeName = "Events", selectionString = None, weightString = "genWeight", dbFile = None, nThreads = 1,
+            signatures = None, overwrite = False ):
+        ''' Return (sum of weightString, number of events) for events passing selectionString in redirector+file for all files.
+            Results are stored per file in the 'fileNormalizations' table of dbFile (if not None) together with a signature of the file
+            and only new or changed files are read. The signature is size and modification time for local files, otherwise it is
+            taken from 'signatures' {file:signature string}, if given (files without signature are compared by name).
+            With 'overwrite', all files are read again. New files are read in parallel if nThreads>1.
+        '''
+        from RootTools.fwlite.Database import Database
+
+        key = {'treeName':treeName, 'selectionString':str(selectionString), 'weightString':str(weightString)}
+
+        def signature( f ):
+            if signatures is not None and f in signatures: return str( signatures[f] )
+            filename, size, mtime = helpers.file_signature( redirector + f )
+            return "%s:%s" % ( size, mtime ) if size is not None else ""
+        fileSignatures = { f:signature( f ) for f in files }
+
+        results = {}
+        if dbFile is not None:
+            cache = Database(dbFile, "fileNormalizations", ["file", "signature", "treeName", "selectionString", "weightString", "nEvents"])
+            if not overwrite:
+                # entries are ordered by time stamp, the latest one wins
+                for entry in cache.getDicts( key ):
+                    if entry["file"] in fileSignatures and entry["signature"] == fileSignatures[entry["file"]]:
+                        results[entry["file"]] = ( float(entry["value"]), int(entry["nEvents"]) )
+        else:
+            cache = None
+
+        newFiles = [ f for f in files if f not in results ]
+        logger.info( "Normalization for %i files from cache, reading %i new or changed files.", len(files) - len(newFiles), len(newFiles) )
+
+        newResults = helpers.parallel_map( _fileNormalization, [ ( redirector + f, treeName, selectionString, weightString ) for f in newFiles ], nThreads = nThreads )
+        for f, result in zip( newFiles, newResults ):
+            results[f] = result
+            if cache is not None:
+                cache.add( dict( key, file = f, signature = fileSignatures[f], nEvents = result[1] ), result[0], save=True )
+
+        return sum( results[f][0] for f in files ), sum( results[f][1] for f in files )
+
     @classmethod
     def fromCMGOutput(cls, name, baseDirectory, treeFilename = 'tree.root', chunkString = None, treeName = 'tree', maxN = None, \
             selectionString = None, xSection = -1, weightString = None, 
-            isData = False, color = 0, texName = None):
+            isData = False, color = 0, texName = None, nThreads = 4, manifestFile = None):
         ''' Load a CMG output directory from e.g. unzipped crab output in the 'Chunks' directory structure. 
             Expects the presence of the tree root file and the SkimReport.txt
+            Chunks are scanned with 'nThreads' processes. The result is stored in a manifest (default: in baseDirectory) 
+            and only chunks that changed since are scanned again.
         '''
-        from cmg_helpers import read_cmg_normalization
+        import cmg_helpers
         maxN = maxN if maxN is not None and maxN>0 else None
 
         # Reading all subdirectories in base directory. If chunkString != None, require cmg output name formatting
@@ -516,45 +639,32 @@ class Sample ( SampleBase ): # 'object' argument will disappear in Python 3
 
         logger.debug( "Found %i chunk directories with chunkString %s in base directory %s", \
                            len(chunkDirectories), chunkString, baseDirectory )
+
+        # Scan only chunks that are not in the manifest or changed
+        manifestFile = manifestFile if manifestFile is not None else os.path.join( baseDirectory, cmg_helpers.manifest_filename )
+        manifest = cmg_helpers.read_manifest( manifestFile )
+        toScan = [ c for c in chunkDirectories if not cmg_helpers.is_valid( manifest.get(c), chunkDirectory = c, treeFilename = treeFilename, treeName = treeName ) ]
+        logger.debug( "Scanning %i of %i chunks with %i threads.", len(toScan), len(chunkDirectories), nThreads )
+        for chunkDirectory, result in zip( toScan, helpers.parallel_map( cmg_helpers.scan_cmg_chunk, [ (c, treeFilename, treeName) for c in toScan ], nThreads = nThreads ) ):
+            manifest[chunkDirectory] = result
+        if len(toScan)>0:
+            cmg_helpers.write_manifest( manifestFile, manifest )
+
         normalization = 0
         files = []
         failedChunks=[]
         goodChunks  =[]
 
-        for i, chunkDirectory in enumerate( chunkDirectories ):
-            success = False
-            logger.debug("Reading chunk %s", chunkDirectory)
-
-            # Find normalization
-            sumW = None
-            for root, subFolders, filenames in os.walk( chunkDirectory ):
-                # Determine normalization constant
-                if 'SkimReport.txt' in filenames:
-                    skimReportFilename = os.path.join(root, 'SkimReport.txt')
-                    with open(skimReportFilename, 'r') as fin:
-                      sumW = read_cmg_normalization(fin)
-                      if not sumW:
-                          logger.warning( "Read chunk %s and found report '%s' but could not read normalization.",
-                                               chunkDirectory, skimReportFilename )
-            # Find treefile
-            treeFile = None
-            for root, subFolders, filenames in os.walk( chunkDirectory ):
-                # Load tree file 
-                if treeFilename in filenames:
-                    treeFile = os.path.join(root, treeFilename)
-                    # Checking whether root file is OG and contains a tree
-                    if not helpers.checkRootFile(treeFile, checkForObjects=[treeName] ):
-                        logger.warning( "Read chunk %s and found tree file '%s' but file looks broken.",  chunkDirectory, treeFile )
+        for chunkDirectory in chunkDirectories:
+            sumW, treeFile = manifest[chunkDirectory]['sumW'], manifest[chunkDirectory]['file']
 
             # If both, normalization and treefile are OK call it successful.
             if sumW and treeFile:
                 files.append( treeFile )
                 normalization += sumW
                 logger.debug( "Successfully read chunk %s and incremented normalization by %7.2f",  chunkDirectory, sumW )
-                success = True
                 goodChunks.append( chunkDirectory )
-
-            if not success:
+            else:
                 failedChunks.append( chunkDirectory )
 
         # Don't allow empty samples
@@ -577,11 +687,12 @@ class Sample ( SampleBase ): # 'object' argument will disappear in Python 3
     @classmethod
     def fromCMGCrabDirectory(cls, name, baseDirectory, treeFilename = 'tree.root', treeName = 'tree', maxN = None, xSection = -1,\
             selectionString = None, weightString = None,
-            isData = False, color = 0, texName = None):
+            isData = False, color = 0, texName = None, nThreads = 4, manifestFile = None):
         '''Load a CMG crab output directory
+           Jobs are scanned with 'nThreads' processes. The result is stored in a manifest (default: in baseDirectory) 
+           and only jobs whose files changed since are scanned again.
         ''' 
-        import tarfile
-        from cmg_helpers import read_cmg_normalization
+        import cmg_helpers
 
         maxN = maxN if maxN is not None and maxN>0 else None
 
@@ -606,25 +717,22 @@ class Sample ( SampleBase ): # 'object' argument will disappear in Python 3
         pairs = set(zipFiles.keys()) & set(treeFiles.keys())
         n_jobs = len( set(zipFiles.keys()) | set(treeFiles.keys()) )
 
+        # Scan only jobs that are not in the manifest or changed. Keyed by tgz file.
+        manifestFile = manifestFile if manifestFile is not None else os.path.join( baseDirectory, cmg_helpers.manifest_filename )
+        manifest = cmg_helpers.read_manifest( manifestFile )
+        toScan = [ n for n in pairs if not cmg_helpers.is_valid( manifest.get(zipFiles[n]), file = treeFiles[n], treeName = treeName ) ]
+        logger.debug( "Scanning %i of %i jobs with %i threads.", len(toScan), len(pairs), nThreads )
+        for n, result in zip( toScan, helpers.parallel_map( cmg_helpers.scan_cmg_crab_job, [ (zipFiles[n], treeFiles[n], treeName) for n in toScan ], nThreads = nThreads ) ):
+            manifest[zipFiles[n]] = result
+        if len(toScan)>0:
+            cmg_helpers.write_manifest( manifestFile, manifest )
+
         normalization = 0
         files = []
         failedJobs = []
         for n in pairs:
-            sumW = None
-            tf = tarfile.open( zipFiles[n], 'r:gz' )
-            for f in tf.getmembers():
-                if "SkimReport.txt" in f.name:
-                    sumW = read_cmg_normalization(tf.extractfile(f))
-                if sumW is not None: break
-            if sumW is None:
-                logger.warning( "No normalization found when reading tar file %s", zipFiles[n] )
-            tf.close()
-
-            # Check treefile for whether the tree 'treeName' can be found.
-            # This is an implicit check for broken, recovered or otherwise corrupted root files.
-            treeFile = treeFiles[n] if helpers.checkRootFile(treeFiles[n], checkForObjects = [treeName] ) else None
-
-            if treeFile is None: logger.warning( "File %s looks broken. Checked for presence of tree %s.", treeFiles[n] , treeName )
+            sumW     = manifest[zipFiles[n]]['sumW']
+            treeFile = treeFiles[n] if manifest[zipFiles[n]]['entries'] is not None else None
 
             # If both, normalization and treefile are OK call it successful.
             if sumW and treeFile:
@@ -704,12 +812,19 @@ class Sample ( SampleBase ): # 'object' argument will disappear in Python 3
             raise helpers.EmptySampleError("Sample {name} has no input files! Can not load.".format(name = self.name) )
         else:
             self._chain = ROOT.TChain(self.treeName)
+            # files in the chain (with a stager, the chain reads local copies of some of them, see stageTree)
+            self._chainFiles = []
+            self._treeOffsets = None
+            self._stagedTree  = None
+            # files referenced in the stager by this sample
+            self._stagedFiles = set()
             counter = 0
             for f in self.files:
                 logger.debug("Now adding file %s to sample '%s'", f, self.name)
                 try:
                     if helpers.checkRootFile(f, checkForObjects=[self.treeName]):
                         self._chain.Add(f)
+                        self._chainFiles.append(f)
                         counter+=1
                     else:
                         logger.error( "Check of root file failed. Skipping. File: %s", f )
@@ -720,21 +835,142 @@ class Sample ( SampleBase ): # 'object' argument will disappear in Python 3
                 raise helpers.EmptySampleError( "No root files for sample %s." %self.name ) 
             logger.debug( "Loaded %i files for sample '%s'.", counter, self.name )
 
-        # Add friends
+        # Add friends; lazy friends are added when their branches are used (see activateFriends)
+        self._attached_friends = set()
         if hasattr( self, 'friends'):  # Catch cases where cached samples have no default value for friends attribute
-            for friend_sample, friend_treeName in self.friends:
-                self.chain.AddFriend(friend_sample.chain, friend_treeName)
+            for i_friend in xrange( len( self.friends ) ):
+                if not self.__friendOptions( i_friend ).get( 'lazy', False ):
+                    self.__attachFriend( i_friend )
+
+    def __friendOptions( self, i_friend ):
+        return getattr( self, 'friend_options', {} ).get( i_friend, {} )
+
+    def __attachFriend( self, i_friend ):
+        ''' Add the chain of friend number i_friend to self.chain. Friends with an index are aligned by the index keys.
+        '''
+        friend_sample, friend_treeName = self.friends[i_friend]
+        options = self.__friendOptions( i_friend )
+        if options.get( 'index' ) is not None:
+            friend_sample.buildIndex( *options['index'], indexDirectory = options.get( 'indexDirectory' ) )
+        self._chain.AddFriend( friend_sample.chain, friend_treeName )
+        self._attached_friends.add( i_friend )
+        logger.debug( "Added friend %s (tree %s) to sample %s.", friend_sample.name, friend_treeName, self.name )
+
+    def __friendBranchNames( self, i_friend ):
+        ''' Branch names of a friend, read from its first file (the chain of the friend is not loaded).
+        '''
+        if not hasattr( self, "_friend_branch_names" ):
+            self._friend_branch_names = {}
+        if i_friend not in self._friend_branch_names:
+            friend_sample, friend_treeName = self.friends[i_friend]
+            names = set()
+            f = ROOT.TFile.Open( friend_sample.files[0] )
+            if f and not f.IsZombie():
+                tree = f.Get( friend_sample.treeName )
+                if tree:
+                    names = set( b.GetName() for b in tree.GetListOfBranches() )
+                f.Close()
+            self._friend_branch_names[i_friend] = names
+        return self._friend_branch_names[i_friend]
+
+    def activateFriends( self, *expressions ):
+        ''' Attach the lazy friends whose branches are used in the expressions (branch names, selection or weight strings).
+            With no expressions, all lazy friends are attached.
+        '''
+        if len( getattr( self, 'friends', [] ) ) == 0: return
+        # make sure the chain and the non-lazy friends are loaded
+        chain = self.chain
+        identifiers = set( sum( [ re.findall( r"[A-Za-z_][\w.]*", e ) for e in expressions if e is not None ], [] ) )
+        for i_friend, ( friend_sample, friend_treeName ) in enumerate( self.friends ):
+            if i_friend in self._attached_friends: continue
+            if len( expressions ) > 0:
+                branches = self.__friendBranchNames( i_friend )
+                if not any( identifier in branches or ( identifier.startswith( friend_treeName + "." ) and identifier[len( friend_treeName )+1:] in branches ) for identifier in identifiers ):
+                    continue
+            self.__attachFriend( i_friend )
+
+    def buildIndex( self, major, minor = "0", indexDirectory = None ):
+        ''' Build a TTreeIndex of self.chain with the keys 'major' and 'minor' (e.g. "run" and "luminosityBlock*1000000+event").
+            With indexDirectory, the index is stored there, identified by the fingerprint of the sample and the keys,
+            and read back instead of being rebuilt as long as the files are unchanged.
+        '''
+        filename = None
+        if indexDirectory is not None:
+            key = hashlib.md5( repr( [ self.fingerprint(), major, minor ] ) ).hexdigest()
+            filename = os.path.join( indexDirectory, "index_%s.root" % key )
+            if os.path.exists( filename ):
+                f = ROOT.TFile.Open( filename )
+                index = f.Get( "index" ) if f and not f.IsZombie() else None
+                if index:
+                    f.Close()
+                    index.SetTree( self.chain )
+                    self.chain.SetTreeIndex( index )
+                    self._index = index
+                    logger.debug( "Read index (%s, %s) of sample %s from %s", major, minor, self.name, filename )
+                    return index
+                logger.warning( "Could not read index from %s. Rebuilding.", filename )
+
+        logger.info( "Building index (%s, %s) for sample %s with %i files.", major, minor, self.name, len( self.files ) )
+        index = ROOT.TTreeIndex( self.chain, major, minor )
+        self.chain.SetTreeIndex( index )
+        self._index = index
+
+        if filename is not None:
+            if not os.path.exists( indexDirectory ):
+                os.makedirs( indexDirectory )
+            tmp_filename = filename + "." + str( uuid.uuid4() )
+            directory = ROOT.gDirectory
+            f = ROOT.TFile( tmp_filename, "recreate" )
+            index.Write( "index" )
+            f.Close()
+            directory.cd()
+            os.rename( tmp_filename, filename )
+            logger.debug( "Stored index of sample %s in %s", self.name, filename )
+
+        return index
+
+    def counterMaximum( self, counterName, nThreads = 1 ):
+        ''' Maximum of a counter leaf (e.g. 'nJet') over all files, as stored by ROOT when the files were written
+            (TLeaf::GetMaximum). Taken from the schemas of the files (cached in self.schemaDirectory, read with nThreads processes).
+            None if no leaf has this counter.
+        '''
+        # recomputed when the files change
+        key = ( self.treeName, tuple( self.files ) )
+        if getattr( self, "_counterMaxima", None ) is None or self._counterMaxima[0] != key:
+            schemas = helpers.parallel_map( schema._get_schema, [ ( f, self.treeName, getattr( self, "schemaDirectory", None ) ) for f in self.files ], nThreads = nThreads )
+            self._counterMaxima = ( key, schema.counter_maxima( [ s for s in schemas if s is not None ] ) )
+        return self._counterMaxima[1].get( counterName )
 
     # branch information
+    def getSchema( self, cacheDir = None ):
+        ''' Leaves (name, type, counter, nMax) of the tree, read from the first file that can be opened (the chain is not loaded).
+            With cacheDir (default: self.schemaDirectory), schemas are cached per file and tree. See RootTools.core.schema.
+        '''
+        if cacheDir is None: cacheDir = getattr( self, "schemaDirectory", None )
+        if getattr( self, "_schema", None ) is None:
+            for filename in self.files:
+                try:
+                    self._schema = schema.get_schema( filename, self.treeName, cacheDir = cacheDir )
+                    break
+                except IOError as e:
+                    logger.warning( "Could not read schema from %s: %s", filename, e )
+            else:
+                raise helpers.EmptySampleError( "No readable file for sample %s." % self.name )
+        return self._schema
+
+    def treeVariables( self, *patterns, **kwargs ):
+        ''' TreeVariables for the leaves matching the patterns (e.g. 'Jet_*', 'met_pt'), made from the schema.
+            Vectors are named by their counter ('nJet' -> 'Jet'). Keyword argument: cacheDir (see getSchema).
+        '''
+        return schema.tree_variables( self.getSchema( cacheDir = kwargs.get( 'cacheDir' ) ), patterns = patterns if len( patterns ) > 0 else ["*"] )
+
     @property
     def leaves( self ):
-        ''' Get the leaves in the chain
+        ''' Get the leaves of the tree (from the schema)
         '''
-        if hasattr( self, "__leaves" ):
-            return self.__leaves
-        else:
-            self.__leaves = [ {'name':s.GetName(), 'type':s.GetTypeName()} for s in  self.chain.GetListOfLeaves() ]
-            return self.__leaves 
+        if getattr( self, "_leaves", None ) is None:
+            self._leaves = [ {'name':l['name'], 'type':l['type']} for l in self.getSchema() ]
+        return self._leaves
 
     def clear(self): 
         ''' Really (in the ROOT namespace) delete the chain
@@ -745,9 +981,21 @@ class Sample ( SampleBase ): # 'object' argument will disappear in Python 3
             logger.debug("Called TChain Destructor for sample '%s'.", self.name)
 
             self._chain = None
-
-        if hasattr(self, "__leaves"):
-            del self.__leaves
+            self._attached_friends = set()
+            if hasattr( self, "_index" ):
+                del self._index
+
+            # staged files may be evicted again
+            if getattr( self, "stager", None ) is not None:
+                for f in getattr( self, "_stagedFiles", () ):
+                    self.stager.release( f )
+            self._stagedFiles = set()
+            self._treeOffsets = None
+            self._stagedTree  = None
+
+        self._leaves = None
+        self._schema = None
+        self._counterMaxima = None
 
         return
 
@@ -763,12 +1011,13 @@ class Sample ( SampleBase ): # 'object' argument will disappear in Python 3
         if len(filenames)!=len(other_filenames):
             raise RuntimeError( "Can not sort files of sample %s according to sample %s because lengths are different: %i != %i", self.name, sample.name, len(self.files), len(sample.files) ) 
 
+        positions = { f:i for i, f in enumerate( filenames ) }
         new_filelist = []
         for f in other_filenames:
             # find position of file from other sample
             try:
-                index = filenames.index(f)
-            except ValueError:
+                index = positions[f]
+            except KeyError:
                 logger.error("Can not file %s from sample %s in files of sample %s", f, sample.name, self.name)
                 raise
 
@@ -780,14 +1029,42 @@ class Sample ( SampleBase ): # 'object' argument will disappear in Python 3
         self.files = new_filelist
         return self
 
-    def addFriend( self, other_sample, treeName, sortFiles = False):
+    def addFriend( self, other_sample, treeName, sortFiles = False, index = None, indexDirectory = None, lazy = False):
         ''' Friend a chain from another sample.
+            Without 'index', the entries of both chains must be aligned (use sortFiles to order the files alike).
+            With index = (major, minor), e.g. ("run", "luminosityBlock*1000000+event"), entries are matched by these keys through
+            a TTreeIndex of the friend, i.e. the friend can have a different file splitting and order. The index is stored
+            in 'indexDirectory', if given.
+            With 'lazy', the friend chain is only loaded when its branches are used (see activateFriends).
         '''
+        if sortFiles and index is not None:
+            raise ValueError( "Friends with an index need no sorting of files." )
+        if index is not None and type(index) == type(""):
+            index = ( index, "0" )
         if sortFiles:
             other_sample.sortFiles( self )
 
         # Add Chains 
         self.friends.append( (other_sample, treeName) )
+        if not hasattr( self, 'friend_options' ):
+            self.friend_options = {}
+        options = {}
+        if index is not None:
+            options['index'] = tuple( index )
+            options['indexDirectory'] = indexDirectory
+        if lazy:
+            options['lazy'] = True
+        if options:
+            self.friend_options[len(self.friends)-1] = options
+
+        # attach to an already loaded chain
+        if self._chain and not lazy:
+            self.__attachFriend( len(self.friends)-1 )
+
+    def hasEntryAlignedFriends( self ):
+        ''' Whether friends without an index are added, i.e. friends whose entries are aligned with the entries of the chain.
+        '''
+        return any( self.__friendOptions( i ).get( 'index' ) is None for i in xrange( len( getattr( self, 'friends', [] ) ) ) )
 
     def treeReader(self, *args, **kwargs):
         ''' Return a Reader class for the sample
@@ -822,19 +1099,254 @@ class Sample ( SampleBase ): # 'object' argument will disappear in Python 3
                 self.name, weightString )
             return weightString
 
+    def buildZoneMaps(self, branches, directory = None, nThreads = 1):
+        ''' Write zone maps (per file and per cluster min/max of 'branches') next to the files or in 'directory'
+            and use them to skip files and clusters that can not pass simple threshold cuts of selection strings.
+        '''
+        helpers.parallel_map( zonemap._build, [ ( f, self.treeName, branches, directory ) for f in self.files ], nThreads = nThreads )
+        self.useZoneMaps      = True
+        self.zoneMapDirectory = directory
+        self._zoneMaps        = {}
+
+    def zoneMapRanges(self, selectionString):
+        ''' Ranges (first, n) of entries of self.chain that can pass selectionString according to the zone maps.
+            None if all entries have to be read (zone maps not used or missing, friends aligned by entry, no cuts).
+        '''
+        if not getattr( self, "useZoneMaps", False ): return None
+        cuts = zonemap.parse_cuts( selectionString )
+        if len( cuts ) == 0: return None
+        # friends without index must stay aligned with the chain
+        if self.hasEntryAlignedFriends():
+            return None
+
+        if not hasattr( self, "_zoneMaps" ): self._zoneMaps = {}
+        zone_maps = []
+        # the original files, i.e. not the staged copies (set when the chain is loaded)
+        if not self._chain: self.chain
+        for filename in self._chainFiles:
+            if filename not in self._zoneMaps:
+                self._zoneMaps[filename] = zonemap.load( filename, self.treeName, self.zoneMapDirectory )
+            if self._zoneMaps[filename] is None:
+                logger.debug( "No zone map for file %s of sample %s. Reading all entries.", filename, self.name )
+                return None
+            zone_maps.append( self._zoneMaps[filename] )
+
+        ranges = zonemap.entry_ranges( zone_maps, cuts )
+        logger.debug( "Zone maps of sample %s: %i of %i entries in %i ranges can pass %s", self.name, sum( n for first, n in ranges ), sum( z['entries'] for z in zone_maps ), len( ranges ), selectionString )
+        return ranges
+
+    def __treeOffsets(self):
+        ''' First entry of each tree of self.chain and the number of entries.
+        '''
+        if getattr( self, "_treeOffsets", None ) is None:
+            nTrees  = self.chain.GetNtrees()
+            # fills the offsets
+            self.chain.GetEntries()
+            offsets = self.chain.GetTreeOffset()
+            self._treeOffsets = [ offsets[i] for i in xrange( nTrees + 1 ) ]
+        return self._treeOffsets
+
+    def stageTree(self, i_tree):
+        ''' With a stager: read tree number i_tree of self.chain from a local copy and copy the next files in the background.
+            Files of other trees are released (except the prefetched ones) and read from their original location again.
+            The copy is only used when the chain loads the tree, i.e. call this before the first entry of the tree is read.
+        '''
+        stager = getattr( self, "stager", None )
+        if stager is None: return
+        elements = self.chain.GetListOfFiles()
+        if self._stagedTree == i_tree: return
+        # the sample holds one reference in the stager to each file in the window
+        window   = set( self._chainFiles[i_tree:i_tree + 1 + stager.prefetch] )
+        for i, f in enumerate( self._chainFiles ):
+            if f not in window and f in self._stagedFiles:
+                elements.At( i ).SetTitle( f )
+                stager.release( f )
+                self._stagedFiles.discard( f )
+        filename = self._chainFiles[i_tree]
+        try:
+            elements.At( i_tree ).SetTitle( stager.stage( filename, reference = filename not in self._stagedFiles ) )
+            self._stagedFiles.add( filename )
+        except (IOError, OSError) as e:
+            logger.error( "Could not stage %s, reading it from its original location: %s", filename, e )
+        prefetch = [ f for f in self._chainFiles[i_tree + 1:i_tree + 1 + stager.prefetch] if f not in self._stagedFiles ]
+        stager.prefetchFiles( prefetch )
+        self._stagedFiles.update( prefetch )
+        self._stagedTree = i_tree
+
+    def stageEntry(self, entry):
+        ''' With a stager: stage the tree of entry (see stageTree) if the chain moves to another tree.
+        '''
+        if getattr( self, "stager", None ) is None: return
+        offsets = self.__treeOffsets()
+        if self._stagedTree is not None and offsets[self._stagedTree] <= entry < offsets[self._stagedTree + 1]: return
+        self.stageTree( bisect.bisect_right( offsets, entry ) - 1 )
+
+    def __stagedRanges(self, ranges):
+        ''' Entry ranges (first, n) split at the tree boundaries of self.chain; each tree is staged before its range is returned.
+        '''
+        offsets = self.__treeOffsets()
+        for first, n in ranges if ranges is not None else [ ( 0, offsets[-1] ) ]:
+            last = first + n
+            while first < last:
+                i_tree = bisect.bisect_right( offsets, first ) - 1
+                if i_tree >= len( offsets ) - 1: break
+                self.stageTree( i_tree )
+                end = min( last, offsets[i_tree + 1] )
+                yield first, end - first
+                first = end
+
+    def __draw(self, target, varexp, selection, option, ranges):
+        ''' self.chain.Draw(varexp>>target) restricted to entry ranges (all entries for ranges = None). The target is added to.
+            With a stager, the chain is drawn file by file from the local copies.
+        '''
+        if getattr( self, "stager", None ) is not None:
+            ranges = self.__stagedRanges( ranges )
+        if ranges is None:
+            self.chain.Draw( varexp+">>+"+target, selection, option )
+        else:
+            for first, n in ranges:
+                self.chain.Draw( varexp+">>+"+target, selection, option, n, first )
+
     def getEventList(self, selectionString=None):
         ''' Get a TEventList from a selectionString (combined with self.selectionString, if exists).
         '''
 
         selectionString_ = self.combineWithSampleSelection( selectionString )
 
+        self.activateFriends( selectionString_ )
         tmp=str(uuid.uuid4())
         logger.debug( "Making event list for sample %s and selectionString %s", self.name, selectionString_ )
-        self.chain.Draw('>>'+tmp, selectionString_ if selectionString_ else "(1)")
+        ranges = self.zoneMapRanges( selectionString_ )
+        if ranges is not None and len( ranges ) == 0:
+            return ROOT.TEventList( tmp, tmp )
+        self.__draw( tmp, '', selectionString_ if selectionString_ else "(1)", '', ranges )
         elistTMP_t = ROOT.gDirectory.Get(tmp)
 
         return elistTMP_t
 
+    def getEntryList(self, selectionString=None):
+        ''' Get an EntryList (per tree TEntryList) from a selectionString (combined with self.selectionString, if exists).
+            Trees without selected entries are skipped when reading through the list.
+        '''
+        from RootTools.core.EntryList import EntryList
+
+        selectionString_ = self.combineWithSampleSelection( selectionString )
+
+        self.activateFriends( selectionString_ )
+        tmp=str(uuid.uuid4())
+        logger.debug( "Making entry list for sample %s and selectionString %s", self.name, selectionString_ )
+        ranges = self.zoneMapRanges( selectionString_ )
+        if ranges is not None and len( ranges ) == 0:
+            return EntryList( self.chain, ROOT.TEntryList( tmp, tmp ) )
+        self.__draw( tmp, '', selectionString_ if selectionString_ else "(1)", 'entrylist', ranges )
+        elistTMP_t = ROOT.gDirectory.Get(tmp)
+
+        return EntryList( self.chain, elistTMP_t )
+
+    def getSelectionIndex(self, selectionString=None, cacheDir=None):
+        ''' SelectionIndex of the entries passing selectionString (combined with self.selectionString, if exists).
+            The top level AND-ed terms (helpers.conjuncts, i.e. a selection with a top level '||' is a single term)
+            are evaluated one after another, each only on the entries selected by the previous terms.
+            The result of each term is cached (in memory and, with cacheDir, on disk) together with the terms it was
+            evaluated after and reused when these are among the previous terms, e.g. for N-1 selections and cutflows.
+        '''
+        selectionString_ = self.combineWithSampleSelection( selectionString )
+        index = SelectionIndex.all( self.chain.GetEntries() )
+        if not selectionString_:
+            return index
+
+        previous = []
+        for term in helpers.conjuncts( selectionString_ ):
+            index = index & self.__termIndex( term, previous, index, cacheDir )
+            previous.append( term )
+        return index
+
+    def __termIndex(self, term, previous, parent, cacheDir):
+        ''' SelectionIndex of term, evaluated on the entries of 'parent' (the entries passing the terms in 'previous') or on more entries.
+        '''
+        fingerprint = self.fingerprint()
+        if not hasattr( self, "_selectionIndices" ): self._selectionIndices = {}
+        cached = self._selectionIndices.setdefault( ( fingerprint, term ), [] )
+
+        # in memory: any result evaluated after a subset of the previous terms
+        for domain, index in cached:
+            if domain.issubset( previous ):
+                logger.debug( "Selection index of term %s for sample %s from memory.", term, self.name )
+                return index
+
+        # on disk: evaluated on all entries or after the previous terms
+        def filename( domain ):
+            return os.path.join( cacheDir, "selection_%s.pkl" % hashlib.md5( repr( [ fingerprint, term, sorted( domain ) ] ) ).hexdigest() )
+        if cacheDir is not None:
+            for domain in [ [], previous ]:
+                if os.path.exists( filename( domain ) ):
+                    with open( filename( domain ), 'rb' ) as f:
+                        index = pickle.load( f )
+                    cached.append( ( frozenset( domain ), index ) )
+                    logger.debug( "Selection index of term %s for sample %s from %s.", term, self.name, filename( domain ) )
+                    return index
+
+        # evaluate term on the entries of the parent
+        self.activateFriends( term )
+        tmp = str( uuid.uuid4() )
+        logger.debug( "Evaluating term %s for sample %s on %i entries.", term, self.name, parent.GetN() )
+        ranges = self.zoneMapRanges( term ) if len( previous ) == 0 else None
+        if parent.GetN() == 0 or ( ranges is not None and len( ranges ) == 0 ):
+            index = SelectionIndex( parent.n )
+        else:
+            if len( previous ) == 0:
+                self.__draw( tmp, '', term, '', ranges )
+            else:
+                parentList = parent.toEventList( tmp + "_parent" )
+                self.chain.SetEventList( parentList )
+                try:
+                    self.chain.Draw( '>>'+tmp, term )
+                finally:
+                    self.chain.SetEventList( getattr( ROOT, "nullptr", 0 ) )
+            eventList = ROOT.gDirectory.Get( tmp )
+            index = SelectionIndex.fromEventList( parent.n, eventList )
+            ROOT.gDirectory.Remove( eventList )
+
+        cached.append( ( frozenset( previous ), index ) )
+        if cacheDir is not None:
+            if not os.path.exists( cacheDir ):
+                os.makedirs( cacheDir )
+            tmp_filename = filename( previous ) + "." + tmp
+            with open( tmp_filename, 'wb' ) as f:
+                pickle.dump( index, f, pickle.HIGHEST_PROTOCOL )
+            os.rename( tmp_filename, filename( previous ) )
+        return index
+
+    def getRDataFrame(self, selectionString=None):
+        ''' Get a ROOT.RDataFrame of self.chain, filtered with selectionString (combined with self.selectionString, if exists).
+            Nothing is run until a result is requested. The chain must outlive the data frame.
+        '''
+        if not hasattr( ROOT.ROOT, "RDataFrame" ):
+            raise RuntimeError( "ROOT %s has no RDataFrame." % ROOT.gROOT.GetVersion() )
+
+        # columns are not known in advance
+        self.activateFriends()
+        df = ROOT.ROOT.RDataFrame( self.chain )
+        selectionString_ = self.combineWithSampleSelection( selectionString )
+        if helpers.usesDrawSyntax( selectionString_ ):
+            raise ValueError( "selectionString %s of sample %s uses TTree::Draw syntax that RDataFrame can not compile." % ( selectionString_, self.name ) )
+        if selectionString_:
+            logger.debug( "Making RDataFrame for sample %s and selectionString %s", self.name, selectionString_ )
+            df = df.Filter( selectionString_ )
+
+        return df
+
+    def fingerprint(self, withFiles = True):
+        ''' md5 hex digest identifying the content of the sample: treeName, selection and weight strings, friends and, if withFiles,
+            the files with their sizes and modification times (local files only).
+        '''
+        friends = [ ( friend.fingerprint( withFiles = withFiles ), treeName ) + ( ( self.__friendOptions( i )['index'], ) if self.__friendOptions( i ).get( 'index' ) is not None else () )
+            for i, ( friend, treeName ) in enumerate( getattr( self, "friends", [] ) ) ]
+        tokens = [ self.treeName, self.selectionString, self.weightString, friends ]
+        if withFiles:
+            tokens.append( [ helpers.file_signature( f ) for f in self.files ] )
+        return hashlib.md5( repr( tokens ) ).hexdigest()
+
     def getYieldFromDraw(self, selectionString = None, weightString = None, split = 1):
         ''' Get yield from self.chain according to a selectionString and a weightString
         ''' 
@@ -846,12 +1358,13 @@ class Sample ( SampleBase ): # 'object' argument will disappear in Python 3
             selectionString_ = self.combineWithSampleSelection( selectionString )
             weightString_    = self.combineWithSampleWeight( weightString )
 
+            self.activateFriends( selectionString_, weightString_ )
             tmp=str(uuid.uuid4())
             h = ROOT.TH1D(tmp, tmp, 1,0,2)
             h.Sumw2()
             #weight = weightString if weightString else "1"
             logger.debug( "getYieldFromDraw for sample %s with chain %r", self.name, self.chain )
-            self.chain.Draw("1>>"+tmp, "("+weightString_+")*("+selectionString_+")", 'goff')
+            self.__draw( tmp, "1", "("+weightString_+")*("+selectionString_+")", 'goff', self.zoneMapRanges( selectionString_ ) )
             res = h.GetBinContent(1)
             resErr = h.GetBinError(1)
             del h
@@ -863,6 +1376,21 @@ class Sample ( SampleBase ): # 'object' argument will disappear in Python 3
         else:
             raise ValueError( "Can't split into %r. Need positive integer." % split )
 
+    def getYields(self, selections, weightString = None, cutflow = False):
+        ''' Get yields {'val', 'sigma'} for a list of selectionStrings (each combined with self.selectionString, if exists)
+            and a weightString in a single pass over self.chain. With cutflow, the selections are sequential steps.
+        '''
+        weightString_ = self.combineWithSampleWeight( weightString )
+        self.activateFriends( *( [ self.selectionString, weightString_ ] + [ s for s in selections if s ] ) )
+
+        # zone maps can prune with the sample selection and, for a cutflow, with the first step
+        ranges = self.zoneMapRanges( self.combineWithSampleSelection( selections[0] if cutflow and len( selections ) > 0 else None ) )
+        if ranges is not None and len( ranges ) == 0:
+            return [ {'val':0., 'sigma':0.} for s in selections ]
+
+        logger.debug( "getYields for sample %s: %i selections in one pass", self.name, len( selections ) )
+        return yields.fill( self.chain, selections, baseSelection = self.selectionString, weightString = weightString_, cutflow = cutflow, ranges = ranges )
+
     def get1DHistoFromDraw(self, variableString, binning, selectionString = None, weightString = None, binningIsExplicit = False, addOverFlowBin = None, isProfile = False):
         ''' Get TH1D/TProfile1D from draw command using selectionString, weight. If binningIsExplicit is true, 
             the binning argument (a list) is translated into variable bin widths. 
@@ -890,7 +1418,8 @@ class Sample ( SampleBase ): # 'object' argument will disappear in Python 3
 
         #weight = weightString if weightString else "1"
 
-        self.chain.Draw(variableString+">>"+tmp, "("+weightString_+")*("+selectionString_+")", 'goff')
+        self.activateFriends( variableString, selectionString_, weightString_ )
+        self.__draw( tmp, variableString, "("+weightString_+")*("+selectionString_+")", 'goff', self.zoneMapRanges( selectionString_ ) )
        
         Plot.addOverFlowBin1D( res, addOverFlowBin )
  
@@ -924,7 +1453,8 @@ class Sample ( SampleBase ): # 'object' argument will disappear in Python 3
         else:
                 res = ROOT.TH2D(tmp, tmp, *binningArgs)
 
-        self.chain.Draw(variableString+">>"+tmp, "("+weightString_+")*("+selectionString_+")", 'goff')
+        self.activateFriends( variableString, selectionString_, weightString_ )
+        self.__draw( tmp, variableString, "("+weightString_+")*("+selectionString_+")", 'goff', self.zoneMapRanges( selectionString_ ) )
 
         return res
 
@@ -957,6 +1487,7 @@ class Sample ( SampleBase ): # 'object' argument will disappear in Python 3
         else:
                 res = ROOT.TH3D(tmp, tmp, *binningArgs)
 
-        self.chain.Draw(variableString+">>"+tmp, "("+weightString_+")*("+selectionString_+")", 'goff')
+        self.activateFriends( variableString, selectionString_, weightString_ )
+        self.__draw( tmp, variableString, "("+weightString_+")*("+selectionString_+")", 'goff', self.zoneMapRanges( selectionString_ ) )
 
         return res
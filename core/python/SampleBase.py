@@ -9,6 +9,7 @@ logger      = logging.getLogger(__name__)
 
 # RootTools imports
 import RootTools.core.helpers as helpers
+import RootTools.core.sample_spec as sample_spec
 
 class SampleBase( object ):
     __metaclass__ = abc.ABCMeta
@@ -26,6 +27,30 @@ class SampleBase( object ):
         self.color = color
         self.texName = texName if not texName is None else name
 
+    def _spec_args( self ):
+        ''' Constructor arguments for the spec.
+        '''
+        return {'name':self.name, 'files':list(self.files), 'normalization':self.normalization, 'xSection':self.xSection,
+                'isData':self.isData, 'color':self.color, 'texName':self.texName}
+
+    def to_spec( self ):
+        ''' Compact, picklable description of the sample without ROOT objects. See RootTools.core.sample_spec.
+        '''
+        return sample_spec.to_spec( self, self._spec_args() )
+
+    from_spec = staticmethod( sample_spec.from_spec )
+
+    def __reduce__( self ):
+        # Pickle through the spec
+        return ( sample_spec.from_spec, ( self.to_spec(), ) )
+
+    # Copies do not go through the spec (__reduce__)
+    def __copy__( self ):
+        return sample_spec.plain_copy( self )
+
+    def __deepcopy__( self, memo ):
+        return sample_spec.plain_deepcopy( self, memo )
+
     def reduceFiles( self, factor = 1, to = None ):
         ''' Reduce number of files in the sample
         '''
@@ -0,0 +1,218 @@
+''' Compressed index of selected entries of a chain with set algebra (&, |, -, ~).
+Entries are split in chunks of 2**16 by their high bits (as in roaring bitmaps). A chunk is stored as a sorted array of
+the low 16 bits if it has few entries and as a bitmap (a python long with 2**16 bits) otherwise.
+Can be used instead of an EntryList in TreeReader (GetN, GetEntry, entries).
+'''
+
+# Standard imports
+import binascii
+import bisect
+from array import array
+
+# Logging
+import logging
+logger = logging.getLogger(__name__)
+
+_chunk_bits = 16
+_chunk_size = 1 << _chunk_bits
+_low_mask   = _chunk_size - 1
+# chunks with at least this many entries are stored as bitmaps
+_array_max  = 4096
+_full       = ( 1 << _chunk_size ) - 1
+
+def _to_bitmap( container ):
+    if not isinstance( container, array ): return container
+    bits = bytearray( _chunk_size >> 3 )
+    for x in container:
+        bits[x >> 3] |= 1 << ( x & 7 )
+    # little endian bytes -> long
+    return long( binascii.hexlify( bytes( bits[::-1] ) ), 16 )
+
+def _to_array( container ):
+    if isinstance( container, array ): return container
+    return array( 'H', [ i for i, c in enumerate( bin( container )[:1:-1] ) if c == '1' ] )
+
+def _cardinality( container ):
+    return len( container ) if isinstance( container, array ) else bin( container ).count( '1' )
+
+def _normalize( container ):
+    ''' Array or bitmap depending on the number of entries. None for empty containers.
+    '''
+    n = _cardinality( container )
+    if n == 0: return None
+    if n < _array_max: return _to_array( container )
+    return _to_bitmap( container )
+
+def _and( a, b ):
+    if isinstance( a, array ) and isinstance( b, array ):
+        return _normalize( array( 'H', sorted( set( a ) & set( b ) ) ) )
+    if isinstance( a, array ):
+        return _normalize( array( 'H', [ x for x in a if ( b >> x ) & 1 ] ) )
+    if isinstance( b, array ):
+        return _normalize( array( 'H', [ x for x in b if ( a >> x ) & 1 ] ) )
+    return _normalize( a & b )
+
+def _or( a, b ):
+    if isinstance( a, array ) and isinstance( b, array ) and len( a ) + len( b ) < _array_max:
+        return _normalize( array( 'H', sorted( set( a ) | set( b ) ) ) )
+    return _normalize( _to_bitmap( a ) | _to_bitmap( b ) )
+
+def _andnot( a, b ):
+    if isinstance( a, array ):
+        if isinstance( b, array ):
+            b = set( b )
+            return _normalize( array( 'H', [ x for x in a if x not in b ] ) )
+        return _normalize( array( 'H', [ x for x in a if not ( b >> x ) & 1 ] ) )
+    return _normalize( a & ~_to_bitmap( b ) )
+
+class SelectionIndex( object ):
+
+    def __init__( self, n, containers = None ):
+        ''' Index of entries in [0, n). 'containers': {high bits: array or bitmap of low bits}
+        '''
+        self.n          = n
+        self.containers = containers if containers is not None else {}
+        self._cache()
+
+    def _cache( self ):
+        # sorted chunk keys and number of entries before each chunk for random access
+        self._keys  = sorted( self.containers.keys() )
+        self._first = []
+        count = 0
+        for key in self._keys:
+            self._first.append( count )
+            count += _cardinality( self.containers[key] )
+        self._count  = count
+        self._arrays = {}
+
+    @classmethod
+    def fromEntries( cls, n, entries ):
+        ''' Index from (not necessarily sorted) entry numbers.
+        '''
+        chunks = {}
+        for entry in entries:
+            entry = int( entry )
+            chunks.setdefault( entry >> _chunk_bits, set() ).add( entry & _low_mask )
+        return cls( n, { key:_normalize( array( 'H', sorted( low ) ) ) for key, low in chunks.iteritems() } )
+
+    @classmethod
+    def fromEventList( cls, n, eventList ):
+        ''' Index from a TEventList (global entries).
+        '''
+        return cls.fromEntries( n, ( eventList.GetEntry( i ) for i in xrange( eventList.GetN() ) ) )
+
+    @classmethod
+    def all( cls, n ):
+        ''' Index with all entries in [0, n).
+        '''
+        containers = { key:_full for key in xrange( n >> _chunk_bits ) }
+        if n & _low_mask:
+            containers[n >> _chunk_bits] = _normalize( ( 1 << ( n & _low_mask ) ) - 1 )
+        return cls( n, containers )
+
+    def _check( self, other ):
+        if not isinstance( other, SelectionIndex ):
+            raise TypeError( "Can not combine SelectionIndex with %r" % other )
+        if other.n != self.n:
+            raise ValueError( "Can not combine indices of chains with %i and %i entries." % ( self.n, other.n ) )
+
+    def __and__( self, other ):
+        self._check( other )
+        containers = {}
+        for key in set( self.containers ) & set( other.containers ):
+            c = _and( self.containers[key], other.containers[key] )
+            if c is not None: containers[key] = c
+        return SelectionIndex( self.n, containers )
+
+    def __or__( self, other ):
+        self._check( other )
+        containers = dict( self.containers )
+        for key, c in other.containers.iteritems():
+            containers[key] = _or( containers[key], c ) if key in containers else c
+        return SelectionIndex( self.n, containers )
+
+    def __sub__( self, other ):
+        self._check( other )
+        containers = {}
+        for key, c in self.containers.iteritems():
+            c = _andnot( c, other.containers[key] ) if key in other.containers else c
+            if c is not None: containers[key] = c
+        return SelectionIndex( self.n, containers )
+
+    def __invert__( self ):
+        return SelectionIndex.all( self.n ) - self
+
+    def __len__( self ):
+        return self._count
+
+    def __nonzero__( self ):
+        # like a TEventList pointer: an empty index is still an index
+        return True
+
+    def __contains__( self, entry ):
+        c = self.containers.get( entry >> _chunk_bits )
+        if c is None: return False
+        low = entry & _low_mask
+        if isinstance( c, array ):
+            i = bisect.bisect_left( c, low )
+            return i < len( c ) and c[i] == low
+        return bool( ( c >> low ) & 1 )
+
+    def __iter__( self ):
+        return self.entries()
+
+    def __eq__( self, other ):
+        return isinstance( other, SelectionIndex ) and self.n == other.n and self._keys == other._keys and \
+            all( _to_array( self.containers[k] ) == _to_array( other.containers[k] ) for k in self._keys )
+
+    def __ne__( self, other ):
+        return not self == other
+
+    def _array( self, i_key ):
+        # low bits of a chunk as array, bitmaps are converted once
+        c = self.containers[self._keys[i_key]]
+        if isinstance( c, array ): return c
+        if i_key not in self._arrays:
+            self._arrays = { i_key:_to_array( c ) }
+        return self._arrays[i_key]
+
+    def GetN( self ):
+        return self._count
+
+    def GetEntry( self, position ):
+        ''' Entry number of the selected entry at 'position'. Sequential access is fast.
+        '''
+        if position < 0 or position >= self._count: return -1
+        i_key = bisect.bisect_right( self._first, position ) - 1
+        return ( self._keys[i_key] << _chunk_bits ) + self._array( i_key )[position - self._first[i_key]]
+
+    def entries( self, start = 0, stop = None ):
+        ''' Iterate over the selected entries at positions [start, stop).
+        '''
+        stop = self._count if stop is None else min( stop, self._count )
+        for i_key, ( key, first ) in enumerate( zip( self._keys, self._first ) ):
+            c = self.containers[key]
+            n = _cardinality( c )
+            if first + n <= start: continue
+            if first >= stop: break
+            offset = key << _chunk_bits
+            low = _to_array( c )
+            for i in xrange( max( start - first, 0 ), min( stop - first, n ) ):
+                yield offset + low[i]
+
+    def toEventList( self, name ):
+        ''' TEventList with the entries (e.g. for TChain.SetEventList).
+        '''
+        import ROOT
+        eventList = ROOT.TEventList( name, name, max( self._count, 1 ) )
+        for entry in self.entries():
+            eventList.Enter( entry )
+        return eventList
+
+    def __getstate__( self ):
+        return { 'n':self.n, 'containers':self.containers }
+
+    def __setstate__( self, state ):
+        self.n          = state['n']
+        self.containers = state['containers']
+        self._cache()
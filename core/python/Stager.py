@@ -0,0 +1,246 @@
+''' Local staging cache for (remote) sample files.
+Files are copied to a local directory (xrdcp for root:// URLs, a plain copy otherwise) and reused by later jobs.
+The cache is kept below a size quota by removing the least recently used files.
+A file is staged when the chain moves to it and the next files are copied in the background while it is read.
+Jobs on the same node share the directory: staged files in use hold a lease file ('<file>.lease_<pid>_<id>') and are
+not evicted by any job while the process holding the lease is alive. Leases and evictions are serialized with a lock file.
+Within a process, users of a Stager (e.g. several samples or readers) hold references to a file; its lease is removed
+when the last reference is released.
+'''
+
+# Standard imports
+import os
+import errno
+import fcntl
+import shutil
+import hashlib
+import subprocess
+import threading
+import uuid
+from contextlib import contextmanager
+
+# Logging
+import logging
+logger = logging.getLogger(__name__)
+
+class Stager( object ):
+
+    def __init__( self, directory, maxSizeGB = None, prefetch = 2 ):
+        ''' 'directory': local cache directory (shared by jobs on the same node),
+            'maxSizeGB': size quota of the directory (None: no quota),
+            'prefetch': number of files that are copied in the background ahead of the file that is used.
+        '''
+        self.directory = directory
+        self.maxSizeGB = maxSizeGB
+        self.prefetch  = prefetch
+
+        if not os.path.exists( self.directory ):
+            os.makedirs( self.directory )
+
+        self._id          = str( uuid.uuid4() )[:8]
+        self._lock        = threading.Lock()
+        # filename -> threading.Event for copies in progress
+        self._in_progress = {}
+        # filename -> lease file of this instance
+        self._leases      = {}
+        # filename -> number of references (stage, prefetchFiles) not yet released
+        self._references  = {}
+
+    def __reduce__( self ):
+        # Threads, locks and leases are not pickled
+        return ( Stager, ( self.directory, self.maxSizeGB, self.prefetch ) )
+
+    def localFilename( self, filename ):
+        ''' Path of the staged copy of filename.
+        '''
+        return os.path.join( self.directory, "%s_%s" % ( hashlib.md5( filename ).hexdigest()[:16], os.path.basename( filename ) ) )
+
+    @contextmanager
+    def _directoryLock( self ):
+        # exclusive lock shared by all jobs using the directory
+        with self._lock:
+            with open( os.path.join( self.directory, ".lock" ), 'a' ) as f:
+                fcntl.flock( f, fcntl.LOCK_EX )
+                try:
+                    yield
+                finally:
+                    fcntl.flock( f, fcntl.LOCK_UN )
+
+    def _lease( self, filename, target ):
+        # with the directory lock (which holds self._lock)
+        # least recently used -> latest modification time
+        os.utime( target, None )
+        # released while it was copied
+        if self._references.get( filename, 0 ) == 0 or filename in self._leases: return
+        lease = "%s.lease_%i_%s" % ( target, os.getpid(), self._id )
+        open( lease, 'w' ).close()
+        self._leases[filename] = lease
+
+    def _copy( self, filename, tmp ):
+        if filename.startswith( 'root://' ):
+            if subprocess.call( [ 'xrdcp', '-f', '-s', filename, tmp ] ) != 0:
+                raise IOError( "xrdcp failed for %s" % filename )
+        else:
+            shutil.copyfile( filename, tmp )
+
+    def stage( self, filename, reference = True ):
+        ''' Local copy of filename. Copies the file if it is not in the cache (waits if another thread copies it).
+            Each call holds a reference to the file until release( filename ) is called; the file is leased while it is referenced.
+            With reference = False, the caller holds a reference already (e.g. from prefetchFiles).
+        '''
+        if reference:
+            self._reference( filename )
+        try:
+            return self._stage( filename )
+        except Exception:
+            if reference:
+                self.release( filename )
+            raise
+
+    def _reference( self, filename ):
+        with self._lock:
+            self._references[filename] = self._references.get( filename, 0 ) + 1
+
+    def _stage( self, filename ):
+        target = self.localFilename( filename )
+        while True:
+            with self._lock:
+                event = self._in_progress.get( filename )
+                if event is None:
+                    event = threading.Event()
+                    self._in_progress[filename] = event
+                    break
+            event.wait()
+
+        try:
+            with self._directoryLock():
+                if os.path.exists( target ):
+                    self._lease( filename, target )
+                    return target
+
+            logger.debug( "Staging %s to %s", filename, target )
+            tmp = target + ".staging_" + str( uuid.uuid4() )
+            try:
+                self._copy( filename, tmp )
+                with self._directoryLock():
+                    os.rename( tmp, target )
+                    self._lease( filename, target )
+            finally:
+                if os.path.exists( tmp ):
+                    os.remove( tmp )
+        finally:
+            with self._lock:
+                del self._in_progress[filename]
+            event.set()
+
+        self.evict()
+        return target
+
+    def isStaged( self, filename ):
+        ''' Whether filename is staged and leased by this instance.
+        '''
+        return filename in self._leases
+
+    def release( self, filename ):
+        ''' Release a reference to filename. Without references, the local copy may be evicted again.
+        '''
+        with self._lock:
+            references = self._references.get( filename, 0 ) - 1
+            if references > 0:
+                self._references[filename] = references
+                return
+            self._references.pop( filename, None )
+            lease = self._leases.pop( filename, None )
+        if lease is None: return
+        try:
+            os.remove( lease )
+        except OSError:
+            pass
+        self.evict()
+
+    def releaseAll( self ):
+        ''' Release all references to all files of this instance.
+        '''
+        with self._lock:
+            filenames = list( self._references.keys() )
+            for filename in filenames:
+                self._references[filename] = 1
+        for filename in filenames:
+            self.release( filename )
+
+    def prefetchFiles( self, files ):
+        ''' Stage files in background threads. A reference to each file is held right away (also if the copy fails),
+            release the files when they are no longer needed.
+        '''
+        for filename in files:
+            self._reference( filename )
+            with self._lock:
+                if filename in self._leases or filename in self._in_progress: continue
+            thread = threading.Thread( target = self._prefetch, args = ( filename, ) )
+            thread.daemon = True
+            thread.start()
+
+    def _prefetch( self, filename ):
+        try:
+            self.stage( filename, reference = False )
+        except Exception as e:
+            # stage() is called again when the file is needed and raises there
+            logger.warning( "Prefetching %s failed: %s", filename, e )
+
+    @staticmethod
+    def _alive( lease ):
+        # leases are '<file>.lease_<pid>_<id>' of processes on this node
+        try:
+            pid = int( lease.rsplit( '.lease_', 1 )[1].split( '_' )[0] )
+            os.kill( pid, 0 )
+        except ValueError:
+            return False
+        except OSError as e:
+            return e.errno == errno.EPERM
+        return True
+
+    def size( self ):
+        ''' Size of the staged files in bytes.
+        '''
+        return sum( os.path.getsize( os.path.join( self.directory, f ) ) for f in os.listdir( self.directory ) )
+
+    def evict( self ):
+        ''' Remove the least recently used files without a lease of a running process until the cache is within its quota.
+        '''
+        if self.maxSizeGB is None: return
+        quota = self.maxSizeGB*1024**3
+        with self._directoryLock():
+            names = os.listdir( self.directory )
+            leased = set()
+            for name in names:
+                if '.lease_' not in name: continue
+                if self._alive( name ):
+                    leased.add( name.rsplit( '.lease_', 1 )[0] )
+                else:
+                    # left by a job that died
+                    try:
+                        os.remove( os.path.join( self.directory, name ) )
+                    except OSError:
+                        pass
+
+            files = []
+            for name in names:
+                path = os.path.join( self.directory, name )
+                try:
+                    stat = os.stat( path )
+                except OSError:
+                    continue
+                files.append( ( stat.st_mtime, stat.st_size, name ) )
+            total = sum( size for mtime, size, name in files )
+            for mtime, size, name in sorted( files ):
+                if total <= quota: break
+                # files in use, copies in progress, leases and the lock file
+                if name in leased or ".staging_" in name or '.lease_' in name or name == ".lock": continue
+                try:
+                    os.remove( os.path.join( self.directory, name ) )
+                    total -= size
+                    logger.debug( "Evicted %s from staging area %s", name, self.directory )
+                except OSError:
+                    pass
+            if total > quota:
+                logger.warning( "Staging area %s exceeds its quota of %s GB with files in use.", self.directory, self.maxSizeGB )
@@ -95,6 +95,9 @@ class TreeMaker( FlatTreeLooperBase ):
         if self.tree: self.tree.IsA().Destructor( self.tree )
 
     def fill(self):
+        # Counters larger than the C arrays would make ROOT read beyond them
+        if not self.event.countersInRange():
+            raise RuntimeError( "Vector counter exceeds nMax: %s" % ", ".join( "%s=%i (nMax %i)" % ( v.counterVariable().name, getattr( self.event, v.counterVariable().name ), v.nMax ) for v in self.variables if isinstance( v, VectorTreeVariable ) ) )
         # Write to TTree
         #self.debugBranchAddresses( prefix = "Filling")
         if self.treeIsExternal:
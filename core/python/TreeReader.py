@@ -4,6 +4,7 @@
 # Standard imports
 import ROOT
 import os
+import copy
 import inspect
 
 # Logging
@@ -14,12 +15,19 @@ logger = logging.getLogger(__name__)
 from RootTools.core.FlatTreeLooperBase import FlatTreeLooperBase
 from RootTools.core.Sample import Sample
 import RootTools.core.helpers as helpers
+import RootTools.core.memoize as memoize
+from RootTools.core.lazy import LazyProducer, LazyAttributes, LazyEvent
 from RootTools.core.TreeVariable import TreeVariable, ScalarTreeVariable, VectorTreeVariable
 from RootTools.core.helpers import shortTypeDict
 
 class TreeReader( FlatTreeLooperBase ):
 
-    def __init__(self, sample, variables=[], sequence = [], selectionString = None, allBranchesActive = False):
+    def __init__(self, sample, variables=[], sequence = [], selectionString = None, allBranchesActive = False, selectionIndex = None, autoVectorSizes = False, nThreads = 1):
+        ''' 'selectionIndex': SelectionIndex of the entries to read (e.g. from Sample.getSelectionIndex), combined with selectionString
+                              and the selectionString of the sample.
+            'autoVectorSizes': vectors without explicit nMax are sized from the counter maxima in the files (see setVectorSizes).
+            'nThreads': processes reading the schemas of the files for autoVectorSizes.
+        '''
 
         # The following checks are 'look before you leap' but I rather have the user know if the input is non-sensical
         if not isinstance(sample, Sample):
@@ -33,6 +41,13 @@ class TreeReader( FlatTreeLooperBase ):
         # Selection string to be applied to the chain
         self.selectionString = selectionString
 
+        # Memoized sequence functions are not run, their outputs are read from friend trees
+        sequence, variables = memoize.resolve( sample, sequence, variables )
+
+        # Lazy producers are evaluated on access of event.<name>, also those in sample.sequence
+        self.lazyProducers = [ s for s in sequence + list( getattr( sample, "sequence", [] ) ) if isinstance(s, LazyProducer) ]
+        sequence = [ s for s in sequence if not isinstance(s, LazyProducer) ]
+
         # Sequence of precomputed attributes for event
         for i, s in enumerate(sequence):
             if not (hasattr(s, '__call__') and len( inspect.getargspec( s ).args )<=2):
@@ -53,9 +68,25 @@ class TreeReader( FlatTreeLooperBase ):
         for s in list(self.variables):
             logger.debug( "Making class with variable %s" %s)
 
+        # size the C arrays of vectors from the maximum of their counters stored in the files
+        if autoVectorSizes:
+            self.setVectorSizes( nThreads = nThreads )
+
         # make class
         self.makeClass( "event", list(self.variables), useSTDVectors = False, addVectorCounters = False)
 
+        # numpy views on the vectors: self.event.arrays.Jet_pt
+        self.makeArrayViews( "event" )
+
+        # lazy attributes (the event is wrapped at the end)
+        self.lazyAttributes = LazyAttributes( self.sample, self.lazyProducers ) if len( self.lazyProducers ) > 0 else None
+
+        # attach lazy friends that provide 'variables' (all of them if all branches are read)
+        if self.allBranchesActive:
+            self.sample.activateFriends()
+        elif len( self.variables ) > 0:
+            self.sample.activateFriends( *sum( [ [ c.name for c in v.components ] if isinstance( v, VectorTreeVariable ) else [ v.name ] for v in self.variables ], [] ) )
+
         # set the addresses of the branches corresponding to 'variables'
         self.setAddresses()
 
@@ -63,7 +94,11 @@ class TreeReader( FlatTreeLooperBase ):
         # Turn on everything for flexibility with the selectionString
         logger.debug("Initializing TreeReader for sample %s", self.sample.name)
         self.activateAllBranches()
-        self._eList = self.sample.getEventList(selectionString = self.selectionString)
+        if selectionIndex is None:
+            self._eList = self.sample.getEntryList(selectionString = self.selectionString)
+        else:
+            # also with the selection of the sample: the index may be made with ~ or | from other selections
+            self._eList = selectionIndex & self.sample.getSelectionIndex(selectionString = self.selectionString)
         self.activateBranches()
         self.nEvents = self._eList.GetN() if  self._eList else self.sample.chain.GetEntries()
         logger.debug("Found %i events in  %s", self.nEvents, self.sample.name)
@@ -71,16 +106,45 @@ class TreeReader( FlatTreeLooperBase ):
         #  default event range of the reader
         self.eventRange = (0, self.nEvents)
 
+        # the event seen by sequences and plots evaluates the lazy attributes
+        if self.lazyAttributes is not None:
+            self.event = LazyEvent( self.event, self.lazyAttributes )
+
+    def setVectorSizes(self, nThreads = 1):
+        ''' nMax of vectors without explicit nMax from the counter maximum in the files (see Sample.counterMaximum).
+            Reads the schemas of all files (cached in sample.schemaDirectory), hence only with autoVectorSizes.
+            The variables are copied, the caller's variables keep their nMax.
+        '''
+        for i, v in enumerate( self.variables ):
+            if not ( isinstance(v, VectorTreeVariable) and getattr( v, 'autoNMax', False ) ): continue
+            counterMaximum = self.sample.counterMaximum( v.counterVariable().name, nThreads = nThreads )
+            if counterMaximum is None: continue
+            self.variables[i] = copy.copy( v )
+            self.variables[i].nMax = max( counterMaximum, 1 )
+            logger.debug( "Vector %s: nMax %i from counter maximum.", v.name, self.variables[i].nMax )
+
+    def checkVectorSizes(self):
+        ''' Raise if the counter maximum of the current tree of the chain (TLeaf::GetMaximum) exceeds nMax of a vector.
+            Checked when the chain moves to a tree, before GetEntry writes the C arrays.
+        '''
+        tree = self.sample.chain.GetTree()
+        for v in self.variables:
+            if not isinstance(v, VectorTreeVariable): continue
+            leaf = tree.GetLeaf( v.counterVariable().name ) if tree else None
+            if leaf and leaf.GetMaximum() > v.nMax:
+                raise RuntimeError( "Vector %s has up to %i entries in %s of sample %s but nMax is %i." % ( v.name, leaf.GetMaximum(), tree.GetCurrentFile().GetName(), self.sample.name, v.nMax ) )
+
     def setAddresses(self):
         ''' Set all the branch addresses to the members in the class instance
         '''
         #for s in LooperBase._branchInfo(self.variables, addVectorCounters = False):
+        event = self.event.struct if isinstance( self.event, LazyEvent ) else self.event
         for s in self.variables:
             if isinstance(s, ScalarTreeVariable ):
-                self.sample.chain.SetBranchAddress(s.name, ROOT.AddressOf(self.event, s.name ))
+                self.sample.chain.SetBranchAddress(s.name, ROOT.AddressOf(event, s.name ))
             elif isinstance(s, VectorTreeVariable ):
                 for comp in s.components:
-                    self.sample.chain.SetBranchAddress(comp.name, ROOT.AddressOf(self.event, comp.name ))
+                    self.sample.chain.SetBranchAddress(comp.name, ROOT.AddressOf(event, comp.name ))
             else:
                 raise ValueError( "Don't know what variable %r is." % s )
  
@@ -89,14 +153,9 @@ class TreeReader( FlatTreeLooperBase ):
         '''
         selectionString = self.selectionString if self.selectionString is not None else "1"
         if self._eList:
-            # If there is an eList, first restrict it to the event range, then clone
-            import uuid
-            name = str(uuid.uuid4())
-            list_to_copy = ROOT.TEventList("tmp","tmp")
-            for i_ev in xrange(*self.eventRange):
-                list_to_copy.Enter(self._eList.GetEntry(i_ev))
-
-            self.sample.chain.GetEntry(list_to_copy.GetEntry(0)) #This is needed to keep branch addresses when running over a few events and >=1 file
+            # If there is an eList, clone the entries in the event range
+            if self.eventRange[1] > self.eventRange[0]:
+                self.sample.chain.GetEntry(self._eList.GetEntry(self.eventRange[0])) #This is needed to keep branch addresses when running over a few events and >=1 file
 
             # activate branches that we want to copy, disable the ones we only need for reading
             self.activateBranches( turnOnReadBranches = False, branchList = branchList )
@@ -111,15 +170,15 @@ class TreeReader( FlatTreeLooperBase ):
 
             # Copying tree
 
-            logger.debug("Copying %i events in a loop.", list_to_copy.GetN())
+            logger.debug("Copying %i events in a loop.", self.eventRange[1] - self.eventRange[0])
             res = self.sample.chain.GetTree().CloneTree( 0 )
-            for i_event in xrange(list_to_copy.GetN()):
-                self.sample.chain.GetEntry( list_to_copy.GetEntry(i_event) )
+            for entry in self._eList.entries( *self.eventRange ):
+                self.sample.chain.GetEntry( entry )
                 res.Fill()
 
             res.Write()
 
-            logger.debug("Number of events: list_to_copy %i res.GetEntries() %i", list_to_copy.GetN(), res.GetEntries())
+            logger.debug("Number of events: eventRange %r res.GetEntries() %i", self.eventRange, res.GetEntries())
 
             # Change back to previous gDirectory
             tmp_directory.cd()
@@ -127,8 +186,6 @@ class TreeReader( FlatTreeLooperBase ):
             # activate what we read, don't activate the ones we just copied
             self.activateBranches( turnOnReadBranches = True, branchList = [] )
 
-            list_to_copy.Delete()
-
             if newTreename is not None: res.SetName( newTreename )
 
             return res 
@@ -172,28 +229,10 @@ class TreeReader( FlatTreeLooperBase ):
         '''
         self.sample.chain.SetBranchStatus("*", 1)
 
-#    def readLeafInfo(self):
-#        ''' Read information on the leaves from the chain and store in dict
-#            FIXME: Pretty sure this doesn't yet work for fixed sized vectors
-#        '''
-#        leafInfo = []
-#        for s in self.sample.chain.GetListOfLeaves():
-#            leaf = {'type':shortTypeDict[s.GetTypeName()], 'name':s.GetName()}
-#            countval = array.array('i',[-9999])
-#            pointer = s.GetLeafCounter(countval)
-#            leaf['dim'] = 'scalar'
-#            if pointer:
-#                # Vector
-#                # GetLeafCounter returns countval==1 if a counter leaf was found and pointer points to that leaf
-#                # https://root.cern.ch/doc/master/classTLeaf.html#a062bd89a11fd1f922c096e66d2601ab6
-#                if countval[0]==1:
-#                    leaf['counterInt'] = pointer.GetName()
-#                leaf['dim'] = 'vector'
-#            else:
-#                # For fixed size arrays, the pointer is zero and the countval is the size of the array
-#                leaf['nMax'] = countval[0]
-#            leafInfo.append(leaf)
-#        return leafInfo
+    def readLeafInfo(self):
+        ''' Information on the leaves of the sample (name, type, counter, nMax) from its schema.
+        '''
+        return self.sample.getSchema()
 
     def getEventRanges(self, maxFileSizeMB = None, maxNEvents = None, nJobs = None, minJobs = None):
         '''For convinience: Define splitting of sample according to various criteria
@@ -235,9 +274,15 @@ class TreeReader( FlatTreeLooperBase ):
         '''
         # set to the first position, either 0 or the lower eventRange deliminator
         self.position = self.eventRange[0]
+        # tree of the chain whose counter maxima were checked
+        self.__treeNumber = -1
 
-        # Check if we need to run a sequence for our sample. 
-        self.__sequence = self.sequence + self.sample.sequence if hasattr(self.sample, "sequence") else self.sequence
+        # Check if we need to run a sequence for our sample. Lazy producers in it are installed in __init__.
+        sample_sequence = getattr( self.sample, "sequence", [] )
+        for s in sample_sequence:
+            if isinstance( s, LazyProducer ) and s not in self.lazyProducers:
+                raise ValueError( "Lazy attribute %s was added to the sequence of sample %s after the reader was made." % ( s.name, self.sample.name ) )
+        self.__sequence = self.sequence + [ s for s in sample_sequence if not isinstance( s, LazyProducer ) ]
 
         return
 
@@ -256,13 +301,25 @@ class TreeReader( FlatTreeLooperBase ):
 
         # init struct
         self.event.init()
+        if self.lazyAttributes is not None:
+            self.lazyAttributes.reset()
 
         # get entry 
         errorLevel = ROOT.gErrorIgnoreLevel
         ROOT.gErrorIgnoreLevel = 3000
-        self.sample.chain.GetEntry ( self._eList.GetEntry( self.position ) ) if self._eList else self.sample.chain.GetEntry( self.position )
+        entry = self._eList.GetEntry( self.position ) if self._eList else self.position
+        # with a stager, read the file from its local copy and prefetch the next ones while it is processed
+        self.sample.stageEntry( entry )
+        if self.sample.chain.LoadTree( entry ) >= 0 and self.sample.chain.GetTreeNumber() != self.__treeNumber:
+            self.__treeNumber = self.sample.chain.GetTreeNumber()
+            self.checkVectorSizes()
+        self.sample.chain.GetEntry( entry )
         ROOT.gErrorIgnoreLevel = errorLevel
 
+        # counters that are read (e.g. files without counter maxima)
+        if not self.event.countersInRange():
+            raise RuntimeError( "Vector counter exceeds nMax at position %i of sample %s." % ( self.position, self.sample.name ) )
+
         # sequence
         for func in self.__sequence:
             func ( event = self.event, sample = self.sample ) 
@@ -77,13 +77,15 @@ class VectorTreeVariable( TreeVariable ):
         ''' Initialize variable.
             'components': list of ScalarTreeVariable 
             default is the value the variable will be initialized with,
-            nMax is the maximal length of the vector in memory (if not specified: 100)
+            nMax is the maximal length of the vector in memory (if not specified: 100,
+            readers with autoVectorSizes take it from the maximum of the counter stored in the tree)
         '''
         self.name = name
         # Scalar components
         self._components = [ ScalarTreeVariable.fromString("%s_%s"%(self.name, x) ) if type(x)==type("") else x for x in components ]
 
         self.nMax = int(nMax) if nMax is not None else 100
+        self.autoNMax = nMax is None
 
     @classmethod
     def fromString(cls, string, nMax = None):
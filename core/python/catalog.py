@@ -0,0 +1,102 @@
+''' Resolution of sample catalogs (dasgoclient, xrdfs).
+    External commands go through 'query' which retries with backoff and shares its results between samples.
+    'resolve' constructs a list of samples concurrently.
+'''
+
+# Standard imports
+import ROOT
+import time
+import shlex
+import subprocess
+import threading
+
+# Logging
+import logging
+logger = logging.getLogger(__name__)
+
+# Results of external commands, shared by all samples and threads
+_cache      = {}
+_cacheLock  = threading.Lock()
+_queryLocks = {}
+
+def clearCache():
+    ''' Forget all results of previous queries.
+    '''
+    with _cacheLock:
+        _cache.clear()
+        _queryLocks.clear()
+
+def query( cmd, retries = 5, backoff = 0.5, maxBackoff = 4, useCache = True, check = True ):
+    ''' Run external command 'cmd' (string or list) and return its output.
+        Failed calls are retried 'retries' times with exponential backoff, starting with 'backoff' seconds (at most 'maxBackoff').
+        With check = False, the output of a command that keeps failing is returned (empty if it can not be run), like os.popen.
+        Identical queries are executed only once per process if 'useCache' is True. Failed queries are not cached.
+    '''
+    if isinstance( cmd, basestring ):
+        cmd = shlex.split( cmd )
+    key = tuple( cmd )
+
+    with _cacheLock:
+        if useCache and key in _cache:
+            logger.debug( "Query from cache: %s", " ".join( cmd ) )
+            return _cache[key]
+        queryLock = _queryLocks.setdefault( key, threading.Lock() )
+
+    # Identical queries from other threads wait for the first one
+    with queryLock:
+        with _cacheLock:
+            if useCache and key in _cache:
+                return _cache[key]
+
+        failed = False
+        for i in range( retries + 1 ):
+            try:
+                output = subprocess.check_output( cmd )
+                break
+            except ( subprocess.CalledProcessError, OSError ) as e:
+                if i == retries:
+                    logger.error( "Query failed after %i attempts: %s", retries + 1, " ".join( cmd ) )
+                    if check: raise
+                    output = getattr( e, 'output', None ) or ""
+                    failed = True
+                    break
+                wait = min( backoff * 2**i, maxBackoff )
+                logger.warning( "Query failed (%s), retrying in %3.1f s: %s", e, wait, " ".join( cmd ) )
+                time.sleep( wait )
+
+        if useCache and not failed:
+            with _cacheLock:
+                _cache[key] = output
+
+    return output
+
+def resolve( definitions, nThreads = 8 ):
+    ''' Create samples concurrently. A definition is (factory, kwargs) or (factory, args, kwargs), e.g.
+        resolve( [ (Sample.nanoAODfromDAS, {'name':'TTLep', 'DASname':'/TTTo2L2Nu.../NANOAODSIM', 'dbFile':dbFile}), ... ] )
+        At most 'nThreads' definitions (and hence external commands) are processed at the same time.
+        Returns the samples in the order of the definitions.
+    '''
+    calls = []
+    for definition in definitions:
+        if len( definition ) == 2:
+            calls.append( ( definition[0], (), definition[1] ) )
+        elif len( definition ) == 3:
+            calls.append( tuple( definition ) )
+        else:
+            raise ValueError( "Sample definition must be (factory, kwargs) or (factory, args, kwargs). Got %r" % ( definition, ) )
+
+    if nThreads is None or nThreads <= 1 or len( calls ) <= 1:
+        return [ factory( *args, **kwargs ) for factory, args, kwargs in calls ]
+
+    # Factories may open ROOT files (e.g. for the normalization)
+    if hasattr( ROOT.ROOT, "EnableThreadSafety" ):
+        ROOT.ROOT.EnableThreadSafety()
+
+    from multiprocessing.pool import ThreadPool
+    pool = ThreadPool( min( nThreads, len( calls ) ) )
+    logger.info( "Resolving %i sample definitions with %i threads.", len( calls ), min( nThreads, len( calls ) ) )
+    try:
+        return pool.map( lambda call: call[0]( *call[1], **call[2] ), calls )
+    finally:
+        pool.close()
+        pool.join()
@@ -1,5 +1,21 @@
 ''' Collection of helpers for usage with cmg
 '''
+# Standard imports
+import ROOT
+import os
+import json
+import tarfile
+
+# Logging
+import logging
+logger = logging.getLogger(__name__)
+
+# RootTools imports
+import RootTools.core.helpers as helpers
+
+# Default name of the manifest in the base directory
+manifest_filename = "RootTools_manifest.json"
+
 def read_cmg_normalization( file ):
     sumW = None
     allEvents = None
@@ -9,3 +25,106 @@ def read_cmg_normalization( file ):
     if sumW is not None: return sumW
     else:                return allEvents
 
+def _signature( filename ):
+    ''' [size, mtime] of a local file
+    '''
+    return list( helpers.file_signature( filename )[1:] )
+
+def _tree_entries( filename, treeName ):
+    ''' Number of entries of tree 'treeName' in filename. None if the file is broken or the tree is missing.
+    '''
+    rf = ROOT.TFile.Open( filename )
+    if not rf: return None
+    entries = None
+    if not rf.IsZombie() and not rf.TestBit( ROOT.TFile.kRecovered ) and rf.GetListOfKeys().Contains( treeName ):
+        entries = int( rf.Get( treeName ).GetEntries() )
+    rf.Close()
+    return entries
+
+def scan_cmg_chunk( args ):
+    ''' Find tree file and normalization in a CMG chunk directory. Module level for multiprocessing.
+    '''
+    chunkDirectory, treeFilename, treeName = args
+    logger.debug("Reading chunk %s", chunkDirectory)
+
+    result = {'treeFilename':treeFilename, 'treeName':treeName, 'chunkMtime':os.path.getmtime( chunkDirectory ),
+              'file':None, 'sumW':None, 'entries':None, 'signatures':{} }
+
+    for root, subFolders, filenames in os.walk( chunkDirectory ):
+        # Determine normalization constant
+        if 'SkimReport.txt' in filenames:
+            skimReportFilename = os.path.join(root, 'SkimReport.txt')
+            with open(skimReportFilename, 'r') as fin:
+                result['sumW'] = read_cmg_normalization(fin)
+            result['signatures'][skimReportFilename] = _signature( skimReportFilename )
+            if not result['sumW']:
+                logger.warning( "Read chunk %s and found report '%s' but could not read normalization.",
+                                     chunkDirectory, skimReportFilename )
+        # Find treefile
+        if treeFilename in filenames:
+            result['file'] = os.path.join(root, treeFilename)
+            result['signatures'][result['file']] = _signature( result['file'] )
+
+    if result['file'] is not None:
+        # Checking whether root file is OK and contains a tree
+        result['entries'] = _tree_entries( result['file'], treeName )
+        if result['entries'] is None:
+            logger.warning( "Read chunk %s and found tree file '%s' but file looks broken.",  chunkDirectory, result['file'] )
+
+    return result
+
+def scan_cmg_crab_job( args ):
+    ''' Find normalization in the tgz file and check the tree file of a crab job. Module level for multiprocessing.
+    '''
+    zipFile, treeFile, treeName = args
+
+    result = {'treeName':treeName, 'file':treeFile, 'sumW':None, 'entries':None,
+              'signatures':{zipFile:_signature( zipFile ), treeFile:_signature( treeFile )} }
+
+    tf = tarfile.open( zipFile, 'r:gz' )
+    for f in tf.getmembers():
+        if "SkimReport.txt" in f.name:
+            result['sumW'] = read_cmg_normalization(tf.extractfile(f))
+        if result['sumW'] is not None: break
+    if result['sumW'] is None:
+        logger.warning( "No normalization found when reading tar file %s", zipFile )
+    tf.close()
+
+    # Check treefile for whether the tree 'treeName' can be found.
+    # This is an implicit check for broken, recovered or otherwise corrupted root files.
+    result['entries'] = _tree_entries( treeFile, treeName )
+    if result['entries'] is None: logger.warning( "File %s looks broken. Checked for presence of tree %s.", treeFile, treeName )
+
+    return result
+
+def is_valid( entry, chunkDirectory = None, **kwargs ):
+    ''' Whether a manifest entry is still up to date, i.e. was made with the same arguments (kwargs) and
+        no file (and chunk directory) changed since.
+    '''
+    if entry is None: return False
+    if any( entry.get(key) != value for key, value in kwargs.iteritems() ): return False
+    if chunkDirectory is not None and os.path.getmtime( chunkDirectory ) != entry['chunkMtime']: return False
+    return all( os.path.exists( f ) and _signature( f ) == signature for f, signature in entry['signatures'].iteritems() )
+
+def read_manifest( filename ):
+    ''' Read manifest from json file. Returns empty manifest if the file doesn't exist or can't be read.
+    '''
+    if not os.path.exists( filename ): return {}
+    try:
+        with open( filename, 'r' ) as f:
+            return json.load( f )
+    except ( IOError, ValueError ):
+        logger.warning( "Could not read manifest %s. Rescanning.", filename )
+        return {}
+
+def write_manifest( filename, manifest ):
+    ''' Write manifest to json file. Failure (e.g. a read-only directory) is not fatal.
+    '''
+    tmp_filename = filename + '.%i.tmp' % os.getpid()
+    try:
+        with open( tmp_filename, 'w' ) as f:
+            json.dump( manifest, f )
+        os.rename( tmp_filename, filename )
+        logger.debug( "Wrote manifest with %i entries to %s", len(manifest), filename )
+    except ( IOError, OSError ) as e:
+        logger.warning( "Could not write manifest %s: %s", filename, e )
@@ -1,5 +1,6 @@
 import ROOT
 import os
+import re
 
 # Logging
 import logging
@@ -18,6 +19,62 @@ def partition(lst, n):
     n_division = len(lst) / float(n)
     return [ lst[int(round(n_division * i)): int(round(n_division * (i + 1)))] for i in xrange(n) ]
 
+def parallel_map( func, args, nThreads = 1 ):
+    ''' map func on args. Uses a multiprocessing pool if nThreads > 1 (func must then be defined on module level).
+    '''
+    if nThreads is None or nThreads <= 1 or len(args) <= 1:
+        return map( func, args )
+    from multiprocessing import Pool
+    pool = Pool( min( nThreads, len(args) ) )
+    try:
+        return pool.map( func, args )
+    finally:
+        pool.close()
+        pool.join()
+
+def file_signature( filename ):
+    ''' (filename, size, mtime) for local files, (filename, None, None) for remote files.
+    '''
+    if filename.startswith('root://') or not os.path.exists( filename ):
+        return ( filename, None, None )
+    stat = os.stat( filename )
+    return ( filename, stat.st_size, int(stat.st_mtime) )
+
+def function_hash( func ):
+    ''' md5 hex digest of the code of func (including nested code, default arguments and closure values).
+        Values of global names used by func are not included. None for None.
+    '''
+    if func is None: return None
+    import hashlib, types
+
+    def value_token( value ):
+        if callable( value ): return function_hash( value )
+        if isinstance( value, (list, tuple) ): return map( value_token, value )
+        if isinstance( value, dict ): return sorted( ( repr( k ), value_token( v ) ) for k, v in value.iteritems() )
+        return repr( value )
+
+    def code_tokens( code ):
+        tokens = [ code.co_code, code.co_names, code.co_varnames ]
+        for const in code.co_consts:
+            tokens.append( code_tokens( const ) if isinstance( const, types.CodeType ) else repr( const ) )
+        return tokens
+
+    if hasattr( func, 'func' ) and hasattr( func, 'variables' ):
+        # RootTools.plot.batch.BatchFunction
+        tokens = [ function_hash( func.func ), func.variables ]
+    elif hasattr( func, '__code__' ):
+        tokens = code_tokens( func.__code__ )
+        tokens.append( value_token( func.__defaults__ ) )
+        if func.__closure__:
+            tokens.append( [ value_token( c.cell_contents ) for c in func.__closure__ ] )
+    elif hasattr( func, '__call__' ) and hasattr( func.__call__, '__code__' ):
+        # callable instance
+        tokens = [ type( func ).__name__, function_hash( func.__call__ ), value_token( getattr( func, '__dict__', {} ) ) ]
+    else:
+        tokens = [ repr( func ) ]
+
+    return hashlib.md5( repr( tokens ) ).hexdigest()
+
 # Translation of short types to ROOT C types
 cStringTypeDict = {
     'b': 'UChar_t',
@@ -97,6 +154,61 @@ def combineStrings( stringList = [], stringOperator = "&&"):
     else:
         return stringOperator.join('('+s+')' for s in list_)
 
+def stripParentheses( expression ):
+    ''' Remove parentheses enclosing the whole expression.
+    '''
+    expression = expression.strip()
+    while expression.startswith('(') and expression.endswith(')'):
+        depth = 0
+        for i, c in enumerate( expression ):
+            if c == '(': depth += 1
+            elif c == ')': depth -= 1
+            if depth == 0 and i < len( expression ) - 1:
+                # the first parenthesis closes before the end
+                return expression
+        expression = expression[1:-1].strip()
+    return expression
+
+def andTerms( expression ):
+    ''' Top level AND-ed terms of expression, recursively for terms in parentheses.
+        Expressions with a top level '||' or '?:' are not split ('&&' binds tighter), e.g. 'a&&b||c' is a single term.
+    '''
+    expression = stripParentheses( expression )
+    terms, depth, start = [], 0, 0
+    i = 0
+    while i < len( expression ):
+        c = expression[i]
+        if c == '(': depth += 1
+        elif c == ')': depth -= 1
+        elif depth == 0 and ( expression[i:i+2] == '||' or c == '?' ):
+            return [ expression ]
+        elif depth == 0 and expression[i:i+2] == '&&':
+            terms.append( expression[start:i] )
+            start = i + 2
+            i += 1
+        i += 1
+    terms.append( expression[start:] )
+    if len( terms ) == 1:
+        return terms
+    return sum( [ andTerms( t ) for t in terms ], [] )
+
+def conjuncts( expression ):
+    ''' Distinct top level AND-ed terms of expression without enclosing parentheses, in order.
+        Every entry passing expression passes each of them and vice versa.
+    '''
+    res = []
+    for term in andTerms( expression ):
+        term = stripParentheses( term )
+        if term not in res: res.append( term )
+    return res
+
+def usesDrawSyntax( expression ):
+    ''' True if expression uses TTree::Draw syntax that can not be compiled as C++ (e.g. by RDataFrame):
+        special functions and variables ('Sum$', 'Length$', 'Alt$', 'Entry$', ...) or 'alias.branch' of friends.
+    '''
+    if expression is None: return False
+    return '$' in expression or re.search( r"(?<![\w.])[A-Za-z_]\w*\.[A-Za-z_]", expression ) is not None
+
 def fromString(*args):
     ''' Make a list of Variables from the input arguments
     '''
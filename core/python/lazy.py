@@ -0,0 +1,113 @@
+''' Lazy event attributes: producers that are evaluated on the first access of event.<name> and cached until the next entry, e.g.
+
+    @lazy( "goodJets" )
+    def goodJets( event, sample ):
+        return [ ... ]
+
+    @lazy()
+    def ht( event, sample ):
+        return sum( j['pt'] for j in event.goodJets )
+
+    reader = sample.treeReader( variables = ..., sequence = [ goodJets, ht, other_function ] )
+
+    Lazy producers can also be put in sample.sequence (before the reader is made).
+
+    Producers can use other lazy attributes; these dependencies are recorded and cycles are detected.
+    When an attribute of the event is set (e.g. by a sequence function), the lazy attributes computed from it are evaluated again.
+'''
+
+# Logging
+import logging
+logger = logging.getLogger(__name__)
+
+class LazyProducer( object ):
+
+    def __init__( self, name, func ):
+        ''' 'func'( event, sample ) returns the value of event.<name>.
+        '''
+        self.name = name
+        self.func = func
+
+def lazy( name = None ):
+    ''' Decorator making a LazyProducer. The name of the attribute defaults to the name of the function.
+    '''
+    def decorator( func ):
+        return LazyProducer( name if name is not None else func.__name__, func )
+    return decorator
+
+class LazyAttributes( object ):
+    ''' Producers of the lazy attributes of a reader and their values for the current entry.
+    '''
+    def __init__( self, sample, producers ):
+        self.sample    = sample
+        self.producers = {}
+        for p in producers:
+            if p.name in self.producers:
+                raise ValueError( "Lazy attribute %s is defined twice." % p.name )
+            self.producers[p.name] = p
+
+        # name -> value for the current entry
+        self.values     = {}
+        # Names being computed, for cycle detection
+        self.stack      = []
+        # name -> lazy attributes whose producers read event.<name> (lazy or not)
+        self.dependents = {}
+
+    def used( self, name ):
+        ''' Record that the producer being evaluated reads event.<name>.
+        '''
+        if len( self.stack ) > 0:
+            self.dependents.setdefault( name, set() ).add( self.stack[-1] )
+
+    def get( self, event, name ):
+        ''' Value of the lazy attribute 'name', evaluated on the first access for the current entry.
+        '''
+        if name in self.values:
+            return self.values[name]
+        if name in self.stack:
+            raise RuntimeError( "Cyclic dependency of lazy attributes: %s" % " -> ".join( self.stack + [name] ) )
+
+        self.stack.append( name )
+        try:
+            value = self.producers[name].func( event, self.sample )
+        finally:
+            self.stack.pop()
+
+        self.values[name] = value
+        return value
+
+    def invalidate( self, name ):
+        ''' Forget the values computed from event.<name> (directly or through other lazy attributes).
+        '''
+        for dependent in self.dependents.get( name, () ):
+            if dependent in self.values:
+                del self.values[dependent]
+                self.invalidate( dependent )
+
+    def reset( self ):
+        ''' Forget the values of the current entry.
+        '''
+        self.values = {}
+
+class LazyEvent( object ):
+    ''' The event of a reader with lazy attributes. Wraps the event struct: lazy attributes are evaluated on access,
+        all other attributes are read from and set on the struct. Setting an attribute invalidates the lazy attributes computed from it.
+    '''
+    def __init__( self, struct, lazyAttributes ):
+        object.__setattr__( self, 'struct', struct )
+        object.__setattr__( self, 'lazyAttributes', lazyAttributes )
+
+    def __getattr__( self, name ):
+        if name in ( 'struct', 'lazyAttributes' ):
+            raise AttributeError( name )
+        self.lazyAttributes.used( name )
+        if name in self.lazyAttributes.producers:
+            return self.lazyAttributes.get( self, name )
+        return getattr( self.struct, name )
+
+    def __setattr__( self, name, value ):
+        if name in self.lazyAttributes.producers:
+            self.lazyAttributes.values[name] = value
+        else:
+            setattr( self.struct, name, value )
+        self.lazyAttributes.invalidate( name )
@@ -0,0 +1,182 @@
+''' Memoized sequence functions: the outputs of an expensive sequence function are computed once per sample,
+    stored in a friend tree and read back instead of running the function again, e.g.
+
+    @memoize( ["nGoodJet/I", "GoodJet[pt/F,eta/F]"], directory = "/path/to/memo", read_variables = ["nJet/I", "Jet[pt/F,eta/F,id/I]"] )
+    def makeGoodJets( event, sample ):
+        ...
+        event.nGoodJet   = len(jets)
+        event.GoodJet_pt = [ j['pt'] for j in jets ]
+
+    The friend tree has one entry per entry of the sample chain (it is made without selection) and is identified by the
+    hash of the function (see helpers.function_hash), the values of simple global constants it uses (e.g. cut values),
+    an optional 'version', the output variables and the tree, files and (not memoized) friends of the sample.
+    Bump 'version' when other globals used by the function (e.g. functions it calls) change.
+'''
+
+# Standard imports
+import ROOT
+import os
+import uuid
+import types
+import hashlib
+
+# Logging
+import logging
+logger = logging.getLogger(__name__)
+
+# RootTools
+import RootTools.core.helpers as helpers
+from RootTools.core.TreeVariable import ScalarTreeVariable, VectorTreeVariable
+
+_constant_types = ( bool, int, long, float, str, unicode, type(None) )
+
+def _is_constant( value ):
+    if isinstance( value, _constant_types ): return True
+    if isinstance( value, ( list, tuple, set, frozenset ) ): return all( _is_constant( v ) for v in value )
+    if isinstance( value, dict ): return all( _is_constant( k ) and _is_constant( v ) for k, v in value.iteritems() )
+    return False
+
+def global_constants( func ):
+    ''' (name, repr) of the global names used by func (including nested code) with simple constant values, e.g. cut values.
+        Modules, functions and other objects are not included.
+    '''
+    code = getattr( func, '__code__', None )
+    if code is None: return []
+    names = set()
+    def collect( code ):
+        names.update( code.co_names )
+        for const in code.co_consts:
+            if isinstance( const, types.CodeType ): collect( const )
+    collect( code )
+    globals_ = func.__globals__
+    return [ ( name, repr( sorted( globals_[name].items() ) if isinstance( globals_[name], dict ) else globals_[name] ) )
+        for name in sorted( names ) if name in globals_ and _is_constant( globals_[name] ) ]
+
+class MemoizedFunction( object ):
+
+    treeName = "memoized"
+
+    def __init__( self, func, variables, directory, read_variables = [], version = None ):
+        ''' 'func': sequence function ( event, sample ) setting the 'variables' (TreeVariables or strings) as event attributes,
+            'directory': where the friend trees are stored,
+            'read_variables': variables 'func' needs from the tree,
+            'version': part of the key of the friend trees, change it to invalidate them.
+        '''
+        self.func           = func
+        self.variables      = list( helpers.fromString( variables ) )
+        self.directory      = directory
+        self.read_variables = list( helpers.fromString( read_variables ) )
+        self.version        = version
+        self.__name__       = getattr( func, '__name__', 'memoized' )
+        self.__doc__        = func.__doc__
+
+    @property
+    def alias( self ):
+        ''' Name of the friend tree in the sample chain.
+        '''
+        return self.treeName + "_" + self.__name__
+
+    def __call__( self, event, sample ):
+        # Not memoized, e.g. outside of TreeReader
+        return self.func( event, sample )
+
+    def _unselected( self, sample ):
+        ''' Copy of sample without selection and weight strings, i.e. with all entries of the chain.
+        '''
+        copy = sample.from_spec( sample.to_spec() )
+        copy.setSelectionString( None )
+        copy.setWeightString( None )
+        return copy
+
+    def sampleKey( self, sample ):
+        ''' Tree, files and friends of sample. Selection and weight strings and memoized friends (attached by resolve) are not included.
+        '''
+        friends = [ ( friend.fingerprint(), treeName ) for friend, treeName in sample.friends if not treeName.startswith( self.treeName + "_" ) ]
+        return [ sample.treeName, [ helpers.file_signature( f ) for f in sample.files ], friends ]
+
+    def filename( self, sample ):
+        key = hashlib.md5( repr( [ helpers.function_hash( self.func ), global_constants( self.func ), self.version, map( str, self.variables ), self.sampleKey( sample ) ] ) ).hexdigest()
+        return os.path.join( self.directory, "%s_%s_%s.root" % ( self.__name__, sample.name, key ) )
+
+    def produce( self, sample ):
+        ''' Run func on all entries of the sample and write the friend tree, unless it exists. Returns its filename.
+        '''
+        from RootTools.core.TreeReader import TreeReader
+        from RootTools.core.TreeMaker import TreeMaker
+
+        filename = self.filename( sample )
+        if os.path.exists( filename ):
+            return filename
+        if not os.path.exists( self.directory ):
+            os.makedirs( self.directory )
+
+        logger.info( "Memoizing %s for sample %s in %s", self.__name__, sample.name, filename )
+        reader = TreeReader( self._unselected( sample ), variables = self.read_variables )
+
+        tmp_filename = filename + "." + str( uuid.uuid4() )
+        directory = ROOT.gDirectory
+        f = ROOT.TFile( tmp_filename, "recreate" )
+        maker = TreeMaker( variables = self.variables, treeName = self.treeName )
+        maker.event.init()
+
+        reader.start()
+        while reader.run():
+            self.func( reader.event, sample )
+            for v in self.variables:
+                if isinstance( v, ScalarTreeVariable ):
+                    setattr( maker.event, v.name, getattr( reader.event, v.name ) )
+                else:
+                    components = [ getattr( reader.event, c.name ) for c in v.components ]
+                    counter    = v.counterVariable().name
+                    n          = getattr( reader.event, counter ) if hasattr( reader.event, counter ) else min( len( c ) for c in components )
+                    setattr( maker.event, counter, n )
+                    for c, values in zip( v.components, components ):
+                        target = getattr( maker.event, c.name )
+                        for i in xrange( min( n, v.nMax ) ):
+                            target[i] = values[i]
+            maker.fill()
+            maker.event.init()
+
+        f.cd()
+        maker.tree.Write()
+        f.Close()
+        directory.cd()
+        os.rename( tmp_filename, filename )
+        return filename
+
+    def friend( self, sample ):
+        ''' Sample with the friend tree of 'sample' (produced if needed).
+        '''
+        from RootTools.core.Sample import Sample
+        return Sample.fromFiles( "%s_%s" % ( sample.name, self.__name__ ), [ self.produce( sample ) ], treeName = self.treeName )
+
+    def readVariables( self ):
+        ''' Variables to read from the friend tree, including vector counters.
+        '''
+        return self.variables + [ v.counterVariable() for v in self.variables if isinstance( v, VectorTreeVariable ) ]
+
+def memoize( variables, directory, read_variables = [], version = None ):
+    ''' Decorator making a MemoizedFunction.
+    '''
+    def decorator( func ):
+        return MemoizedFunction( func, variables, directory, read_variables = read_variables, version = version )
+    return decorator
+
+def resolve( sample, sequence, variables ):
+    ''' Attach the friend trees of the memoized functions in sequence to sample.
+        Returns the sequence without them and the variables with their outputs.
+    '''
+    sequence_, variables_ = [], list( variables )
+    for func in sequence:
+        if not isinstance( func, MemoizedFunction ):
+            sequence_.append( func )
+            continue
+        attached = [ friend for friend, treeName in sample.friends if treeName == func.alias ]
+        if len( attached ) > 0:
+            filename = attached[0].files[0]
+        else:
+            filename = func.produce( sample )
+            sample.addFriend( func.friend( sample ), func.alias )
+        variables_ += [ v for v in func.readVariables() if v.name not in [ v_.name for v_ in variables_ ] ]
+        logger.debug( "Reading outputs of %s for sample %s from %s", func.__name__, sample.name, filename )
+    return sequence_, variables_
@@ -0,0 +1,66 @@
+''' Compact, picklable description ('spec') of samples for worker processes.
+    A spec is a dict with the class, the constructor arguments, friends and the attributes set after construction
+    (all public attributes, e.g. 'sequence', 'nEvents' or custom ones). Private attributes (caches, the chain) are not kept.
+    It contains no ROOT objects; the chain of a sample made from a spec is loaded lazily as usual.
+    Samples are pickled through their spec. Copies (copy.copy, copy.deepcopy) are plain copies of the attributes as for
+    any object, i.e. the constructor is not run again (see plain_copy and plain_deepcopy).
+'''
+
+# Standard imports
+import copy
+import importlib
+
+# Logging
+import logging
+logger = logging.getLogger(__name__)
+
+# RootTools
+import RootTools.plot.styles as styles
+
+# Attributes that are commonly set on samples after construction (also if they are class attributes)
+spec_attributes = [ 'scale', 'weight', 'style', 'read_variables', 'json', 'reduce_files_factor', 'useZoneMaps', 'zoneMapDirectory', 'stager', 'schemaDirectory' ]
+
+def to_spec( sample, args ):
+    ''' Spec of sample with constructor arguments 'args'.
+        Python functions (weight, non-standard styles) are kept as they are and must be defined on module level to be pickled.
+    '''
+    spec = { 'class':( type(sample).__module__, type(sample).__name__ ), 'args':args, 'attributes':{} }
+    for attribute in spec_attributes:
+        if hasattr( sample, attribute ):
+            value = getattr( sample, attribute )
+            spec['attributes'][attribute] = styles.to_spec( value ) if attribute == 'style' else value
+    # all other public attributes; friends are in spec['friends']
+    for attribute, value in getattr( sample, '__dict__', {} ).iteritems():
+        if attribute.startswith( '_' ) or attribute in args or attribute in spec['attributes'] or attribute in ( 'friends', 'friend_options' ): continue
+        spec['attributes'][attribute] = value
+    if len( getattr( sample, 'friends', [] ) ) > 0:
+        friend_options = getattr( sample, 'friend_options', {} )
+        spec['friends'] = [ ( friend.to_spec(), treeName, friend_options.get( i, {} ) ) for i, ( friend, treeName ) in enumerate( sample.friends ) ]
+    return spec
+
+def plain_copy( sample ):
+    ''' Shallow copy of sample as by copy.copy without __reduce__ (which goes through the spec).
+    '''
+    res = type( sample ).__new__( type( sample ) )
+    res.__dict__.update( sample.__dict__ )
+    return res
+
+def plain_deepcopy( sample, memo ):
+    ''' Deep copy of sample as by copy.deepcopy without __reduce__ (which goes through the spec).
+    '''
+    res = type( sample ).__new__( type( sample ) )
+    memo[id( sample )] = res
+    res.__dict__.update( copy.deepcopy( sample.__dict__, memo ) )
+    return res
+
+def from_spec( spec ):
+    ''' Make the sample described by spec.
+    '''
+    cls    = getattr( importlib.import_module( spec['class'][0] ), spec['class'][1] )
+    sample = cls( **spec['args'] )
+    for attribute, value in spec['attributes'].iteritems():
+        setattr( sample, attribute, styles.from_spec( value ) if attribute == 'style' else value )
+    for friend_spec, treeName, options in spec.get( 'friends', [] ):
+        sample.addFriend( from_spec( friend_spec ), treeName, **options )
+    logger.debug( "Made sample %s from spec.", sample.name )
+    return sample
@@ -0,0 +1,116 @@
+''' Schema of a tree: leaf names, types, counter leaves and array sizes, read from a single file.
+    Schemas can be cached as JSON files per file and tree, e.g. to configure readers without opening the whole dataset.
+'''
+
+# Standard imports
+import ROOT
+import os
+import json
+import hashlib
+import fnmatch
+
+# Logging
+import logging
+logger = logging.getLogger(__name__)
+
+# RootTools
+import RootTools.core.helpers as helpers
+from RootTools.core.TreeVariable import ScalarTreeVariable, VectorTreeVariable
+
+def read_schema( filename, treeName ):
+    ''' List of leaves {'name', 'type' (C type), 'counter' (name of the counter leaf or None), 'nMax'} of the tree in a file.
+        'nMax' is the fixed array size or, for leaves with a counter, the maximum of the counter in this file.
+    '''
+    f = ROOT.TFile.Open( filename )
+    if not f or f.IsZombie():
+        raise IOError( "File %s could not be opened." % filename )
+    tree = f.Get( treeName )
+    if not tree:
+        f.Close()
+        raise IOError( "No tree %s in file %s." % ( treeName, filename ) )
+
+    leaves = []
+    for leaf in tree.GetListOfLeaves():
+        counter = leaf.GetLeafCount()
+        leaves.append( {
+            'name':    leaf.GetName(),
+            'type':    leaf.GetTypeName(),
+            'counter': counter.GetName() if counter else None,
+            'nMax':    int( counter.GetMaximum() ) if counter else leaf.GetLenStatic(),
+        } )
+    f.Close()
+    return leaves
+
+def _cache_filename( filename, treeName, cacheDir ):
+    return os.path.join( cacheDir, "%s.schema.json" % hashlib.md5( repr( ( helpers.file_signature( filename ), treeName ) ) ).hexdigest() )
+
+def get_schema( filename, treeName, cacheDir = None ):
+    ''' Schema of the tree in a file, from the cache in 'cacheDir' if the file is unchanged.
+    '''
+    if cacheDir is not None:
+        cache_filename = _cache_filename( filename, treeName, cacheDir )
+        if os.path.exists( cache_filename ):
+            with open( cache_filename ) as f:
+                return json.load( f )
+
+    leaves = read_schema( filename, treeName )
+
+    if cacheDir is not None:
+        if not os.path.exists( cacheDir ):
+            os.makedirs( cacheDir )
+        with open( cache_filename + ".tmp", 'w' ) as f:
+            json.dump( leaves, f )
+        os.rename( cache_filename + ".tmp", cache_filename )
+        logger.debug( "Stored schema of %s in %s", filename, cache_filename )
+    return leaves
+
+def _get_schema( args ):
+    # Module level for multiprocessing. None for files that can not be read.
+    filename, treeName, cacheDir = args
+    try:
+        return get_schema( filename, treeName, cacheDir = cacheDir )
+    except IOError as e:
+        logger.warning( "Could not read schema from %s: %s", filename, e )
+        return None
+
+def counter_maxima( schemas ):
+    ''' {counter leaf: maximum} over the schemas of several files, from the nMax of the leaves with that counter.
+    '''
+    maxima = {}
+    for leaves in schemas:
+        for leaf in leaves:
+            if leaf['counter'] is not None:
+                maxima[leaf['counter']] = max( maxima.get( leaf['counter'], 0 ), leaf['nMax'] )
+    return maxima
+
+def tree_variables( leaves, patterns = ["*"] ):
+    ''' ScalarTreeVariable and VectorTreeVariable instances for the leaves matching the (fnmatch) patterns.
+        Leaves with a counter 'nX' make up the vector 'X' with nMax from the schema; counters are returned as scalars.
+        Fixed size arrays, leaves with other counter names and leaves with types that are not supported are skipped.
+    '''
+    def selected( name ):
+        return any( fnmatch.fnmatch( name, p ) for p in patterns )
+
+    scalars, vectors = [], {}
+    for leaf in leaves:
+        if not selected( leaf['name'] ): continue
+        if leaf['type'] not in helpers.shortTypeDict:
+            logger.debug( "Skipping leaf %s with type %s.", leaf['name'], leaf['type'] )
+            continue
+        if leaf['counter'] is not None:
+            if not leaf['counter'].startswith( 'n' ):
+                logger.debug( "Skipping leaf %s: counter %s is not of the form 'nX'.", leaf['name'], leaf['counter'] )
+                continue
+            vectors.setdefault( leaf['counter'], { 'nMax':leaf['nMax'], 'components':[] } )
+            vectors[leaf['counter']]['components'].append( ScalarTreeVariable( str( leaf['name'] ), str( leaf['type'] ) ) )
+        elif leaf['nMax'] > 1:
+            logger.debug( "Skipping fixed size array %s[%i].", leaf['name'], leaf['nMax'] )
+        else:
+            scalars.append( ScalarTreeVariable( str( leaf['name'] ), str( leaf['type'] ) ) )
+
+    res = scalars
+    for counter, vector in sorted( vectors.iteritems() ):
+        res.append( VectorTreeVariable( str( counter[1:] ), vector['components'], nMax = max( vector['nMax'], 1 ) ) )
+        # the nMax from one file is a guess for the sample, readers may adjust it
+        res[-1].autoNMax = True
+    return res
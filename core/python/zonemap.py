@@ -0,0 +1,156 @@
+''' Zone maps: minimum and maximum of chosen branches per file and per cluster, stored in a JSON sidecar per file.
+    Used to skip files and clusters that can not pass the simple threshold cuts (e.g. 'met_pt>100', 'nJet>=4')
+    among the AND-ed terms of a selection string. Terms that are not of the form 'branch <op> number' are ignored,
+    i.e. the pruning is conservative.
+'''
+
+# Standard imports
+import ROOT
+import os
+import re
+import json
+import hashlib
+
+# Logging
+import logging
+logger = logging.getLogger(__name__)
+
+# RootTools
+import RootTools.core.helpers as helpers
+
+_number  = r"[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?"
+_cut     = re.compile( r"^([A-Za-z_][\w.]*)\s*(>=|<=|==|>|<)\s*(%s)$" % _number )
+_cut_rev = re.compile( r"^(%s)\s*(>=|<=|==|>|<)\s*([A-Za-z_][\w.]*)$" % _number )
+_reversed_operator = { '>':'<', '<':'>', '>=':'<=', '<=':'>=', '==':'==' }
+
+def parse_cuts( selectionString ):
+    ''' List of (branch, operator, value) for the AND-ed terms of selectionString that are simple threshold cuts.
+    '''
+    if selectionString is None: return []
+    cuts = []
+    for term in helpers.conjuncts( selectionString ):
+        m = _cut.match( term )
+        if m:
+            cuts.append( ( m.group(1), m.group(2), float( m.group(3) ) ) )
+            continue
+        m = _cut_rev.match( term )
+        if m:
+            cuts.append( ( m.group(3), _reversed_operator[m.group(2)], float( m.group(1) ) ) )
+    return cuts
+
+def can_pass( ranges, cuts ):
+    ''' False if one of the cuts can not be passed by values in ranges {branch:(min, max)}. Unknown branches can pass.
+    '''
+    for branch, operator, value in cuts:
+        range_ = ranges.get( branch )
+        if range_ is None: continue
+        min_, max_ = range_
+        if operator == '>'  and not max_ >  value: return False
+        if operator == '>=' and not max_ >= value: return False
+        if operator == '<'  and not min_ <  value: return False
+        if operator == '<=' and not min_ <= value: return False
+        if operator == '==' and not min_ <= value <= max_: return False
+    return True
+
+def sidecar_filename( filename, directory = None ):
+    ''' Sidecar of a file: next to a local file or, with 'directory', there (required for remote files).
+    '''
+    if directory is not None:
+        return os.path.join( directory, "%s.zonemap.json" % hashlib.md5( filename ).hexdigest() )
+    if filename.startswith('root://'):
+        raise ValueError( "Zone maps of remote file %s need a directory." % filename )
+    return filename + ".zonemap.json"
+
+def _min_max( tree, branch, first, n ):
+    ''' (min, max) of branch in entries [first, first+n), None if there are no values.
+    '''
+    rows = tree.Draw( branch, "", "goff", n, first )
+    if rows <= 0: return None
+    # vector branches have more values (rows) than entries; GetV1 only holds 'estimate' of them
+    if rows > tree.GetEstimate():
+        tree.SetEstimate( rows + 1 )
+        rows = tree.Draw( branch, "", "goff", n, first )
+    v = tree.GetV1()
+    return ( ROOT.TMath.MinElement( rows, v ), ROOT.TMath.MaxElement( rows, v ) )
+
+def build( filename, treeName, branches, directory = None ):
+    ''' Compute the zone map of a file and write the sidecar. Returns the zone map.
+    '''
+    f = ROOT.TFile.Open( filename )
+    if not f or f.IsZombie():
+        raise IOError( "File %s could not be opened." % filename )
+    tree = f.Get( treeName )
+    if not tree:
+        f.Close()
+        raise IOError( "No tree %s in file %s." % ( treeName, filename ) )
+
+    nEntries = tree.GetEntries()
+    tree.SetEstimate( nEntries + 1 )
+    names    = set( b.GetName() for b in tree.GetListOfLeaves() )
+
+    # clusters [first, first+n)
+    clusters = []
+    iterator = tree.GetClusterIterator( 0 )
+    start = iterator.Next()
+    while start < nEntries:
+        end = min( iterator.GetNextEntry(), nEntries )
+        clusters.append( ( start, end - start ) )
+        start = iterator.Next()
+
+    zone_map = { 'signature':helpers.file_signature( filename ), 'treeName':treeName, 'entries':nEntries, 'clusters':clusters, 'ranges':{}, 'cluster_ranges':{} }
+    for branch in branches:
+        if branch not in names:
+            logger.warning( "Branch %s not found in %s. Not in zone map.", branch, filename )
+            continue
+        cluster_ranges = [ _min_max( tree, branch, first, n ) for first, n in clusters ]
+        # the file range is unknown if one of the cluster ranges is
+        if all( r is not None for r in cluster_ranges ) and len( cluster_ranges ) > 0:
+            zone_map['ranges'][branch] = ( min( r[0] for r in cluster_ranges ), max( r[1] for r in cluster_ranges ) )
+        zone_map['cluster_ranges'][branch] = cluster_ranges
+    f.Close()
+
+    sidecar = sidecar_filename( filename, directory )
+    if directory is not None and not os.path.exists( directory ):
+        os.makedirs( directory )
+    with open( sidecar + ".tmp", 'w' ) as out:
+        json.dump( zone_map, out )
+    os.rename( sidecar + ".tmp", sidecar )
+    logger.debug( "Wrote zone map of %s with %i clusters to %s", filename, len( clusters ), sidecar )
+    return zone_map
+
+def _build( args ):
+    # Module level for multiprocessing
+    return build( *args )
+
+def load( filename, treeName, directory = None ):
+    ''' Zone map of a file from its sidecar. None if there is none or if it is outdated.
+    '''
+    try:
+        sidecar = sidecar_filename( filename, directory )
+    except ValueError:
+        return None
+    if not os.path.exists( sidecar ): return None
+    with open( sidecar ) as f:
+        zone_map = json.load( f )
+    if tuple( zone_map['signature'] ) != helpers.file_signature( filename ) or zone_map['treeName'] != treeName:
+        logger.debug( "Zone map %s of %s is outdated.", sidecar, filename )
+        return None
+    return zone_map
+
+def entry_ranges( zone_maps, cuts ):
+    ''' Ranges (first, n) of global entries of a chain of files with zone_maps (in chain order) that can pass the cuts.
+        Adjacent ranges are merged.
+    '''
+    ranges = []
+    offset = 0
+    for zone_map in zone_maps:
+        if can_pass( zone_map['ranges'], cuts ):
+            for i_cluster, ( first, n ) in enumerate( zone_map['clusters'] ):
+                cluster_ranges = { branch:r[i_cluster] for branch, r in zone_map['cluster_ranges'].iteritems() }
+                if not can_pass( cluster_ranges, cuts ): continue
+                if len( ranges ) > 0 and sum( ranges[-1] ) == offset + first:
+                    ranges[-1] = ( ranges[-1][0], ranges[-1][1] + n )
+                else:
+                    ranges.append( ( offset + first, n ) )
+        offset += zone_map['entries']
+    return ranges
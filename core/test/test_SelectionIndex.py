@@ -0,0 +1,48 @@
+''' Tests of the set algebra of SelectionIndex. Run with 'python -m unittest discover RootTools/core/test'.
+'''
+
+# Standard imports
+import unittest
+import random
+import cPickle as pickle
+
+# RootTools
+from RootTools.core.SelectionIndex import SelectionIndex
+
+class SelectionIndexTest( unittest.TestCase ):
+
+    n = 200000
+
+    def setUp( self ):
+        random.seed( 1 )
+        # sparse (array) and dense (bitmap) chunks
+        self.a = set( random.sample( xrange( self.n ), 5000 ) ) | set( xrange( 70000, 80000 ) )
+        self.b = set( random.sample( xrange( self.n ), 50000 ) )
+        self.A = SelectionIndex.fromEntries( self.n, self.a )
+        self.B = SelectionIndex.fromEntries( self.n, self.b )
+
+    def test_entries( self ):
+        self.assertEqual( list( self.A ), sorted( self.a ) )
+        self.assertEqual( len( self.A ), len( self.a ) )
+        self.assertEqual( self.A.GetEntry( 1234 ), sorted( self.a )[1234] )
+        self.assertEqual( list( self.A.entries( 100, 200 ) ), sorted( self.a )[100:200] )
+
+    def test_algebra( self ):
+        self.assertEqual( list( self.A & self.B ), sorted( self.a & self.b ) )
+        self.assertEqual( list( self.A | self.B ), sorted( self.a | self.b ) )
+        self.assertEqual( list( self.A - self.B ), sorted( self.a - self.b ) )
+        self.assertEqual( list( ~self.A ), sorted( set( xrange( self.n ) ) - self.a ) )
+        self.assertEqual( len( SelectionIndex.all( self.n ) ), self.n )
+
+    def test_contains( self ):
+        for entry in [ 0, 70000, 79999, 80000, self.n - 1 ]:
+            self.assertEqual( entry in self.A, entry in self.a )
+
+    def test_pickle( self ):
+        self.assertEqual( pickle.loads( pickle.dumps( self.A, pickle.HIGHEST_PROTOCOL ) ), self.A )
+
+    def test_incompatible( self ):
+        self.assertRaises( ValueError, lambda: self.A & SelectionIndex( self.n + 1 ) )
+
+if __name__ == '__main__':
+    unittest.main()
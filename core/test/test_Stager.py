@@ -0,0 +1,115 @@
+''' Tests of the staging cache with a local directory standing in for the remote storage.
+Run with 'python -m unittest discover RootTools/core/test'.
+'''
+
+# Standard imports
+import unittest
+import os
+import shutil
+import tempfile
+import time
+
+# RootTools
+from RootTools.core.Stager import Stager
+
+class StagerTest( unittest.TestCase ):
+
+    # 1 MB per file
+    size = 1024**2
+
+    def setUp( self ):
+        self.remote = tempfile.mkdtemp()
+        self.local  = tempfile.mkdtemp()
+        self.files  = []
+        for i in range( 4 ):
+            filename = os.path.join( self.remote, "file_%i.root" % i )
+            with open( filename, 'wb' ) as f:
+                f.write( chr( i )*self.size )
+            self.files.append( filename )
+
+    def tearDown( self ):
+        shutil.rmtree( self.remote )
+        shutil.rmtree( self.local )
+
+    def staged( self ):
+        return sorted( f for f in os.listdir( self.local ) if f.endswith( ".root" ) )
+
+    def test_stage( self ):
+        stager = Stager( self.local )
+        local  = stager.stage( self.files[0] )
+        self.assertEqual( os.path.dirname( local ), self.local )
+        with open( local, 'rb' ) as f:
+            self.assertEqual( f.read(), chr( 0 )*self.size )
+        # reused
+        self.assertEqual( stager.stage( self.files[0] ), local )
+        self.assertEqual( len( self.staged() ), 1 )
+
+    def test_quota( self ):
+        # room for two files
+        stager = Stager( self.local, maxSizeGB = 2.5*self.size/1024.**3 )
+        for filename in self.files:
+            stager.stage( filename )
+            stager.release( filename )
+            # distinct modification times for the LRU order
+            time.sleep( 0.01 )
+        self.assertEqual( self.staged(), sorted( os.path.basename( stager.localFilename( f ) ) for f in self.files[2:] ) )
+
+    def test_lease( self ):
+        # files leased by another job on the node are not evicted
+        other  = Stager( self.local )
+        leased = other.stage( self.files[0] )
+        stager = Stager( self.local, maxSizeGB = 1.5*self.size/1024.**3 )
+        for filename in self.files[1:]:
+            stager.stage( filename )
+            stager.release( filename )
+        self.assertTrue( os.path.exists( leased ) )
+        # evicted when the space is needed after the release
+        other.release( self.files[0] )
+        stager.stage( self.files[1] )
+        self.assertFalse( os.path.exists( leased ) )
+
+    def test_references( self ):
+        # two readers in one process share the stager: the file stays leased until both released it
+        stager = Stager( self.local, maxSizeGB = 0 )
+        local  = stager.stage( self.files[0] )
+        self.assertEqual( stager.stage( self.files[0] ), local )
+        stager.release( self.files[0] )
+        stager.evict()
+        self.assertTrue( stager.isStaged( self.files[0] ) )
+        self.assertTrue( os.path.exists( local ) )
+        stager.release( self.files[0] )
+        self.assertFalse( stager.isStaged( self.files[0] ) )
+        self.assertFalse( os.path.exists( local ) )
+
+    def test_prefetch_reference( self ):
+        stager = Stager( self.local, maxSizeGB = 0 )
+        stager.prefetchFiles( self.files[:1] )
+        for i in range( 500 ):
+            if stager.isStaged( self.files[0] ): break
+            time.sleep( 0.01 )
+        # the reference of the prefetch is used
+        local = stager.stage( self.files[0], reference = False )
+        self.assertTrue( os.path.exists( local ) )
+        stager.release( self.files[0] )
+        self.assertFalse( os.path.exists( local ) )
+
+    def test_stale_lease( self ):
+        stager = Stager( self.local, maxSizeGB = 0 )
+        local  = stager.stage( self.files[0] )
+        stager._leases.clear()
+        # lease of a process that does not exist anymore
+        for lease in [ f for f in os.listdir( self.local ) if '.lease_' in f ]:
+            os.rename( os.path.join( self.local, lease ), os.path.join( self.local, lease.replace( ".lease_%i_" % os.getpid(), ".lease_999999999_" ) ) )
+        stager.evict()
+        self.assertFalse( os.path.exists( local ) )
+
+    def test_prefetch( self ):
+        stager = Stager( self.local )
+        stager.prefetchFiles( self.files[1:3] )
+        # waits for the copies in progress
+        for filename in self.files[1:3]:
+            self.assertTrue( os.path.exists( stager.stage( filename ) ) )
+        self.assertEqual( len( self.staged() ), 2 )
+
+if __name__ == '__main__':
+    unittest.main()
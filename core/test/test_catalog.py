@@ -0,0 +1,34 @@
+''' Tests of the catalog queries with local commands. Run with 'python -m unittest discover RootTools/core/test'.
+'''
+
+# Standard imports
+import unittest
+import subprocess
+
+# RootTools
+import RootTools.core.catalog as catalog
+
+class QueryTest( unittest.TestCase ):
+
+    def setUp( self ):
+        catalog.clearCache()
+
+    def test_output( self ):
+        self.assertEqual( catalog.query( ['echo', 'a.root'] ), "a.root\n" )
+
+    def test_failure( self ):
+        self.assertRaises( subprocess.CalledProcessError, catalog.query, ['sh', '-c', 'echo partial; exit 1'], retries = 1, backoff = 0 )
+
+    def test_no_check( self ):
+        # like os.popen: the output of failing commands, nothing for commands that can not be run
+        self.assertEqual( catalog.query( ['sh', '-c', 'echo partial; exit 1'], retries = 0, check = False ), "partial\n" )
+        self.assertEqual( catalog.query( ['/nonexisting/dasgoclient'], retries = 0, check = False ), "" )
+
+    def test_cache( self ):
+        cmd = ['sh', '-c', 'date +%N']
+        first = catalog.query( cmd )
+        self.assertEqual( catalog.query( cmd ), first )
+        self.assertNotEqual( catalog.query( cmd, useCache = False ), first )
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+''' Tests of the selection string helpers. Run with 'python -m unittest discover RootTools/core/test'.
+'''
+
+# Standard imports
+import unittest
+
+# RootTools
+import RootTools.core.helpers as helpers
+
+class AndTermsTest( unittest.TestCase ):
+
+    def test_and( self ):
+        self.assertEqual( helpers.andTerms( 'met_pt>100&&nJet>=4' ), ['met_pt>100', 'nJet>=4'] )
+
+    def test_nested_and( self ):
+        self.assertEqual( helpers.andTerms( '(met_pt>100&&(nJet>=4&&ht>500))&&nBTag>=1' ), ['met_pt>100', 'nJet>=4', 'ht>500', 'nBTag>=1'] )
+
+    def test_mixed_and_or( self ):
+        # '&&' binds tighter than '||': (met_pt>100&&nJet>=4)||ht>1000
+        self.assertEqual( helpers.andTerms( 'met_pt>100&&nJet>=4||ht>1000' ), ['met_pt>100&&nJet>=4||ht>1000'] )
+        self.assertEqual( helpers.andTerms( 'ht>1000||met_pt>100&&nJet>=4' ), ['ht>1000||met_pt>100&&nJet>=4'] )
+
+    def test_or_in_parentheses( self ):
+        self.assertEqual( helpers.andTerms( 'met_pt>100&&(nJet>=4||ht>1000)' ), ['met_pt>100', 'nJet>=4||ht>1000'] )
+
+    def test_ternary( self ):
+        self.assertEqual( helpers.andTerms( 'isData&&met_pt>100?1:0' ), ['isData&&met_pt>100?1:0'] )
+
+    def test_negation( self ):
+        self.assertEqual( helpers.andTerms( '!(met_pt>100&&nJet>=4)&&ht>500' ), ['!(met_pt>100&&nJet>=4)', 'ht>500'] )
+
+class ConjunctsTest( unittest.TestCase ):
+
+    def test_conjuncts( self ):
+        self.assertEqual( helpers.conjuncts( '(met_pt>100)&&nJet>=4&&(met_pt>100)' ), ['met_pt>100', 'nJet>=4'] )
+
+    def test_mixed_and_or( self ):
+        # the selection index of 'met_pt>100' must not be AND-ed in
+        self.assertEqual( helpers.conjuncts( '(met_pt>100&&nJet>=4||ht>1000)' ), ['met_pt>100&&nJet>=4||ht>1000'] )
+
+class UsesDrawSyntaxTest( unittest.TestCase ):
+
+    def test_draw_syntax( self ):
+        for expression in [ 'Sum$(Jet_pt>30)>=2', 'Alt$(Jet_pt[1],0)', 'Length$(Jet_pt)', 'friend.met_pt>100', 'met_pt>100&&(memoized_goodJets.nGoodJet>=2)' ]:
+            self.assertTrue( helpers.usesDrawSyntax( expression ), expression )
+
+    def test_cpp( self ):
+        for expression in [ None, 'met_pt>1.e2&&nJet>=4', 'Jet_pt[0]*cos(Jet_phi[0])', 'TMath::Abs(Jet_eta[0])<2.4', 'weight*1.5' ]:
+            self.assertFalse( helpers.usesDrawSyntax( expression ), expression )
+
+class StripParenthesesTest( unittest.TestCase ):
+
+    def test_strip( self ):
+        self.assertEqual( helpers.stripParentheses( ' ((met_pt>100)) ' ), 'met_pt>100' )
+        self.assertEqual( helpers.stripParentheses( '(met_pt>100)&&(nJet>=4)' ), '(met_pt>100)&&(nJet>=4)' )
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+''' Tests of lazy event attributes. Run with 'python -m unittest discover RootTools/core/test'.
+'''
+
+# Standard imports
+import unittest
+
+# RootTools
+from RootTools.core.lazy import lazy, LazyAttributes, LazyEvent
+
+class Struct( object ):
+    # stands in for the event struct of a reader
+    def __init__( self ):
+        self.Jet_pt = [ 50., 20., 40. ]
+
+class LazyTest( unittest.TestCase ):
+
+    def setUp( self ):
+        self.calls = []
+
+        @lazy( "goodJets" )
+        def goodJets( event, sample ):
+            self.calls.append( "goodJets" )
+            return [ pt for pt in event.Jet_pt if pt > event.ptThreshold ]
+
+        @lazy()
+        def ht( event, sample ):
+            self.calls.append( "ht" )
+            return sum( event.goodJets )
+
+        @lazy()
+        def a( event, sample ):
+            return event.b
+
+        @lazy()
+        def b( event, sample ):
+            return event.a
+
+        self.struct = Struct()
+        self.lazyAttributes = LazyAttributes( None, [ goodJets, ht, a, b ] )
+        self.event = LazyEvent( self.struct, self.lazyAttributes )
+        self.event.ptThreshold = 30
+
+    def test_cached( self ):
+        self.assertEqual( self.event.ht, 90. )
+        self.assertEqual( self.event.ht, 90. )
+        self.assertEqual( self.calls, [ "ht", "goodJets" ] )
+        # attributes are set on the struct
+        self.assertEqual( self.struct.ptThreshold, 30 )
+        self.lazyAttributes.reset()
+        self.assertEqual( self.event.ht, 90. )
+        self.assertEqual( self.calls, [ "ht", "goodJets" ]*2 )
+
+    def test_invalidate( self ):
+        self.assertEqual( self.event.ht, 90. )
+        # ht is computed from goodJets which is computed from ptThreshold
+        self.event.ptThreshold = 45
+        self.assertEqual( self.event.ht, 50. )
+        self.event.goodJets = [ 1. ]
+        self.assertEqual( self.event.ht, 1. )
+        self.assertEqual( self.calls, [ "ht", "goodJets", "ht", "goodJets", "ht" ] )
+
+    def test_cycle( self ):
+        self.assertRaises( RuntimeError, getattr, self.event, "a" )
+
+if __name__ == '__main__':
+    unittest.main()
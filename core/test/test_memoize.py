@@ -0,0 +1,53 @@
+''' Tests of the keys of memoized sequence functions. Run with 'python -m unittest discover RootTools/core/test'.
+'''
+
+# Standard imports
+import unittest
+
+# RootTools
+import RootTools.core.memoize as memoize
+
+ptThreshold = 30
+
+def goodJets( event, sample ):
+    event.nGoodJet = len( [ pt for pt in event.Jet_pt if pt > ptThreshold ] )
+
+class FakeSample( object ):
+    def __init__( self, name, files, friends = [] ):
+        self.name     = name
+        self.treeName = "Events"
+        self.files    = files
+        self.friends  = list( friends )
+    def fingerprint( self ):
+        return repr( [ self.treeName, self.files ] )
+
+class MemoizeTest( unittest.TestCase ):
+
+    def setUp( self ):
+        self.func = memoize.MemoizedFunction( goodJets, ["nGoodJet/I"], "/tmp/memo" )
+
+    def test_global_constants( self ):
+        global ptThreshold
+        filename = self.func.filename( FakeSample( "sample", ["/nonexisting/file.root"] ) )
+        self.assertEqual( memoize.global_constants( goodJets ), [ ( 'ptThreshold', '30' ) ] )
+        ptThreshold = 40
+        try:
+            self.assertNotEqual( self.func.filename( FakeSample( "sample", ["/nonexisting/file.root"] ) ), filename )
+        finally:
+            ptThreshold = 30
+
+    def test_version( self ):
+        sample = FakeSample( "sample", ["/nonexisting/file.root"] )
+        other  = memoize.MemoizedFunction( goodJets, ["nGoodJet/I"], "/tmp/memo", version = 2 )
+        self.assertNotEqual( self.func.filename( sample ), other.filename( sample ) )
+
+    def test_memoized_friends_not_in_key( self ):
+        sample   = FakeSample( "sample", ["/nonexisting/file.root"], friends = [ ( FakeSample( "friend", ["/nonexisting/friend.root"] ), "friend" ) ] )
+        filename = self.func.filename( sample )
+        sample.friends.append( ( FakeSample( "memo", [filename] ), self.func.alias ) )
+        self.assertEqual( self.func.filename( sample ), filename )
+        sample.friends.append( ( FakeSample( "friend2", ["/nonexisting/friend2.root"] ), "friend2" ) )
+        self.assertNotEqual( self.func.filename( sample ), filename )
+
+if __name__ == '__main__':
+    unittest.main()
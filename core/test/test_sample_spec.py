@@ -0,0 +1,56 @@
+''' Tests of sample specs, pickling and copies of samples. Run with 'python -m unittest discover RootTools/core/test'.
+'''
+
+# Standard imports
+import unittest
+import copy
+import cPickle as pickle
+
+# RootTools
+from RootTools.core.SampleBase import SampleBase
+
+def sequenceFunction( event, sample ):
+    pass
+
+class SpecSample( SampleBase ):
+    constructed = 0
+    def __init__( self, name, files, normalization = None, xSection = -1, isData = False, color = 0, texName = None ):
+        super(SpecSample, self).__init__( name = name, files = files, normalization = normalization, xSection = xSection, isData = isData, color = color, texName = texName )
+        self._cache = "not kept"
+        SpecSample.constructed += 1
+
+class SampleSpecTest( unittest.TestCase ):
+
+    def setUp( self ):
+        self.sample = SpecSample( "sample", ["/nonexisting/file.root"], normalization = 2. )
+        self.sample.scale    = 0.5
+        self.sample.sequence = [ sequenceFunction ]
+        self.sample.nEvents  = 1000
+        self.sample.custom   = { 'era':'2018' }
+
+    def check( self, other ):
+        self.assertIsNot( other, self.sample )
+        self.assertEqual( ( other.name, other.files, other.normalization ), ( "sample", ["/nonexisting/file.root"], 2. ) )
+        self.assertEqual( ( other.scale, other.sequence, other.nEvents, other.custom ), ( 0.5, [ sequenceFunction ], 1000, { 'era':'2018' } ) )
+
+    def test_pickle( self ):
+        other = pickle.loads( pickle.dumps( self.sample, pickle.HIGHEST_PROTOCOL ) )
+        self.check( other )
+        self.assertEqual( other._cache, "not kept" )
+
+    def test_copy( self ):
+        # plain copies: the constructor is not run and private attributes are kept
+        constructed = SpecSample.constructed
+        self.sample._cache = "kept"
+        self.sample.weight = lambda event, sample: 1
+        shallow = copy.copy( self.sample )
+        self.check( shallow )
+        self.assertIs( shallow.custom, self.sample.custom )
+        deep = copy.deepcopy( self.sample )
+        self.check( deep )
+        self.assertIsNot( deep.custom, self.sample.custom )
+        self.assertEqual( ( shallow._cache, deep._cache ), ( "kept", "kept" ) )
+        self.assertEqual( SpecSample.constructed, constructed )
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+''' Tests of single-pass yields. Needs ROOT. Run with 'python -m unittest discover RootTools/core/test'.
+'''
+
+# Standard imports
+import unittest
+import os
+import shutil
+import tempfile
+from array import array
+
+import ROOT
+
+# RootTools
+from RootTools.core.Sample import Sample
+
+@unittest.skipUnless( isinstance( getattr( ROOT, 'TTree', None ), type ), "needs ROOT" )
+class YieldsTest( unittest.TestCase ):
+
+    def setUp( self ):
+        self.directory = tempfile.mkdtemp()
+        filename = os.path.join( self.directory, "yields.root" )
+        f = ROOT.TFile( filename, "RECREATE" )
+        tree = ROOT.TTree( "Events", "Events" )
+        nJet, Jet_pt, weight = array( 'i', [0] ), array( 'f', [0.]*5 ), array( 'f', [0.] )
+        tree.Branch( "nJet", nJet, "nJet/I" )
+        tree.Branch( "Jet_pt", Jet_pt, "Jet_pt[nJet]/F" )
+        tree.Branch( "weight", weight, "weight/F" )
+        for i in range( 20 ):
+            nJet[0] = i % 5
+            for j in range( nJet[0] ):
+                Jet_pt[j] = 10.*( i + j )
+            weight[0] = 0.5 + i
+            tree.Fill()
+        tree.Write()
+        f.Close()
+        self.sample = Sample.fromFiles( "yields", [ filename ] )
+
+    def tearDown( self ):
+        self.sample.clear()
+        shutil.rmtree( self.directory )
+
+    def test_scalar( self ):
+        selections = [ "nJet>=2", "Sum$(Jet_pt>50)>=1", "Jet_pt[0]>30" ]
+        results = self.sample.getYields( selections, weightString = "weight" )
+        for selection, result in zip( selections, results ):
+            self.assertAlmostEqual( result['val'], self.sample.getYieldFromDraw( selectionString = selection, weightString = "weight" )['val'] )
+
+    def test_array( self ):
+        self.assertRaises( ValueError, self.sample.getYields, [ "Jet_pt>30" ] )
+        self.assertRaises( ValueError, self.sample.getYields, [ "nJet>=2" ], weightString = "Jet_pt" )
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+''' Tests of the cut parsing and pruning of zone maps. Run with 'python -m unittest discover RootTools/core/test'.
+'''
+
+# Standard imports
+import unittest
+import os
+import shutil
+import tempfile
+from array import array
+
+import ROOT
+
+# RootTools
+import RootTools.core.zonemap as zonemap
+
+class ParseCutsTest( unittest.TestCase ):
+
+    def test_threshold_cuts( self ):
+        self.assertEqual( zonemap.parse_cuts( 'met_pt>100&&(4<=nJet)&&Sum$(Jet_pt>30)>=2' ), [('met_pt', '>', 100.), ('nJet', '>=', 4.)] )
+
+    def test_mixed_and_or( self ):
+        # events with ht>1000 pass without met_pt>100: no required cut
+        self.assertEqual( zonemap.parse_cuts( 'met_pt>100&&nJet>=4||ht>1000' ), [] )
+        self.assertEqual( zonemap.parse_cuts( 'nBTag>=1&&(met_pt>100&&nJet>=4||ht>1000)' ), [('nBTag', '>=', 1.)] )
+
+class EntryRangesTest( unittest.TestCase ):
+
+    def test_prune_clusters( self ):
+        zone_map = { 'entries':30, 'clusters':[(0, 10), (10, 10), (20, 10)], 'ranges':{'met_pt':(0., 500.)},
+                     'cluster_ranges':{'met_pt':[(0., 50.), (20., 500.), (10., 300.)]} }
+        cuts = zonemap.parse_cuts( 'met_pt>100' )
+        self.assertEqual( zonemap.entry_ranges( [ zone_map, zone_map ], cuts ), [(10, 20), (40, 20)] )
+        self.assertEqual( zonemap.entry_ranges( [ zone_map ], zonemap.parse_cuts( 'met_pt>100||ht>1000' ) ), [(0, 30)] )
+
+@unittest.skipUnless( isinstance( getattr( ROOT, 'TTree', None ), type ), "needs ROOT" )
+class BuildTest( unittest.TestCase ):
+
+    def setUp( self ):
+        self.directory = tempfile.mkdtemp()
+        self.filename  = os.path.join( self.directory, "vector.root" )
+        # a single cluster with many more jets than entries, the largest values in the last entries
+        f = ROOT.TFile( self.filename, "RECREATE" )
+        tree = ROOT.TTree( "Events", "Events" )
+        nJet, Jet_pt = array( 'i', [0] ), array( 'f', [0.]*50 )
+        tree.Branch( "nJet", nJet, "nJet/I" )
+        tree.Branch( "Jet_pt", Jet_pt, "Jet_pt[nJet]/F" )
+        for i in range( 10 ):
+            nJet[0] = 50
+            for j in range( 50 ):
+                Jet_pt[j] = 50*i + j
+            tree.Fill()
+        tree.Write()
+        f.Close()
+
+    def tearDown( self ):
+        shutil.rmtree( self.directory )
+
+    def test_vector_branch( self ):
+        zone_map = zonemap.build( self.filename, "Events", [ "Jet_pt", "nJet" ] )
+        self.assertEqual( tuple( zone_map['ranges']['Jet_pt'] ), ( 0., 499. ) )
+        self.assertEqual( tuple( zone_map['ranges']['nJet'] ), ( 50., 50. ) )
+        self.assertEqual( zonemap.entry_ranges( [ zone_map ], zonemap.parse_cuts( 'Jet_pt>450' ) ), [(0, 10)] )
+
+if __name__ == '__main__':
+    unittest.main()
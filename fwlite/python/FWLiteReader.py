@@ -83,6 +83,13 @@ class FWLiteReader( LooperBase ):
         self.position = 0
         return
 
+    def eventIndex( self, cacheDir = None, nThreads = 1 ):
+        ''' List of (run, lumi, evt) for all positions, read from the EventAuxiliary branch only.
+            Avoids looping over FWLite.Events. Per-file results are cached in 'cacheDir' (if not None).
+        '''
+        from RootTools.fwlite.event_index import buildEventIndex
+        return buildEventIndex( self.sample.files, cacheDir = cacheDir, nThreads = nThreads )
+
     def readProduct( self, name):
         self.sample.events.getByLabel(self.__products[name]['label'], self.handles[name])
         self.products[name] = self.handles[name].product()
@@ -15,6 +15,8 @@ logger = logging.getLogger(__name__)
 
 # RootTools imports
 import RootTools.core.helpers as helpers
+import RootTools.core.catalog as catalog
+import RootTools.core.sample_spec as sample_spec
 from RootTools.fwlite.Database import Database
 
 @helpers.static_vars(sampleCounter = 0)
@@ -43,6 +45,24 @@ class FWLiteSample ( object ):
              
         logger.debug("Created new sample %s with %i files.", name, len(self.files))
 
+    def to_spec( self ):
+        ''' Compact, picklable description of the sample without ROOT objects. See RootTools.core.sample_spec.
+        '''
+        return sample_spec.to_spec( self, {'name':self.name, 'files':list(self.files), 'color':self.color, 'texName':self.texName} )
+
+    from_spec = staticmethod( sample_spec.from_spec )
+
+    def __reduce__( self ):
+        # Pickle through the spec (FWLite.Events are not picklable)
+        return ( sample_spec.from_spec, ( self.to_spec(), ) )
+
+    # Copies do not go through the spec (__reduce__)
+    def __copy__( self ):
+        return sample_spec.plain_copy( self )
+
+    def __deepcopy__( self, memo ):
+        return sample_spec.plain_deepcopy( self, memo )
+
     @classmethod
     def fromFiles(cls, name, files,  color = 0, texName = None, maxN = None):
         '''Load sample from files or list of files. If the name is "", enumerate the sample
@@ -106,15 +126,15 @@ class FWLiteSample ( object ):
             if overwrite:
                 cache.removeObjects({"name":name})
 
-            def _dasPopen(dbs):
+            def _dasQuery(dbs):
                 if 'LSB_JOBID' in os.environ:
                     raise RuntimeError, "Trying to do a DAS query while in a LXBatch job (env variable LSB_JOBID defined)\nquery was: %s" % dbs
                 logger.info('DAS query\t: %s',  dbs)
-                return os.popen(dbs)
+                return catalog.query(dbs, check = False, useCache = not overwrite)
 
             files = []
             dbs='xrdfs %s ls %s'%(prefix,directory)
-            dbsOut = _dasPopen(dbs).readlines()
+            dbsOut = _dasQuery(dbs).splitlines()
             
             for line in dbsOut:
                 if line.startswith('/store/'):
@@ -176,17 +196,17 @@ class FWLiteSample ( object ):
             if overwrite:
                 cache.removeObjects({"name":name})
 
-            def _dasPopen(dbs):
+            def _dasQuery(dbs):
                 if 'LSB_JOBID' in os.environ:
                     raise RuntimeError, "Trying to do a DAS query while in a LXBatch job (env variable LSB_JOBID defined)\nquery was: %s" % dbs
                 logger.info('DAS query\t: %s',  dbs)
-                return os.popen(dbs)
+                return catalog.query(dbs, check = False, useCache = not overwrite)
 
             query, qwhat = DASname, "dataset"
             if "#" in DASname: qwhat = "block"
 
             dbs='dasgoclient -query="file %s=%s instance=prod/%s" --limit %i'%(qwhat,query, instance, limit)
-            dbsOut = _dasPopen(dbs).readlines()
+            dbsOut = _dasQuery(dbs).splitlines()
             
             files = []
             for line in dbsOut:
@@ -0,0 +1,109 @@
+''' Fast (run, lumi, evt) index of EDM files.
+    Reads only the EventAuxiliary branch of the 'Events' tree instead of looping with FWLite.Events.
+    The keys are read as integers (event numbers are 64 bit and would lose precision as doubles, e.g. through TTree::Draw).
+'''
+
+# Standard imports
+import ROOT
+import os
+import hashlib
+import cPickle as pickle
+
+# Logging
+import logging
+logger = logging.getLogger(__name__)
+
+# RootTools imports
+import RootTools.core.helpers as helpers
+
+def _readFileIndex( args ):
+    ''' Read (run, lumi, evt) for all entries of the tree in one file. Module level for multiprocessing.
+    '''
+    filename, treeName = args
+
+    rf = ROOT.TFile.Open( filename )
+    if not rf or rf.IsZombie():
+        raise IOError( "File %s could not be opened." % filename )
+    tree = rf.Get( treeName )
+    if not tree:
+        rf.Close()
+        raise IOError( "File %s has no tree %s." % ( filename, treeName ) )
+
+    nEntries = int( tree.GetEntries() )
+    tree.SetBranchStatus( "*", 0 )
+    tree.SetBranchStatus( "EventAuxiliary*", 1 )
+    branch = tree.GetBranch( "EventAuxiliary" )
+    if not branch:
+        rf.Close()
+        raise IOError( "Tree %s in file %s has no EventAuxiliary branch." % ( treeName, filename ) )
+    aux = ROOT.edm.EventAuxiliary()
+    tree.SetBranchAddress( "EventAuxiliary", aux )
+
+    index = []
+    for i in xrange( nEntries ):
+        if branch.GetEntry( i ) <= 0: break
+        index.append( ( int( aux.run() ), int( aux.luminosityBlock() ), int( aux.event() ) ) )
+    tree.ResetBranchAddresses()
+    rf.Close()
+
+    if len(index) != nEntries:
+        raise RuntimeError( "Read %i keys from %s but tree %s has %i entries." % ( len(index), filename, treeName, nEntries ) )
+
+    logger.debug( "Read %i (run, lumi, evt) keys from %s", len(index), filename )
+    return index
+
+# Version of the cached indices (indices read with TTree::Draw had rounded event numbers)
+_cacheVersion = 2
+
+def _cacheFilename( cacheDir, filename, treeName ):
+    ''' The cache filename depends on the name of the file and, for local files, on size and mtime.
+    '''
+    return os.path.join( cacheDir, hashlib.md5( repr( ( helpers.file_signature( filename ), treeName, _cacheVersion ) ) ).hexdigest() + '.pkl' )
+
+def _readCache( cacheDir, filename, treeName ):
+    cacheFilename = _cacheFilename( cacheDir, filename, treeName )
+    if not os.path.exists( cacheFilename ): return None
+    try:
+        with open( cacheFilename, 'rb' ) as f:
+            return pickle.load( f )
+    except ( IOError, EOFError, pickle.UnpicklingError ):
+        logger.warning( "Could not read event index cache %s. Rebuilding.", cacheFilename )
+        return None
+
+def _writeCache( cacheDir, filename, treeName, index ):
+    if not os.path.exists( cacheDir ):
+        try:
+            os.makedirs( cacheDir )
+        except OSError: # Resolve rare race condition
+            pass
+    cacheFilename = _cacheFilename( cacheDir, filename, treeName )
+    # Write to a temporary file first such that concurrent readers never see partial files
+    tmpFilename = cacheFilename + '.%i.tmp' % os.getpid()
+    with open( tmpFilename, 'wb' ) as f:
+        pickle.dump( index, f, protocol = 2 )
+    os.rename( tmpFilename, cacheFilename )
+
+def buildEventIndex( files, treeName = "Events", cacheDir = None, nThreads = 1 ):
+    ''' Return the list of (run, lumi, evt) of all events in 'files' in the order of FWLite.Events.
+        Files are read in parallel if nThreads>1. If 'cacheDir' is given, the per-file result is cached on disk.
+    '''
+    indices = {}
+    toRead  = []
+    for filename in files:
+        index = _readCache( cacheDir, filename, treeName ) if cacheDir is not None else None
+        if index is None:
+            toRead.append( filename )
+        else:
+            indices[filename] = index
+
+    logger.info( "Event index: %i files from cache, reading %i files with %i threads.", len(files) - len(toRead), len(toRead), nThreads if nThreads else 1 )
+
+    for filename, index in zip( toRead, helpers.parallel_map( _readFileIndex, [ ( f, treeName ) for f in toRead ], nThreads = nThreads ) ):
+        indices[filename] = index
+        if cacheDir is not None:
+            _writeCache( cacheDir, filename, treeName, index )
+
+    result = []
+    for filename in files:
+        result.extend( indices[filename] )
+    return result
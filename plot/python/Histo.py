@@ -0,0 +1,145 @@
+''' Compact histogram for filling and storage.
+    Sums of weights and of squared weights are numpy arrays (including under- and overflow), nothing is registered in gDirectory.
+    A ROOT TH1/TH2 is made only when needed for drawing ('to_root').
+'''
+
+# Standard imports
+import ROOT
+import bisect
+from array import array
+from math import sqrt
+
+# Optional
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Logging
+import logging
+logger = logging.getLogger(__name__)
+
+class Histo( object ):
+
+    __slots__ = ( 'name', 'title', 'histo_class', 'binning_args', 'edges', 'sumw', 'sumw2', 'entries', 'style' )
+
+    @staticmethod
+    def supports( histo_class ):
+        ''' Whether histo_class (e.g. ROOT.TH1F) can be represented by Histo. Profiles and 3D histograms can't.
+        '''
+        if np is None: return False
+        if issubclass( histo_class, (ROOT.TProfile, ROOT.TProfile2D, ROOT.TH3) ): return False
+        return issubclass( histo_class, ROOT.TH1 )
+
+    def __init__( self, name, title, binning_args, histo_class = ROOT.TH1D, style = None ):
+        ''' binning_args are the binning arguments of the constructor of histo_class, i.e.
+            (nx, xlow, xup), (nx, array('d', thresholds)), (nx, xlow, xup, ny, ylow, yup).
+        '''
+        if np is None:
+            raise ImportError( "Histo needs numpy." )
+        self.name         = name
+        self.title        = title
+        self.histo_class  = histo_class
+        self.binning_args = tuple( binning_args )
+        self.style        = style
+
+        edges = []
+        args  = list( self.binning_args )
+        while len( args ) > 0:
+            if len( args ) >= 3 and not hasattr( args[1], '__len__' ):
+                nbins, low, up = args[:3]
+                edges.append( tuple( low + ( up - low )*i/float( nbins ) for i in xrange( nbins + 1 ) ) )
+                args = args[3:]
+            else:
+                nbins, thresholds = args[:2]
+                edges.append( tuple( float( thresholds[i] ) for i in xrange( nbins + 1 ) ) )
+                args = args[2:]
+        self.edges   = tuple( edges )
+
+        self.sumw    = np.zeros( tuple( len( e ) + 1 for e in self.edges ) )
+        self.sumw2   = np.zeros( self.sumw.shape )
+        self.entries = 0
+
+    @property
+    def dimension( self ):
+        return len( self.edges )
+
+    def GetName( self ):
+        return self.name
+
+    def Fill( self, *args ):
+        ''' Fill( x, [y,] weight ) as TH1::Fill. Under- and overflow as in ROOT (upper edges belong to the next bin).
+        '''
+        weight = args[self.dimension] if len( args ) > self.dimension else 1.
+        index  = tuple( bisect.bisect_right( edges, x ) for edges, x in zip( self.edges, args ) )
+        self.sumw[index]  += weight
+        self.sumw2[index] += weight**2
+        self.entries += 1
+
+    def fill_arrays( self, args, weights ):
+        ''' Fill with arrays of x (and y) and weights.
+        '''
+        index = tuple( np.searchsorted( edges, x, side = 'right' ) for edges, x in zip( self.edges, args ) )
+        np.add.at( self.sumw,  index, weights )
+        np.add.at( self.sumw2, index, weights**2 )
+        self.entries += len( weights )
+
+    def Add( self, other, c = 1. ):
+        if not isinstance( other, Histo ):
+            raise ValueError( "Can only add Histo to Histo, got %r" % other )
+        if other.edges != self.edges:
+            raise ValueError( "Can't add histos %s and %s with different binning." % ( self.name, other.name ) )
+        self.sumw    += c*other.sumw
+        self.sumw2   += c**2*other.sumw2
+        self.entries += other.entries
+
+    def Scale( self, c ):
+        self.sumw  *= c
+        self.sumw2 *= c**2
+
+    def Reset( self ):
+        self.sumw[...]  = 0.
+        self.sumw2[...] = 0.
+        self.entries    = 0
+
+    def Integral( self ):
+        ''' Sum of weights without under- and overflow.
+        '''
+        return float( self.sumw[ tuple( slice( 1, -1 ) for e in self.edges ) ].sum() )
+
+    def Clone( self, name = None ):
+        res = Histo( name if name is not None else self.name, self.title, self.binning_args, histo_class = self.histo_class, style = self.style )
+        res.Add( self )
+        return res
+
+    def to_root( self, name = None ):
+        ''' ROOT histogram of class histo_class with the content of this histo (not registered in gDirectory). The style is applied.
+        '''
+        add_directory = ROOT.TH1.AddDirectoryStatus()
+        ROOT.TH1.AddDirectory( False )
+        try:
+            histo = self.histo_class( name if name is not None else self.name, self.title, *self.binning_args )
+        finally:
+            ROOT.TH1.AddDirectory( add_directory )
+        histo.Sumw2()
+
+        n_x = len( self.edges[0] ) + 1
+        for index in zip( *np.nonzero( self.sumw2 ) ):
+            # global bin number = ix + (nx+2)*iy as in TH1::GetBin
+            b = int( index[0] ) if self.dimension == 1 else int( index[0] ) + n_x*int( index[1] )
+            histo.SetBinContent( b, self.sumw[index] )
+            histo.SetBinError( b, sqrt( self.sumw2[index] ) )
+        histo.SetEntries( self.entries )
+
+        if self.style is not None:
+            self.style( histo )
+        return histo
+
+def to_root( histo ):
+    ''' ROOT histogram for Histo or TH1 instances (which are cloned, including their attributes).
+    '''
+    if isinstance( histo, Histo ):
+        return histo.to_root()
+    new = histo.Clone()
+    new.__dict__.update( histo.__dict__ )
+    return new
@@ -0,0 +1,160 @@
+''' Persistent cache of filled plots.
+    The histos of a plot are stored in a ROOT file in 'directory', named by a key made from the plot definition, the
+    definition of the samples in the stack and the sequence. The files of the samples (with sizes and modification times)
+    are stored alongside and must be unchanged for the cache to be used. In incremental mode ('get_incremental'),
+    only files that were added to a sample since need to be filled.
+    Styles are not cached but re-applied when loading.
+'''
+
+# Standard imports
+import ROOT
+import os
+import json
+import uuid
+import hashlib
+
+# Logging
+import logging
+logger = logging.getLogger(__name__)
+
+# RootTools
+import RootTools.core.helpers as helpers
+import RootTools.plot.Histo as Histo
+
+class HistoCache( object ):
+
+    metadata_name = "RootTools_metadata"
+
+    def __init__( self, directory ):
+        self.directory = directory
+        if not os.path.exists( self.directory ):
+            os.makedirs( self.directory )
+        logger.debug( "Created HistoCache in %s", self.directory )
+
+    @staticmethod
+    def sample_key( sample ):
+        ''' Identifies the content of a sample except for its files.
+        '''
+        return [ sample.fingerprint( withFiles = False ), getattr( sample, "scale", 1 ), helpers.function_hash( getattr( sample, "weight", None ) ) ]
+
+    @staticmethod
+    def file_signatures( plot ):
+        ''' { 'i_j':[file signatures of the sample at position (i,j) of the stack], ...}
+        '''
+        return { "%i_%i" % (i, j): [ list( helpers.file_signature( f ) ) for f in s.files ] for i, l in enumerate( plot.stack ) for j, s in enumerate( l ) }
+
+    def key( self, plot, sequence = [], max_events = -1 ):
+        ''' Cache key for plot when filled with 'sequence' and 'max_events'.
+        '''
+        tokens = [ plot.fingerprint(), [ [ self.sample_key( s ) for s in l ] for l in plot.stack ], map( helpers.function_hash, sequence ), max_events ]
+        return hashlib.md5( repr( tokens ) ).hexdigest()
+
+    def filename( self, key ):
+        return os.path.join( self.directory, key + ".root" )
+
+    def load( self, plot, key ):
+        ''' Returns (histos, metadata) as stored for key, (None, None) if there is nothing.
+            The histos are renamed, detached from the file and the sample styles are applied.
+        '''
+        filename = self.filename( key )
+        if not os.path.exists( filename ): return None, None
+        f = ROOT.TFile.Open( filename )
+        if not f or f.IsZombie():
+            logger.warning( "Could not read cache file %s for plot %s.", filename, plot.name )
+            return None, None
+        metadata = json.loads( str( f.Get( self.metadata_name ).GetString() ) )
+
+        histos = []
+        for i, l in enumerate( plot.stack ):
+            histos.append( [] )
+            for j, s in enumerate( l ):
+                histo = f.Get( "histo_%i_%i" % (i, j) ).Clone( "_".join([plot.name, s.name, str(uuid.uuid4()).replace('-','_')]) )
+                # THnSparse has neither directory nor style
+                if isinstance( histo, ROOT.TH1 ):
+                    histo.SetDirectory( 0 )
+                    if hasattr(s, "style"):
+                        s.style(histo)
+                histos[-1].append( histo )
+
+        # Weight variations (see RootTools.plot.variations)
+        if getattr( plot, "variations", None ) is not None:
+            metadata['variation_histos'] = []
+            for i, l in enumerate( plot.stack ):
+                metadata['variation_histos'].append( [] )
+                for j, s in enumerate( l ):
+                    histo = f.Get( "variations_%i_%i" % (i, j) ).Clone( "_".join([plot.name, s.name, "variations", str(uuid.uuid4()).replace('-','_')]) )
+                    histo.SetDirectory( 0 )
+                    metadata['variation_histos'][-1].append( histo )
+        f.Close()
+
+        return histos, metadata
+
+    def get( self, plot, key ):
+        ''' Cached histos of plot if none of the files of its samples changed, None otherwise.
+            Cached weight variations are set as plot.variation_histos.
+        '''
+        histos, metadata = self.load( plot, key )
+        if histos is None: return None
+        if metadata['files'] != self.file_signatures( plot ):
+            logger.debug( "Files of plot %s changed. Not using cache.", plot.name )
+            return None
+        logger.debug( "Found plot %s in cache.", plot.name )
+        if 'variation_histos' in metadata:
+            plot.variation_histos = metadata['variation_histos']
+        return histos
+
+    def get_incremental( self, plot, key ):
+        ''' Cached histos of plot and the files that still need to be filled, {(i,j):[files], ...} for the sample at (i,j) of the stack.
+            These are the new files if the cached files are unchanged, otherwise all files (and the histo is reset).
+            Samples with friends aligned by entry (no index) are always filled with all files.
+            (None, None) if there is nothing in the cache.
+        '''
+        histos, metadata = self.load( plot, key )
+        if histos is None: return None, None
+
+        files_to_fill = {}
+        signatures = self.file_signatures( plot )
+        for i, l in enumerate( plot.stack ):
+            for j, s in enumerate( l ):
+                cached  = map( tuple, metadata['files'].get( "%i_%i" % (i, j), [] ) )
+                current = map( tuple, signatures["%i_%i" % (i, j)] )
+                # Remote files have no size and mtime and are compared by name
+                if set( cached ).issubset( set( current ) ) and ( set( cached ) == set( current ) or not s.hasEntryAlignedFriends() ):
+                    files_to_fill[(i, j)] = [ c[0] for c in current if c not in cached ]
+                else:
+                    if set( cached ).issubset( set( current ) ):
+                        # the new files alone can not be read with friends that are aligned by entry with all files
+                        logger.info( "Sample %s has friends without index. Refilling plot %s for this sample.", s.name, plot.name )
+                    else:
+                        logger.info( "Files of sample %s changed or were removed. Refilling plot %s for this sample.", s.name, plot.name )
+                    histos[i][j].Reset()
+                    if 'variation_histos' in metadata:
+                        metadata['variation_histos'][i][j].Reset()
+                    files_to_fill[(i, j)] = [ c[0] for c in current ]
+
+        if 'variation_histos' in metadata:
+            plot.variation_histos = metadata['variation_histos']
+        return histos, files_to_fill
+
+    def put( self, plot, key ):
+        ''' Store the histos of plot.
+        '''
+        filename     = self.filename( key )
+        tmp_filename = filename + ".%i.tmp.root" % os.getpid()
+
+        directory = ROOT.gDirectory
+        f = ROOT.TFile( tmp_filename, "RECREATE" )
+        f.cd()
+        for i, l in enumerate( plot.histos ):
+            for j, histo in enumerate( l ):
+                Histo.to_root( histo ).Write( "histo_%i_%i" % (i, j) )
+        if getattr( plot, "variations", None ) is not None:
+            for i, l in enumerate( plot.variation_histos ):
+                for j, histo in enumerate( l ):
+                    histo.Write( "variations_%i_%i" % (i, j) )
+        ROOT.TObjString( json.dumps( {'name':plot.name, 'files':self.file_signatures( plot )} ) ).Write( self.metadata_name )
+        f.Close()
+        directory.cd()
+
+        os.rename( tmp_filename, filename )
+        logger.debug( "Stored plot %s in cache file %s", plot.name, filename )
@@ -3,11 +3,14 @@
 
 # Standard imports
 import ROOT
+import uuid
 from math import sqrt
 
 #RootTools
 from RootTools.plot.PlotBase import PlotBase
 from RootTools.core.TreeVariable import ScalarTreeVariable
+import RootTools.plot.variations as variations_
+from RootTools.plot.batch import BatchFunction
 
 def addOverFlowBin1D( histo, addOverFlowBin = None):
 
@@ -53,7 +56,7 @@ class Plot( PlotBase ):
         Plot.defaultAddOverFlowBin  = addOverFlowBin
 
     def __init__(self, stack = None, attribute = None, binning = None, name = None, selectionString = None, weight = None, histo_class = None,
-                 texX = None, texY = None, addOverFlowBin = None, read_variables = []):
+                 texX = None, texY = None, addOverFlowBin = None, read_variables = [], variations = None):
         ''' A plot needs a
         'stack' of Sample instances, e.g. [[mc1, mc2, ...], [data], [signal1, signal2,...]], 
         'attribute' Can be string -> getattr( event, attribute),  Variable instance 
@@ -61,6 +64,8 @@ class Plot( PlotBase ):
         'weight' function, 
         'histo_class', e.g. ROOT.TH1F or ROOT.TProfile1D
         'texX', 'texY' labels for x and y axis 
+        'variations' weight variations filled in the same pass, [(name, weight), ...] or ([name, ...], function returning a weight per name),
+                     not for batch attributes
         ''' 
 
         if isinstance(attribute, (list, tuple)):
@@ -84,6 +89,29 @@ class Plot( PlotBase ):
         self.binning         = binning          if binning         is not None else Plot.defaultBinning
         self.histo_class     = histo_class      if histo_class     is not None else Plot.defaultHistoClass
         self.addOverFlowBin  = addOverFlowBin   if addOverFlowBin  is not None else Plot.defaultAddOverFlowBin
+        self.variations      = variations_.normalize( variations )
+        if self.variations is not None and any( isinstance( a, BatchFunction ) for a in self.attributes ):
+            raise ValueError( "Plot %r: weight variations of batch attributes are not supported." % self.name )
+
+    def variation(self, name):
+        ''' Plot with the histos of the weight variation 'name' (after filling).
+        '''
+        if not hasattr(self, "variation_histos"):
+            raise AttributeError( "Plot %r has no attribute 'variation_histos'. Did you forget to fill or to specify variations?"%self.name )
+        k = self.variations[0].index( name )
+        histos = []
+        for i, l in enumerate( self.variation_histos ):
+            histos.append( [] )
+            for j, h in enumerate( l ):
+                projection = h.ProjectionX( "_".join( [ h.GetName(), name, str(uuid.uuid4()).replace('-','_') ] ), k+1, k+1, "e" )
+                projection.SetDirectory( 0 )
+                if self.stack is not None and hasattr( self.stack[i][j], "style" ):
+                    self.stack[i][j].style( projection )
+                histos[-1].append( projection )
+        res = Plot.fromHisto( "_".join( [ self.name, name ] ), histos, texX = self.texX, texY = self.texY )
+        res.stack          = self.stack
+        res.addOverFlowBin = self.addOverFlowBin
+        return res
 
     @classmethod
     def fromHisto(cls, name, histos, texX = defaultTexX, texY = defaultTexY):
@@ -6,10 +6,14 @@ import abc
 
 # Standard imports
 import ROOT
+import hashlib
 from math import sqrt
 
 # RootTools
 from RootTools.core.TreeVariable import ScalarTreeVariable, TreeVariable
+from RootTools.plot.Binning import Binning
+from RootTools.plot.Histo import Histo
+import RootTools.core.helpers as helpers
 
 # Can't bind lambdas to loop variable, but rather their value 
 # http://stackoverflow.com/questions/19837486/python-lambda-in-a-loop
@@ -57,8 +61,56 @@ class PlotBase( object ):
             else:
                 raise ValueError( "Don't know what to do with attribute %r" % attribute )
         return fillers
+
+    @property
+    def keyed_fillers( self ):
+        ''' [(key, filler), ...] where identical attributes (also across plots) have the same key.
+            Used to evaluate each distinct filler only once per event.
+        '''
+        keyed_fillers = []
+        for attribute, filler in zip( self.attributes, self.fillers ):
+            if type(attribute)==str:
+                keyed_fillers.append( ( ('attribute', attribute), filler ) )
+            elif isinstance( attribute, ScalarTreeVariable ):
+                keyed_fillers.append( ( ('attribute', attribute.name), filler ) )
+            else:
+                keyed_fillers.append( ( ('function', id(attribute)), filler ) )
+        return keyed_fillers
             
 
+    def fingerprint( self ):
+        ''' md5 hex digest of the plot definition: class, binning, histo class, attributes, selection, weight and weight variations.
+            Functions enter through the hash of their code (RootTools.core.helpers.function_hash).
+            Samples and stack are not part of the fingerprint.
+        '''
+        def attribute_token( attribute ):
+            if type(attribute)==str: return attribute
+            if isinstance( attribute, ScalarTreeVariable ): return attribute.name
+            return helpers.function_hash( attribute )
+
+        def binning_token( binning ):
+            if isinstance( binning, Binning ):
+                return ( binning.binning, binning.binning_is_explicit )
+            if isinstance( binning, (list, tuple) ):
+                return map( binning_token, binning )
+            return binning
+
+        binning = binning_token( getattr( self, "binning", None ) )
+        histo_class = getattr( self, "histo_class", None )
+
+        if isinstance( self.weight, (list, tuple) ):
+            weight = [ map( helpers.function_hash, w ) for w in self.weight ]
+        else:
+            weight = helpers.function_hash( self.weight )
+
+        variations = getattr( self, "variations", None )
+        if variations is not None:
+            variations = ( variations[0], helpers.function_hash( variations[1] ) )
+
+        tokens = [ type(self).__name__, repr( binning ), histo_class.__name__ if histo_class is not None else None,
+                   map( attribute_token, self.attributes ), self.selectionString, weight, variations ]
+        return hashlib.md5( repr( tokens ) ).hexdigest()
+
     @property
     def histos_added(self):
         ''' Returns [[h1], [h2], ...] where h_i are the sums of all histograms in the i-th copmponent of the plot.
@@ -70,4 +122,5 @@ class PlotBase( object ):
         for i, h in enumerate( self.histos ):
             for p in h[1:]:
                 res[i][0].Add( p )
-        return res
+        # Compact histos become ROOT histograms now
+        return [ [ h.to_root() if isinstance( h, Histo ) else h for h in l ] for l in res ]
@@ -0,0 +1,116 @@
+''' What is an N-dimensional plot?
+    A sparse histogram (THnSparse) that is filled in the same event loop as Plot and Plot2D.
+    Only filled bins use memory. For drawing, make 1D or 2D projections.
+'''
+
+# Standard imports
+import ROOT
+import uuid
+from array import array
+
+#RootTools
+from RootTools.plot.PlotBase import PlotBase
+from RootTools.plot.Binning import Binning
+from RootTools.plot.Plot import Plot
+from RootTools.plot.Plot2D import Plot2D
+
+class PlotND( PlotBase ):
+
+    defaultHistoClass      = ROOT.THnSparseD
+
+    def __init__(self, stack = None, attribute = None, binning = None, name = None, selectionString = None, weight = None, histo_class = None,
+                 texLabels = None, read_variables = []):
+        ''' An N-dimensional plot needs a
+        'stack' of Sample instances, e.g. [[mc1, mc2, ...], [data], [signal1, signal2,...]],
+        'attribute' list or tuple of N attributes (same as class Plot)
+        'binning' list of N binnings, each [n, low, high] or a Binning instance
+        'selectionString' to be used on top of each samples selectionString, a
+        'weight' function, a
+        'histo_class', e.g. ROOT.THnSparseD (default) or ROOT.THnSparseF
+        'texLabels' list of N axis labels used for the projections
+        '''
+
+        if attribute is None or binning is None or len(attribute) != len(binning):
+            raise ValueError( "PlotND needs as many binnings as attributes. Got %r and %r" % ( attribute, binning ) )
+
+        try:
+            def_name = "_vs_".join(att.name for att in attribute)
+        except:
+            def_name = None
+
+        plot_name = name if name is not None else def_name
+        if plot_name is None: raise ValueError( "PlotND needs to have a name. Found 'None'" )
+
+        super(PlotND, self).__init__( \
+            stack           = stack,
+            selectionString = selectionString,
+            weight          = weight,
+            texX            = None,
+            texY            = None,
+            name            = plot_name,
+            attributes      = attribute,
+            read_variables  = read_variables
+        )
+
+        self.binning         = binning
+        self.histo_class     = histo_class      if histo_class     is not None else PlotND.defaultHistoClass
+        self.texLabels       = texLabels        if texLabels       is not None else [ getattr( att, "name", "attribute %i" % i ) for i, att in enumerate( attribute ) ]
+
+    @property
+    def dimension( self ):
+        return len( self.attributes )
+
+    def make_histo( self, name, title ):
+        ''' Empty sparse histogram with the binning of the plot.
+        '''
+        nbins, xmin, xmax = [], [], []
+        for binning in self.binning:
+            if isinstance( binning, Binning ):
+                if binning.binning_is_explicit:
+                    nbins.append( len(binning.binning)-1 )
+                    xmin.append( binning.binning[0] )
+                    xmax.append( binning.binning[-1] )
+                    continue
+                binning = binning.binning
+            nbins.append( binning[0] )
+            xmin.append( binning[1] )
+            xmax.append( binning[2] )
+
+        histo = self.histo_class( name, title, self.dimension, array( 'i', nbins ), array( 'd', xmin ), array( 'd', xmax ) )
+        for dim, binning in enumerate( self.binning ):
+            if isinstance( binning, Binning ) and binning.binning_is_explicit:
+                histo.SetBinEdges( dim, array( 'd', binning.binning ) )
+        histo.Sumw2()
+        return histo
+
+    def projection( self, dims, name = None, texY = "Number of events" ):
+        ''' Plot (one dimension) or Plot2D (two dimensions, [x, y]) with the projections of the filled histos on 'dims'.
+            The stack and sample styles are kept, so the result can be drawn with plotting.draw/draw2D.
+        '''
+        if not hasattr(self, "histos"):
+            raise AttributeError( "Plot %r has no attribute 'histos'. Did you forget to fill?"%self.name )
+        if len( dims ) not in [1, 2]:
+            raise ValueError( "Can only project to one or two dimensions. Got %r" % ( dims, ) )
+
+        name = name if name is not None else "_".join( [ self.name, "proj" ] + map( str, dims ) )
+
+        histos = []
+        for i, l in enumerate( self.histos ):
+            histos.append( [] )
+            for j, histo in enumerate( l ):
+                if len( dims ) == 1:
+                    projection = histo.Projection( dims[0], "E" )
+                else:
+                    projection = histo.Projection( dims[1], dims[0], "E" )
+                projection.SetName( "_".join( [ name, str(uuid.uuid4()).replace('-','_') ] ) )
+                projection.SetDirectory( 0 )
+                if self.stack is not None and hasattr( self.stack[i][j], "style" ):
+                    self.stack[i][j].style( projection )
+                histos[-1].append( projection )
+
+        if len( dims ) == 1:
+            res = Plot.fromHisto( name, histos, texX = self.texLabels[dims[0]], texY = texY )
+        else:
+            res = Plot2D.fromHisto( name, histos, texX = self.texLabels[dims[0]], texY = self.texLabels[dims[1]] )
+        res.stack = self.stack
+        return res
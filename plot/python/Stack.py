@@ -2,14 +2,17 @@
 Must be a list of lists.
 '''
 # Standard imports
+import ROOT
 import uuid
 import array
 
 # RootTools
 from RootTools.core.Sample import Sample
 from RootTools.plot.Plot import Plot
+from RootTools.plot.PlotND import PlotND
 from RootTools.plot.Immutable import Immutable
 from RootTools.plot.Binning import Binning
+from RootTools.plot.Histo import Histo
 
 class Stack ( list ):
         
@@ -34,47 +37,61 @@ class Stack ( list ):
         '''
         return list(set(sum(self,[])))
 
-    def make_histos(self, plot):
+    def make_histos(self, plot, compact = False):
         '''Make histograms for plot for this stack. Structure is list of lists of histos parallel to the stack object
+           Histograms are not registered in gDirectory. If compact, RootTools.plot.Histo.Histo instances are made 
+           whenever the histo_class allows.
         '''
+        # Sparse histograms know their binning and have no style
+        if isinstance(plot, PlotND):
+            return [ [ plot.make_histo( "_".join([plot.name, s.name, str(uuid.uuid4()).replace('-','_')]), "_".join([plot.name, s.name]) ) for s in l ] for l in self ]
+
+        if isinstance(plot.binning, Binning):
+            if plot.binning.binning_is_explicit:
+                # explicit binning with thresholds
+                binning_args = ( len(plot.binning.binning)-1, array.array('d', plot.binning.binning) )
+            else:
+                # default case (but using Binning class)
+                binning_args = tuple( plot.binning.binning )
+        elif type(plot.binning)==type([]) or type(plot.binning)==type(()): 
+            # default case: Binning is specified as [n, x0, x1]
+            binning_args = tuple( plot.binning )
+        else:
+            raise ValueError( "Don't know what to do with binning of plot %s: %r"%( plot.name, plot.binning ) )
+
+        compact = compact and Histo.supports( plot.histo_class )
+
         res = []
-        for i, l in enumerate(self):
-            histos = [] 
-            for j, s in enumerate(l):
-                if isinstance(plot.binning, Binning):
-                    if plot.binning.binning_is_explicit:
-                        # explicit binning with thresholds
-                        histo = plot.histo_class(\
-                            "_".join([plot.name, s.name, str(uuid.uuid4()).replace('-','_')]), 
-                            "_".join([plot.name, s.name]), 
-                             len(plot.binning.binning)-1, array.array('d', plot.binning.binning) )
-                    else:
-                        # default case (but using Binning class)
-                        histo = plot.histo_class(\
-                            "_".join([plot.name, s.name, str(uuid.uuid4()).replace('-','_')]), 
-                            "_".join([plot.name, s.name]), 
-                             *plot.binning.binning )
-                elif type(plot.binning)==type([]) or type(plot.binning)==type(()): 
-                    # default case: Binning is specified as [n, x0, x1]
+        add_directory = ROOT.TH1.AddDirectoryStatus()
+        ROOT.TH1.AddDirectory( False )
+        try:
+            for i, l in enumerate(self):
+                histos = [] 
+                for j, s in enumerate(l):
+                    if compact:
+                        histos.append( Histo( "_".join([plot.name, s.name]), "_".join([plot.name, s.name]), binning_args, 
+                                              histo_class = plot.histo_class, style = s.style if hasattr(s, "style") else None ) )
+                        continue
+
                     histo = plot.histo_class(\
                         "_".join([plot.name, s.name, str(uuid.uuid4()).replace('-','_')]), 
                         "_".join([plot.name, s.name]), 
-                         *plot.binning )
-                else:
-                    raise ValueError( "Don't know what to do with binning of plot %s: %r"%( plot.name, plot.binning ) )
+                         *binning_args )
 
-                histo.Reset()
+                    histo.Reset()
 
-                # Default sumW2
-                try: histo.Sumw2()
-                except: pass
+                    # Default sumW2
+                    try: histo.Sumw2()
+                    except: pass
 
-                # Exectute style function on histo
-                if hasattr(s, "style"):
-                    s.style(histo)
+                    # Exectute style function on histo
+                    if hasattr(s, "style"):
+                        s.style(histo)
 
-                histos.append(histo)
-            res.append(histos)
+                    histos.append(histo)
+                res.append(histos)
+        finally:
+            ROOT.TH1.AddDirectory( add_directory )
             
         return res 
 
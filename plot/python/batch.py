@@ -0,0 +1,230 @@
+''' Chunk-wise filling of histograms with numpy.
+    Fill arguments are buffered for 'batch_size' events, histogrammed with numpy and then written to the histograms.
+    Attributes and weights decorated with 'batch' are evaluated once per chunk on numpy arrays, e.g.
+
+    @batch( 'met_pt', 'met_phi' )
+    def met_px( arrays, sample ):
+        return arrays.met_pt*np.cos( arrays.met_phi )
+
+    Batch attributes return one value per event. NaN plays the role of None for ordinary attributes (the event is not filled).
+'''
+
+# Standard imports
+import ROOT
+from math import sqrt
+
+# Optional
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Logging
+import logging
+logger = logging.getLogger(__name__)
+
+# RootTools
+from RootTools.plot.Histo import Histo
+import RootTools.plot.variations as variations
+
+def _require_numpy():
+    if np is None:
+        raise ImportError( "Batch filling needs numpy." )
+
+class Arrays( object ):
+    ''' Columns of a chunk of events, accessible as attributes.
+    '''
+    def __init__( self, **columns ):
+        self.__dict__.update( columns )
+
+class BatchFunction( object ):
+    ''' Function acting on Arrays of 'variables' for a chunk of events.
+        Can also be called like an ordinary attribute or weight ( event, sample ).
+    '''
+    def __init__( self, func, variables ):
+        self.func      = func
+        self.variables = tuple( variables )
+        self.__name__  = getattr( func, '__name__', 'batch_function' )
+        self.__doc__   = func.__doc__
+
+    def evaluate( self, arrays, sample ):
+        return np.asarray( self.func( arrays, sample ), dtype = 'd' )
+
+    def __call__( self, event, sample ):
+        ''' Evaluate for a single event, i.e. outside of batch filling.
+        '''
+        arrays = Arrays( **{ v:np.array( [ getattr( event, v ) ] ) for v in self.variables } )
+        value  = float( self.evaluate( arrays, sample )[0] )
+        return None if np.isnan( value ) else value
+
+def batch( *variables ):
+    ''' Decorator for attributes and weights that act on arrays of the event attributes 'variables'.
+    '''
+    _require_numpy()
+    def decorator( func ):
+        return BatchFunction( func, variables )
+    return decorator
+
+def _edges( axis ):
+    return np.array( [ axis.GetBinLowEdge(i) for i in range( 1, axis.GetNbins()+2 ) ], dtype = 'd' )
+
+def fill_arrays( histo, args, weights ):
+    ''' Fill 'histo' with arrays of x (and y, z) and weights. Under- and overflow are treated as in TH1::Fill.
+    '''
+    n = len( weights )
+    if n == 0: return
+
+    if isinstance( histo, Histo ):
+        histo.fill_arrays( args, weights )
+        return
+
+    # Profiles need the mean per bin; let ROOT do it
+    if isinstance( histo, ROOT.TProfile ):
+        histo.FillN( n, np.ascontiguousarray( args[0] ), np.ascontiguousarray( args[1] ), np.ascontiguousarray( weights ) )
+        return
+    if isinstance( histo, ROOT.TProfile2D ) or isinstance( histo, ROOT.TH3 ):
+        for fill_args in zip( *( list( args ) + [ weights ] ) ):
+            histo.Fill( *fill_args )
+        return
+    # THnSparse takes an array of coordinates
+    if isinstance( histo, ROOT.THnBase ):
+        for x, w in zip( np.column_stack( args ), weights ):
+            histo.Fill( np.ascontiguousarray( x ), w )
+        return
+
+    # global bin number = ix + (nx+2)*iy as in TH1::GetBin
+    bins   = np.searchsorted( _edges( histo.GetXaxis() ), args[0], side = 'right' )
+    n_bins = histo.GetNbinsX() + 2
+    if isinstance( histo, ROOT.TH2 ):
+        bins   = bins + n_bins*np.searchsorted( _edges( histo.GetYaxis() ), args[1], side = 'right' )
+        n_bins = n_bins*( histo.GetNbinsY() + 2 )
+
+    counts = np.bincount( bins, minlength = n_bins )
+    sumw   = np.bincount( bins, weights = weights, minlength = n_bins )
+    sumw2  = np.bincount( bins, weights = weights**2, minlength = n_bins )
+
+    # SetBinContent increments the number of entries
+    entries = histo.GetEntries()
+    for b in np.flatnonzero( counts ):
+        b = int( b )
+        histo.SetBinContent( b, histo.GetBinContent( b ) + sumw[b] )
+        histo.SetBinError( b, sqrt( histo.GetBinError( b )**2 + sumw2[b] ) )
+    histo.SetEntries( entries + n )
+
+class HistoBuffer( object ):
+    ''' Fill arguments, weights and positions in the chunk for one histogram of a fill plan.
+    '''
+    def __init__( self, histo, filler_indices, weight_index ):
+        self.histo          = histo
+        self.filler_indices = filler_indices
+        self.weight_index   = weight_index
+        self.reset()
+
+    def reset( self ):
+        self.args      = [ [] for i in self.filler_indices ]
+        self.weights   = []
+        self.positions = []
+
+    def append( self, args, weight, position ):
+        for a, arg in zip( self.args, args ):
+            a.append( arg )
+        self.weights.append( weight )
+        self.positions.append( position )
+
+    def flush( self, batch_values, batch_weights ):
+        ''' Combine buffered values with the values of batch functions (indexed by filler/weight index) and fill.
+        '''
+        if len( self.weights ) > 0:
+            positions = np.array( self.positions, dtype = int )
+            weights   = np.array( self.weights, dtype = 'd' )
+            if self.weight_index in batch_weights:
+                weights = weights*batch_weights[self.weight_index][positions]
+            args = [ batch_values[i][positions] if i in batch_values else np.array( a, dtype = 'd' ) for i, a in zip( self.filler_indices, self.args ) ]
+
+            mask = ~np.isnan( weights )
+            for arg in args:
+                mask &= ~np.isnan( arg )
+
+            fill_arrays( self.histo, [ arg[mask] for arg in args ], weights[mask] )
+        self.reset()
+
+def fill_plan( reader, sample, plan, sample_scale_factor = 1, batch_size = 10000, max_events = -1 ):
+    ''' Run 'reader' and fill the histograms of a fill plan (see plotting.make_fill_plan) chunk-wise.
+    '''
+    _require_numpy()
+
+    fillers, weight_functions = plan['fillers'], plan['weights']
+    batch_filler_indices = [ i for i, f in enumerate( fillers ) if isinstance( f, BatchFunction ) ]
+    batch_weight_indices = [ i for i, w in enumerate( weight_functions ) if isinstance( w, BatchFunction ) ]
+
+    # Event attributes needed by batch functions
+    batch_variables = []
+    for f in [ fillers[i] for i in batch_filler_indices ] + [ weight_functions[i] for i in batch_weight_indices ]:
+        for v in f.variables:
+            if v not in batch_variables: batch_variables.append( v )
+    columns = { v:[] for v in batch_variables }
+
+    if any( filler_index in batch_filler_indices for accumulator, filler_index, variation_index in plan['variation_entries'] ):
+        # rejected by Plot already
+        raise ValueError( "Weight variations of batch attributes are not supported." )
+
+    buffers = [ HistoBuffer( *entry ) for entry in plan['entries'] ]
+    # Which arguments of a histogram come from ordinary fillers
+    scalar_arg_masks = [ [ i not in batch_filler_indices for i in b.filler_indices ] for b in buffers ]
+
+    # Placeholders for batch functions, replaced when the chunk is flushed
+    values  = [ 0. ]*len( fillers )
+    weights = [ 1. ]*len( weight_functions )
+
+    def flush():
+        arrays = Arrays( **{ v:np.array( columns[v] ) for v in batch_variables } )
+        batch_values  = { i:fillers[i].evaluate( arrays, sample ) for i in batch_filler_indices }
+        batch_weights = { i:weight_functions[i].evaluate( arrays, sample ) for i in batch_weight_indices }
+        for b in buffers:
+            b.flush( batch_values, batch_weights )
+        for v in batch_variables:
+            columns[v] = []
+
+    reader.start()
+    counter  = 0
+    position = 0
+    while reader.run():
+        sample_weight = sample_scale_factor if sample.weight is None else sample.weight( reader.event, sample )*sample_scale_factor
+        for i, w in enumerate( weight_functions ):
+            if i in batch_weight_indices:
+                weights[i] = sample_weight
+            else:
+                weights[i] = sample_weight if w is None else w( reader.event, sample )*sample_weight
+        for i, f in enumerate( fillers ):
+            if i not in batch_filler_indices:
+                values[i] = f( reader.event, sample )
+        for v in batch_variables:
+            columns[v].append( getattr( reader.event, v ) )
+        if len( plan['variation_entries'] ) > 0:
+            variations.fill_event( plan, values, sample_weight, reader.event, sample )
+
+        for b, scalar_arg_mask in zip( buffers, scalar_arg_masks ):
+            weight = weights[b.weight_index]
+            args   = [ values[i] for i in b.filler_indices ]
+            # vector args; values of batch functions are broadcast
+            if any( isinstance( a, (tuple, list) ) for a, s in zip( args, scalar_arg_mask ) if s ):
+                length = min( len( a ) for a in args if isinstance( a, (tuple, list) ) )
+                for j in xrange( length ):
+                    b.append( [ a[j] if isinstance( a, (tuple, list) ) else a for a in args ], weight, position )
+            # scalar args
+            else:
+                if None in args: continue
+                b.append( args, weight, position )
+
+        position += 1
+        if position == batch_size:
+            flush()
+            position = 0
+
+        if max_events > 0:
+            counter += 1
+            if counter > max_events:
+                logger.debug( "Stop filling histograms because counter is %i and max_events is %i", counter, max_events )
+                break
+
+    flush()
@@ -11,12 +11,20 @@ import os
 import copy
 from math import log
 import uuid
+import time
+from array import array
+import json
+import hashlib
 
 # RootTools
 import RootTools.core.TreeVariable as TreeVariable
 import RootTools.plot.Plot as Plot
+import RootTools.plot.Plot2D as Plot2D
+import RootTools.plot.Histo as Histo
 import RootTools.core.helpers as helpers
 import RootTools.plot.helpers as plot_helpers
+import RootTools.plot.batch as batch
+import RootTools.plot.variations as variations
 
 
 def getLegendMaskedArea(legend_coordinates, pad):
@@ -32,10 +40,171 @@ def getLegendMaskedArea(legend_coordinates, pad):
         'xUpperEdge':constrain( (legend_coordinates[2] - pad.GetLeftMargin())/(1.-pad.GetLeftMargin()-pad.GetRightMargin()), interval = [0, 1] )
         }
 
-def fill(plots, read_variables = [], sequence=[], max_events = -1 ):
+def fill_method( histo ):
+    ''' Returns fill( x, [y, ...], weight ) for histo. THnSparse takes an array of coordinates.
+    '''
+    if isinstance( histo, ROOT.THnBase ):
+        return lambda *args: histo.Fill( array( 'd', args[:-1] ), args[-1] )
+    return histo.Fill
+
+def make_fill_plan( plots_for_sample ):
+    ''' Group identical fillers and weight functions of plots (with 'sample_indices' and 'tmp_weight_' set for the current sample).
+        Returns {'fillers':[...], 'weights':[...], 'entries':[(histo, filler_indices, weight_index), ...], 
+                 'variation_functions':[...], 'variation_entries':[(accumulator, filler_index, variation_index), ...]}
+        such that the event loop evaluates each distinct filler and weight once and fans out to the histograms.
+        A weight of None stands for the sample weight only. Weight variations are described in RootTools.plot.variations.
+    '''
+    fillers, filler_keys = [], []
+    weights, weight_keys = [], []
+    entries = []
+    variation_functions, variation_keys = [], []
+    variation_entries = []
+
+    for plot in plots_for_sample:
+        filler_indices = []
+        for key, filler in plot.keyed_fillers:
+            if key not in filler_keys:
+                filler_keys.append( key )
+                fillers.append( filler )
+            filler_indices.append( filler_keys.index( key ) )
+        filler_indices = tuple( filler_indices )
+
+        for index in plot.sample_indices:
+            weight = plot.tmp_weight_[index[0]][index[1]]
+            weight_key = None if weight is None else id( weight )
+            if weight_key not in weight_keys:
+                weight_keys.append( weight_key )
+                weights.append( weight )
+            entries.append( ( plot.histos[index[0]][index[1]], filler_indices, weight_keys.index( weight_key ) ) )
+
+        # Weight variations are filled from the same filler value
+        if getattr( plot, "variations", None ) is not None:
+            variation_function = plot.variations[1]
+            if id( variation_function ) not in variation_keys:
+                variation_keys.append( id( variation_function ) )
+                variation_functions.append( variation_function )
+            for index in plot.sample_indices:
+                variation_entries.append( ( variations.VariationAccumulator( plot.variation_histos[index[0]][index[1]] ), filler_indices[0], variation_keys.index( id( variation_function ) ) ) )
+
+    return {'fillers':fillers, 'weights':weights, 'entries':entries, 'variation_functions':variation_functions, 'variation_entries':variation_entries}
+
+def _fill_sample( sample, plots_for_sample, selectionString, read_variables = [], sequence = [], max_events = -1, batch_size = None ):
+    ''' Run over sample and fill the histos of plots_for_sample at the positions 'plot.sample_indices'
+        with the weights 'plot.tmp_weight_'. Helper for 'fill'.
+    '''
+    # Make reader
+    # Add variables from the plots (if any)
+    read_variables_plot = [] 
+    for p in plots_for_sample:
+        for variable in p.tree_variables:
+            if variable not in read_variables_plot:  read_variables_plot.append( variable )
+
+    # Check if we need to add sample dependend variables
+    read_variables_sample = []
+    if hasattr(sample, "read_variables"): 
+        for v in sample.read_variables:
+            if type(v) == type(""):
+                read_variables_sample.extend( helpers.fromString( v ) )
+            else: 
+                read_variables_sample.append( v )
+    # Create reader and run it over sample, fill the plots
+    r = sample.treeReader( variables = read_variables + read_variables_plot + read_variables_sample, sequence = sequence, selectionString = selectionString )
+
+    # Scaling sample
+    sample_scale_factor = 1 if not hasattr(sample, "scale") else sample.scale
+
+    if not hasattr(sample, "weight"):
+        sample.weight = None
+
+    # Group identical fillers and weights of all plots such that each is evaluated once per event
+    plan = make_fill_plan( plots_for_sample )
+    logger.debug( "Fill plan for sample %s: %i distinct fillers and %i distinct weights for %i histograms.",
+        sample.name, len(plan['fillers']), len(plan['weights']), len(plan['entries']) )
+    fillers, weight_functions, entries = plan['fillers'], plan['weights'], plan['entries']
+
+    if batch_size is not None:
+        batch.fill_plan( r, sample, plan, sample_scale_factor = sample_scale_factor, batch_size = batch_size, max_events = max_events )
+    else:
+        fill_entries = [ ( fill_method( histo ), filler_indices, weight_index ) for histo, filler_indices, weight_index in entries ]
+        r.start()
+        counter = 0
+        while r.run():
+            # Sample weight and scale are common to all histograms
+            sample_weight = sample_scale_factor if sample.weight is None else sample.weight( r.event, sample )*sample_scale_factor
+
+            # Evaluate each distinct weight and filler once
+            weights = [ sample_weight if w is None else w( r.event, sample )*sample_weight for w in weight_functions ]
+            values  = [ filler( r.event, sample ) for filler in fillers ]
+
+            if len( plan['variation_entries'] ) > 0:
+                variations.fill_event( plan, values, sample_weight, r.event, sample )
+
+            for fill_, filler_indices, weight_index in fill_entries:
+                weight = weights[weight_index]
+
+                #Get x,y or just x which could be lists
+                TH_fill_args = [ values[i] for i in filler_indices ]
+                # loop over vector args
+                if isinstance( TH_fill_args[0], (tuple, list) ):
+                    for args in zip( *TH_fill_args ):
+                        args += (weight,)
+                        fill_( *args )
+                # scalar args
+                else:
+                    # Experimental. Can make a cut by having an attribute return None 
+                    if None in TH_fill_args: continue
+                    TH_fill_args.append(weight)
+                    fill_( *TH_fill_args )
+
+            if max_events > 0: 
+                counter += 1
+                if counter > max_events: 
+                    logger.debug( "Stop filling histograms because counter is %i and max_events is %i", counter, max_events )
+                    break
+
+    variations.flush( plan )
+
+    r.cleanUpTempFiles() #FIXME improved cleanup logic
+
+def fill(plots, read_variables = [], sequence=[], max_events = -1, batch_size = None, cache = None, incremental = False, compact = False ):
     '''Create histos and fill all plots
+       If 'batch_size' is given, fills are accumulated with numpy for chunks of 'batch_size' events and
+       attributes/weights decorated with RootTools.plot.batch.batch are evaluated on arrays (see there).
+       If 'cache' (a RootTools.plot.HistoCache instance) is given, plots found there are not filled again 
+       and the others are stored after filling. With 'incremental', cached plots are also used when files were added 
+       to their samples: only the new files are filled and added to the cached histos.
+       If 'compact', histos are RootTools.plot.Histo.Histo instances (numpy arrays) where possible and ROOT histograms
+       are made only for drawing.
     '''
 
+    if incremental and cache is None:
+        raise ValueError( "Incremental filling needs a cache." )
+
+    # Take plots from the cache
+    if cache is not None:
+        cache_keys = [ cache.key( p, sequence = sequence, max_events = max_events ) for p in plots ]
+        plots_to_fill = []
+        for p, key in zip( plots, cache_keys ):
+            if incremental:
+                histos, files_to_fill = cache.get_incremental( p, key )
+                if histos is None:
+                    plots_to_fill.append( (p, key) )
+                elif any( len( files ) > 0 for files in files_to_fill.values() ):
+                    p.histos        = histos
+                    p.files_to_fill = files_to_fill
+                    plots_to_fill.append( (p, key) )
+                else:
+                    p.histos = histos
+                continue
+
+            histos = cache.get( p, key )
+            if histos is None:
+                plots_to_fill.append( (p, key) )
+            else:
+                p.histos = histos
+        logger.info( "Found %i of %i plots in cache.", len(plots) - len(plots_to_fill), len(plots) )
+        plots = [ p for p, key in plots_to_fill ]
+
     # Unique list of selection strings
     selectionStrings    = list(set(p.selectionString for p in plots))
 
@@ -58,9 +227,12 @@ def fill(plots, read_variables = [], sequence=[], max_events = -1 ):
         logger.info( "Found %i different samples for this selectionString."%len(samples) )
         logger.debug("The samples are: %s", ",".join([s.name for s in samples]))        
 
-        # Give histos to plot
+        # Give histos to plot (unless we add to cached histos)
         for p in plots_for_selection:
-            p.histos = p.stack.make_histos(p)
+            if not hasattr( p, "files_to_fill" ):
+                p.histos = p.stack.make_histos(p, compact = compact)
+                if getattr( p, "variations", None ) is not None:
+                    p.variation_histos = variations.make_histos( p )
 
         for sample in samples:
             logger.info( "Now working on sample %s" % sample.name )
@@ -88,72 +260,46 @@ def fill(plots, read_variables = [], sequence=[], max_events = -1 ):
                 else:
                     plot.tmp_weight_ = [[plot.weight for s in s2] for s2 in plot.stack ]
                 
-            # Make reader
-            # Add variables from the plots (if any)
-            read_variables_plot = [] 
-            for p in plots_for_sample:
-                for variable in p.tree_variables:
-                    if variable not in read_variables_plot:  read_variables_plot.append( variable )
-
-            # Check if we need to add sample dependend variables
-            read_variables_sample = []
-            if hasattr(sample, "read_variables"): 
-                for v in sample.read_variables:
-                    if type(v) == type(""):
-                        read_variables_sample.extend( helpers.fromString( v ) )
-                    else: 
-                        read_variables_sample.append( v )
-            # Create reader and run it over sample, fill the plots
-            r = sample.treeReader( variables = read_variables_ + read_variables_plot + read_variables_sample, sequence = sequence, selectionString = selectionString )
-
-            # Scaling sample
-            sample_scale_factor = 1 if not hasattr(sample, "scale") else sample.scale
-
-            if not hasattr(sample, "weight"):
-                sample.weight = None
-
-            # Buffer the fillers for the event loop ... could be done with a decorator but prefer to be explicit. 
+            # In incremental mode, only some files may have to be filled for some of the histos
+            groups = {}
             for plot in plots_for_sample:
-                plot.store_fillers = plot.fillers
+                for index in plot.sample_indices:
+                    files = tuple( plot.files_to_fill[index] ) if hasattr( plot, "files_to_fill" ) else tuple( sample.files )
+                    if len( files ) > 0:
+                        groups.setdefault( files, [] ).append( (plot, index) )
 
-            r.start()
-            counter = 0
-            while r.run():
+            for files, plot_indices in groups.iteritems():
+                plots_for_files = []
                 for plot in plots_for_sample:
-                    for index in plot.sample_indices:
-
-                        #Get weight
-                        tmp_weight_ = plot.tmp_weight_[index[0]][index[1]]
-                        weight  = 1 if tmp_weight_ is None else tmp_weight_( r.event, sample )
-                        if sample.weight is not None: weight *= sample.weight( r.event, sample )
-                        weight*=sample_scale_factor
-
-                        #Get x,y or just x which could be lists
-                        TH_fill_args = [ filler( r.event, sample ) for filler in plot.store_fillers ]
-                        # loop over vector args
-                        if isinstance( TH_fill_args[0], (tuple, list) ):
-                            for args in zip( *TH_fill_args ):
-                                args += (weight,)
-                                plot.histos[index[0]][index[1]].Fill( *args )
-                        # scalar args
-                        else:
-                            # Experimental. Can make a cut by having an attribute return None 
-                            if None in TH_fill_args: continue
-                            TH_fill_args.append(weight)
-                            plot.histos[index[0]][index[1]].Fill( *TH_fill_args )
-
-                if max_events > 0: 
-                    counter += 1
-                    if counter > max_events: 
-                        logger.debug( "Stop filling histograms because counter is %i and max_events is %i", counter, max_events )
-                        break
+                    plot.sample_indices = [ index for p, index in plot_indices if p is plot ]
+                    if len( plot.sample_indices ) > 0: plots_for_files.append( plot )
+
+                if list( files ) == sample.files:
+                    _fill_sample( sample, plots_for_files, selectionString, read_variables = read_variables_, sequence = sequence, max_events = max_events, batch_size = batch_size )
+                else:
+                    # the friends would not be cut down to the matching files (see HistoCache.get_incremental)
+                    if sample.hasEntryAlignedFriends():
+                        raise RuntimeError( "Can not fill only some files of sample %s with friends without index." % sample.name )
+                    logger.info( "Filling %i of %i files of sample %s for %i plot(s).", len( files ), len( sample.files ), sample.name, len( plots_for_files ) )
+                    all_files    = sample.files
+                    sample.files = list( files )
+                    sample.clear()
+                    try:
+                        _fill_sample( sample, plots_for_files, selectionString, read_variables = read_variables_, sequence = sequence, max_events = max_events, batch_size = batch_size )
+                    finally:
+                        sample.files = all_files
+                        sample.clear()
 
             # Clean up
             for plot in plots_for_sample:
                 del plot.sample_indices
-                del plot.store_fillers
 
-            r.cleanUpTempFiles() #FIXME improved cleanup logic
+
+    if cache is not None:
+        for p, key in plots_to_fill:
+            cache.put( p, key )
+            if hasattr( p, "files_to_fill" ):
+                del p.files_to_fill
 
 def fill_with_draw(plots, weight_string = "(1)"):
     '''Create and fill all plots using Sample.chain.Draw
@@ -172,9 +318,11 @@ def fill_with_draw(plots, weight_string = "(1)"):
         samples = list(set(sum([p.stack.samples for p in plots_for_selection], [])))
         logger.info( "Found %i different samples for this selectionString."%len(samples) )
 
-        # Give histos to plot
+        # Give histos to plot. 'Draw' finds them in gDirectory.
         for p in plots_for_selection:
             p.histos = p.stack.make_histos(p)
+            for h in sum( p.histos, [] ):
+                h.SetDirectory( ROOT.gDirectory )
 
         for sample in samples:
             weight_string_ = sample.combineWithSampleWeight( weight_string )
@@ -218,6 +366,121 @@ def fill_with_draw(plots, weight_string = "(1)"):
             for plot in plots_for_sample:
                 del plot.sample_indices
 
+def _rdataframe_column( attribute ):
+    ''' Expression for an attribute that RDataFrame can handle, None otherwise.
+    '''
+    if type(attribute)==str: return None if helpers.usesDrawSyntax( attribute ) else attribute
+    if isinstance( attribute, TreeVariable.ScalarTreeVariable ): return attribute.name
+    return None
+
+def _rdataframe_model( histo ):
+    ''' RDataFrame model with the binning of histo (TH1, TH2 or TProfile).
+    '''
+    def axis_args( axis ):
+        if axis.GetXbins().GetSize() > 0:
+            return ( axis.GetNbins(), axis.GetXbins().GetArray() )
+        return ( axis.GetNbins(), axis.GetXmin(), axis.GetXmax() )
+
+    args = ( histo.GetName(), histo.GetTitle() ) + axis_args( histo.GetXaxis() )
+    if isinstance( histo, ROOT.TProfile ):
+        return ROOT.RDF.TProfile1DModel( *args )
+    elif isinstance( histo, ROOT.TH2 ):
+        return ROOT.RDF.TH2DModel( *( args + axis_args( histo.GetYaxis() ) ) )
+    else:
+        return ROOT.RDF.TH1DModel( *args )
+
+def fill_with_rdataframe(plots, weight_string = None, nThreads = 0, read_variables = [], sequence = []):
+    '''Create histos and fill all plots with one RDataFrame graph per sample, running with implicit multithreading ('nThreads' = 0: all cores, None: single threaded).
+       Attributes must be strings or ScalarTreeVariables and weights are given by 'weight_string' (combined with the sample weightString).
+       Plots with python attributes or weight functions (also of the samples) and plots with strings in TTree::Draw syntax
+       (e.g. 'Sum$', friend aliases, see helpers.usesDrawSyntax) are filled with 'fill' (using 'read_variables' and 'sequence').
+       Implicit multithreading is disabled again afterwards if it was enabled here.
+    '''
+
+    if not hasattr( ROOT.ROOT, "RDataFrame" ):
+        raise RuntimeError( "ROOT %s has no RDataFrame. Use 'fill'." % ROOT.gROOT.GetVersion() )
+
+    def can_do( plot ):
+        if plot.weight is not None or getattr( plot, "variations", None ) is not None: return False
+        if any( _rdataframe_column( attribute ) is None for attribute in plot.attributes ): return False
+        if any( getattr( sample, "weight", None ) is not None for sample in plot.stack.samples ): return False
+        strings = [ plot.selectionString ] + sum( [ [ sample.selectionString, sample.combineWithSampleWeight( weight_string ) ] for sample in plot.stack.samples ], [] )
+        if any( helpers.usesDrawSyntax( s ) for s in strings ): return False
+        return issubclass( plot.histo_class, ROOT.TH1 ) and not issubclass( plot.histo_class, (ROOT.TProfile2D, ROOT.TH3) )
+
+    plots_rdf  = [ p for p in plots if can_do( p ) ]
+    plots_loop = [ p for p in plots if p not in plots_rdf ]
+
+    # Give histos to plot
+    for p in plots_rdf:
+        p.histos = p.stack.make_histos(p)
+
+    if len( plots_loop ) > 0:
+        logger.info( "Filling %i plot(s) with python attributes or weights in the event loop: %s", len( plots_loop ), ",".join( p.name for p in plots_loop ) )
+        fill( plots_loop, read_variables = read_variables, sequence = sequence )
+    if len( plots_rdf ) == 0: return
+
+    enabledMT = nThreads is not None and not ROOT.ROOT.IsImplicitMTEnabled()
+    if enabledMT:
+        ROOT.ROOT.EnableImplicitMT( nThreads )
+    try:
+        _fill_with_rdataframe( plots_rdf, weight_string )
+    finally:
+        # later TreeReaders and Draw calls must not be affected
+        if enabledMT:
+            ROOT.ROOT.DisableImplicitMT()
+
+def _fill_with_rdataframe( plots_rdf, weight_string ):
+    samples = list(set(sum([p.stack.samples for p in plots_rdf], [])))
+    logger.info( "Filling %i plots for %i samples with RDataFrame.", len( plots_rdf ), len( samples ) )
+
+    for sample in samples:
+        df = sample.getRDataFrame()
+        plots_for_sample = [ p for p in plots_rdf if sample in p.stack.samples ]
+
+        # Define each distinct attribute once
+        columns = {}
+        for plot in plots_for_sample:
+            for attribute in plot.attributes:
+                expression = _rdataframe_column( attribute )
+                if expression not in columns:
+                    columns[expression] = "RootTools_column_%i" % len( columns )
+                    df = df.Define( columns[expression], expression )
+
+        weight_string_ = sample.combineWithSampleWeight( weight_string )
+        if weight_string_:
+            df = df.Define( "RootTools_weight", weight_string_ )
+        logger.info( "Now working on sample %s with weight_string %s", sample.name, weight_string_ )
+
+        # One filter per selection string, all histograms are booked before the (single) event loop runs
+        filters = {}
+        results = []
+        for plot in plots_for_sample:
+            if plot.selectionString not in filters:
+                filters[plot.selectionString] = df.Filter( plot.selectionString ) if plot.selectionString else df
+            node = filters[plot.selectionString]
+            args = [ columns[_rdataframe_column( attribute )] for attribute in plot.attributes ]
+            if weight_string_: args.append( "RootTools_weight" )
+
+            for index in plot.stack.getSampleIndicesInStack( sample ):
+                histo = plot.histos[index[0]][index[1]]
+                model = _rdataframe_model( histo )
+                if isinstance( histo, ROOT.TProfile ):
+                    result = node.Profile1D( model, *args )
+                elif isinstance( histo, ROOT.TH2 ):
+                    result = node.Histo2D( model, *args )
+                else:
+                    result = node.Histo1D( model, *args )
+                results.append( ( plot, histo, result ) )
+
+        # Runs the event loop
+        sample_scale_factor = 1 if not hasattr(sample, "scale") else sample.scale
+        for plot, histo, result in results:
+            histo.Add( result.GetPtr() )
+            if sample_scale_factor != 1:
+                histo.Scale( sample_scale_factor )
+            logger.debug( "Sample %s plot %s has integral %3.2f.", sample.name, plot.name, histo.Integral() )
+
 def draw(plot, \
         yRange = "auto", 
         extensions = ["pdf", "png", "root"], 
@@ -268,7 +531,7 @@ def draw(plot, \
         ratio = defaultRatioStyle
 
     # Clone (including any attributes) and add up histos in stack
-    histos = map(lambda l:map(lambda h:helpers.clone(h), l), plot.histos)
+    histos = map(lambda l:map(lambda h:Histo.to_root(h), l), plot.histos)
 
     # Add overflow bins for 1D plots
     if isinstance(plot, Plot.Plot):
@@ -673,3 +936,126 @@ def draw2D(plot, \
         c1.Print( os.path.join( plot_directory, "%s.%s"%(filename, extension) ) )
 
     del c1
+
+def _render_token( obj ):
+    ''' Something that changes if obj changes the rendered output. Helper for 'render'.
+    '''
+    if isinstance( obj, dict ):
+        return sorted( ( k, _render_token( v ) ) for k, v in obj.iteritems() )
+    if isinstance( obj, (list, tuple) ):
+        return map( _render_token, obj )
+    if isinstance( obj, Histo.Histo ):
+        return [ obj.histo_class.__name__, obj.title, obj.edges, obj.sumw.tolist(), obj.sumw2.tolist(), _render_token( obj.style ) ]
+    if isinstance( obj, ROOT.TH1 ):
+        tokens = [ obj.ClassName(), obj.GetTitle(), obj.GetNcells(),
+                   [ ( obj.GetBinContent(i), obj.GetBinError(i) ) for i in xrange( obj.GetNcells() ) ],
+                   [ ( a.GetXmin(), a.GetXmax(), a.GetNbins(), [ a.GetXbins().At(i) for i in xrange( a.GetXbins().GetSize() ) ] ) for a in ( obj.GetXaxis(), obj.GetYaxis(), obj.GetZaxis() ) ],
+                   obj.GetLineColor(), obj.GetLineStyle(), obj.GetLineWidth(), obj.GetFillColor(), obj.GetFillStyle(),
+                   obj.GetMarkerColor(), obj.GetMarkerStyle(), obj.GetMarkerSize() ]
+        for attribute in [ "texName", "legendText", "legendOption", "drawOption", "style" ]:
+            tokens.append( _render_token( getattr( obj, attribute, None ) ) )
+        return tokens
+    if isinstance( obj, ROOT.TObject ):
+        if hasattr( ROOT, "TBufferJSON" ):
+            return str( ROOT.TBufferJSON.ConvertToJSON( obj ).Data() )
+        return [ obj.ClassName(), obj.GetName(), obj.GetTitle() ]
+    if callable( obj ):
+        return helpers.function_hash( obj )
+    return repr( obj )
+
+def render_hash( plot, **kwargs ):
+    ''' md5 hex digest of the histos of plot (content and style), its labels, the samples' legend entries and styles and the draw options.
+    '''
+    samples = [ [ ( s.name, getattr( s, "texName", None ), _render_token( getattr( s, "style", None ) ) ) for s in l ] for l in plot.stack ] if plot.stack is not None else None
+    tokens = [ plot.name, plot.texX, plot.texY, getattr( plot, "addOverFlowBin", None ), getattr( plot, "drawOption", None ),
+               _render_token( plot.histos ), samples, _render_token( kwargs ) ]
+    return hashlib.md5( repr( tokens ) ).hexdigest()
+
+render_state_filename = ".RootTools_render_state.json"
+
+# Jobs of the current 'render' call. Forked workers inherit them, ROOT objects need not be pickled.
+_render_jobs = []
+
+def _render_job( i_job ):
+    ''' Draw job i_job and return the time it took. Helper for 'render'.
+    '''
+    ROOT.gROOT.SetBatch( True )
+    plot, kwargs = _render_jobs[i_job]
+    start = time.time()
+    if isinstance( plot, Plot2D.Plot2D ):
+        draw2D( plot, **kwargs )
+    else:
+        draw( plot, **kwargs )
+    return time.time() - start
+
+def render( plots, nThreads = 4, force = False, **kwargs ):
+    ''' Draw many plots in a process pool with ROOT in batch mode. Plots are drawn with draw (Plot) or draw2D (Plot2D).
+        'plots' are plots or (plot, kwargs) with arguments for this plot which update the common 'kwargs'.
+        Unless 'force', a plot is not drawn again if its histos and draw arguments didn't change since the last render
+        into the same plot_directory and all output files exist. The state is kept in plot_directory/.RootTools_render_state.json.
+        Returns { plot.name:time in seconds (None if skipped), ...}.
+    '''
+    global _render_jobs
+
+    jobs = []
+    for p in plots:
+        if isinstance( p, (list, tuple) ):
+            plot_kwargs = dict( kwargs )
+            plot_kwargs.update( p[1] )
+            jobs.append( ( p[0], plot_kwargs ) )
+        else:
+            jobs.append( ( p, dict( kwargs ) ) )
+
+    # Find out what changed
+    states   = {}
+    hashes   = []
+    to_do    = []
+    for i_job, ( plot, plot_kwargs ) in enumerate( jobs ):
+        plot_directory = plot_kwargs.get( "plot_directory", "." )
+        extensions     = plot_kwargs.get( "extensions", ["pdf", "png", "root"] )
+        if plot_directory not in states:
+            state_file = os.path.join( plot_directory, render_state_filename )
+            try:
+                with open( state_file ) as f:
+                    states[plot_directory] = json.load( f )
+            except ( IOError, ValueError ):
+                states[plot_directory] = {}
+        hashes.append( render_hash( plot, **plot_kwargs ) )
+        outputs_exist = all( os.path.exists( os.path.join( plot_directory, "%s.%s" % ( plot.name, extension ) ) ) for extension in extensions )
+        if force or not outputs_exist or states[plot_directory].get( plot.name ) != hashes[-1]:
+            to_do.append( i_job )
+
+    logger.info( "Rendering %i of %i plots (others unchanged) with %i processes.", len( to_do ), len( jobs ), nThreads )
+
+    _render_jobs = jobs
+    try:
+        if nThreads > 1 and len( to_do ) > 1:
+            from multiprocessing import Pool
+            pool = Pool( min( nThreads, len( to_do ) ) )
+            try:
+                times = pool.map( _render_job, to_do )
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            times = map( _render_job, to_do )
+    finally:
+        _render_jobs = []
+
+    # Report and remember
+    result = { plot.name:None for plot, plot_kwargs in jobs }
+    for i_job, t in zip( to_do, times ):
+        plot, plot_kwargs = jobs[i_job]
+        plot_directory = plot_kwargs.get( "plot_directory", "." )
+        states[plot_directory][plot.name] = hashes[i_job]
+        result[plot.name] = t
+        logger.info( "Rendered plot %s in %3.2f s.", plot.name, t )
+
+    for plot_directory, state in states.iteritems():
+        if not os.path.exists( plot_directory ): continue
+        tmp_file = os.path.join( plot_directory, render_state_filename + ".%i.tmp" % os.getpid() )
+        with open( tmp_file, 'w' ) as f:
+            json.dump( state, f )
+        os.rename( tmp_file, os.path.join( plot_directory, render_state_filename ) )
+
+    return result
@@ -1,5 +1,32 @@
 import ROOT
 
+def specified( factory ):
+    ''' Style factories record how the style function was made (func.spec), such that it can be rebuilt, e.g. in another process.
+    '''
+    def wrapper( *args, **kwargs ):
+        func = factory( *args, **kwargs )
+        func.spec = ( factory.__name__, args, kwargs )
+        return func
+    wrapper.__name__ = factory.__name__
+    wrapper.__doc__  = factory.__doc__
+    return wrapper
+
+def to_spec( style ):
+    ''' Picklable description of a style function. Functions not made by the factories of this module are returned as they are.
+    '''
+    if hasattr( style, 'spec' ):
+        return {'style':style.spec}
+    return style
+
+def from_spec( spec ):
+    ''' Inverse of to_spec.
+    '''
+    if isinstance( spec, dict ) and 'style' in spec:
+        name, args, kwargs = spec['style']
+        return globals()[name]( *args, **kwargs )
+    return spec
+
+@specified
 def errorStyle( color, markerStyle = 20, markerSize = 1, width = 1):
     def func( histo ):
         histo.SetLineColor( color )
@@ -12,6 +39,7 @@ def errorStyle( color, markerStyle = 20, markerSize = 1, width = 1):
         return 
     return func
 
+@specified
 def invisibleStyle ( ):
     def func( histo ):
         histo.SetMarkerSize(0)
@@ -19,6 +47,7 @@ def invisibleStyle ( ):
         return
     return func
 
+@specified
 def lineStyle( color, width = None, dotted=False, dashed=False, errors = False):
     def func( histo ):
         histo.SetLineColor( color )
@@ -34,6 +63,7 @@ def lineStyle( color, width = None, dotted=False, dashed=False, errors = False):
         return 
     return func
 
+@specified
 def fillStyle( color, lineColor = ROOT.kBlack, lineWidth = 1, errors = False):
     def func( histo ):
         lc = lineColor if lineColor is not None else color
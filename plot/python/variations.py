@@ -0,0 +1,123 @@
+''' Weight variations of a plot (e.g. scale/PDF/b-tag variations or Poisson bootstrap replicas) filled in one pass.
+    Variations are stored as the y axis of one TH2D per stack entry: x is the binning of the plot, y bin k+1 is the k-th variation.
+    A variation weight replaces the weight of the plot, i.e. the filled weight is (sample weight)*(variation weight).
+'''
+
+# Standard imports
+import ROOT
+import bisect
+from array import array
+
+# Optional
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Logging
+import logging
+logger = logging.getLogger(__name__)
+
+def normalize( variations ):
+    ''' (names, function) where function( event, sample ) returns one weight per name. Accepts
+        [ (name1, weight1), (name2, weight2), ... ] with weight functions or ( [name1, name2, ...], function ).
+        None for None.
+    '''
+    if variations is None: return None
+    if np is None:
+        raise ImportError( "Weight variations need numpy." )
+
+    if len( variations ) == 2 and isinstance( variations[0], (list, tuple) ) and callable( variations[1] ):
+        names, function = variations
+        return ( list( names ), function )
+
+    if all( isinstance( v, (list, tuple) ) and len( v ) == 2 and callable( v[1] ) for v in variations ):
+        names     = [ v[0] for v in variations ]
+        functions = [ v[1] for v in variations ]
+        return ( names, lambda event, sample: [ f( event, sample ) for f in functions ] )
+
+    raise ValueError( "Variations must be [(name, weight), ...] or ([name, ...], function). Got %r" % ( variations, ) )
+
+def _edges( histo ):
+    if hasattr( histo, 'edges' ):
+        # RootTools.plot.Histo.Histo
+        return histo.edges[0]
+    axis = histo.GetXaxis()
+    return tuple( axis.GetBinLowEdge(i) for i in xrange( 1, axis.GetNbins()+2 ) )
+
+def make_histos( plot ):
+    ''' TH2D for each histo of the plot with the plot's x binning and one y bin per variation.
+    '''
+    names = plot.variations[0]
+    res = []
+    add_directory = ROOT.TH1.AddDirectoryStatus()
+    ROOT.TH1.AddDirectory( False )
+    try:
+        for i, l in enumerate( plot.histos ):
+            res.append( [] )
+            for j, h in enumerate( l ):
+                edges = _edges( h )
+                histo = ROOT.TH2D( h.GetName() + "_variations", h.GetName() + "_variations", len( edges ) - 1, array( 'd', edges ), len( names ), 0, len( names ) )
+                histo.Sumw2()
+                for k, name in enumerate( names ):
+                    histo.GetYaxis().SetBinLabel( k+1, name )
+                res[-1].append( histo )
+    finally:
+        ROOT.TH1.AddDirectory( add_directory )
+    return res
+
+class VariationAccumulator( object ):
+    ''' Sums of weights and squared weights for all variations of one histo in numpy arrays (variation, x bin).
+        The x bin is found once per fill, all variations are filled with one vector operation.
+    '''
+    def __init__( self, histo ):
+        self.histo = histo
+        axis       = histo.GetXaxis()
+        self.edges = tuple( axis.GetBinLowEdge(i) for i in xrange( 1, axis.GetNbins()+2 ) )
+        self.sumw  = np.zeros( ( histo.GetNbinsY(), len( self.edges ) + 1 ) )
+        self.sumw2 = np.zeros( self.sumw.shape )
+        self.entries = 0
+
+    def fill( self, x, weights ):
+        ''' weights: numpy array with the weight of each variation.
+        '''
+        if x is None: return
+        ix = bisect.bisect_right( self.edges, x )
+        self.sumw[:, ix]  += weights
+        self.sumw2[:, ix] += weights**2
+        self.entries += 1
+
+    def flush( self ):
+        ''' Add the accumulated sums to the TH2D.
+        '''
+        # SetBinContent increments the number of entries
+        entries = self.histo.GetEntries()
+        n_x = len( self.edges ) + 1
+        for k, ix in zip( *np.nonzero( self.sumw2 ) ):
+            # global bin number = ix + (nx+2)*iy as in TH1::GetBin
+            b = int( ix ) + n_x*( int( k ) + 1 )
+            self.histo.SetBinContent( b, self.histo.GetBinContent( b ) + self.sumw[k, ix] )
+            self.histo.SetBinError( b, ( self.histo.GetBinError( b )**2 + self.sumw2[k, ix] )**0.5 )
+        self.histo.SetEntries( entries + self.entries )
+        self.sumw[...]  = 0.
+        self.sumw2[...] = 0.
+        self.entries    = 0
+
+def fill_event( plan, values, sample_weight, event, sample ):
+    ''' Fill all variation accumulators of a fill plan (see plotting.make_fill_plan) for one event.
+        'values' are the values of the fillers of the plan. Each distinct variation function is evaluated once.
+    '''
+    variation_weights = [ sample_weight*np.asarray( f( event, sample ), dtype = 'd' ) for f in plan['variation_functions'] ]
+    for accumulator, filler_index, variation_index in plan['variation_entries']:
+        x = values[filler_index]
+        if isinstance( x, (tuple, list) ):
+            for x_ in x:
+                accumulator.fill( x_, variation_weights[variation_index] )
+        else:
+            accumulator.fill( x, variation_weights[variation_index] )
+
+def flush( plan ):
+    ''' Write the variations of a fill plan to the histograms.
+    '''
+    for accumulator, filler_index, variation_index in plan['variation_entries']:
+        accumulator.flush()
@@ -0,0 +1,72 @@
+''' Tests of incremental filling with the plot cache. Needs ROOT. Run with 'python -m unittest discover RootTools/plot/test'.
+'''
+
+# Standard imports
+import unittest
+import os
+import shutil
+import tempfile
+from array import array
+
+import ROOT
+
+# RootTools
+from RootTools.core.Sample import Sample
+from RootTools.core.TreeVariable import TreeVariable
+from RootTools.plot.Plot import Plot
+from RootTools.plot.Stack import Stack
+from RootTools.plot.HistoCache import HistoCache
+import RootTools.plot.plotting as plotting
+
+def write_tree( filename, branch, values ):
+    f = ROOT.TFile( filename, "RECREATE" )
+    tree = ROOT.TTree( "Events", "Events" )
+    value = array( 'f', [0.] )
+    tree.Branch( branch, value, branch + "/F" )
+    for v in values:
+        value[0] = v
+        tree.Fill()
+    tree.Write()
+    f.Close()
+
+@unittest.skipUnless( isinstance( getattr( ROOT, 'TTree', None ), type ), "needs ROOT" )
+class IncrementalFriendTest( unittest.TestCase ):
+
+    def setUp( self ):
+        self.directory = tempfile.mkdtemp()
+        # x in the main tree, y = x + 20 in the friend tree aligned by entry
+        for i in range( 2 ):
+            write_tree( os.path.join( self.directory, "main_%i.root" % i ),   "x", [ 10*i + k for k in range( 10 ) ] )
+            write_tree( os.path.join( self.directory, "friend_%i.root" % i ), "y", [ 10*i + k + 20 for k in range( 10 ) ] )
+        self.cache = HistoCache( os.path.join( self.directory, "cache" ) )
+
+    def tearDown( self ):
+        shutil.rmtree( self.directory )
+
+    def sample( self, n_files ):
+        main   = Sample.fromFiles( "main",   [ os.path.join( self.directory, "main_%i.root" % i ) for i in range( n_files ) ] )
+        friend = Sample.fromFiles( "friend", [ os.path.join( self.directory, "friend_%i.root" % i ) for i in range( n_files ) ] )
+        main.addFriend( friend, "friend" )
+        return main
+
+    def plot( self, sample ):
+        return Plot( stack = Stack( [ sample ] ), attribute = TreeVariable.fromString( "y/F" ), binning = [ 40, 0, 40 ], name = "y" )
+
+    def contents( self, plot ):
+        histo = plot.histos[0][0]
+        return [ histo.GetBinContent( i ) for i in range( histo.GetNbinsX() + 2 ) ]
+
+    def test_added_files( self ):
+        plotting.fill( [ self.plot( self.sample( 1 ) ) ], cache = self.cache, incremental = True )
+
+        # a file is added to the sample and its friend
+        incremental = self.plot( self.sample( 2 ) )
+        plotting.fill( [ incremental ], cache = self.cache, incremental = True )
+
+        full = self.plot( self.sample( 2 ) )
+        plotting.fill( [ full ] )
+        self.assertEqual( self.contents( incremental ), self.contents( full ) )
+        self.assertEqual( sum( self.contents( full ) ), 20 )
+
+if __name__ == '__main__':
+    unittest.main()